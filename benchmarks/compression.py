@@ -0,0 +1,71 @@
+"""
+Compressed data files compared with plain pickle.
+
+    python -m benchmarks.compression --sizes 10000,100000 --formats none,zlib:1,zlib:6,lzma:1
+
+For every dataset (contacts and notes of every size) and format the data is saved with
+save_data and loaded with load_data. Prints JSON with the best save and load time in seconds
+of --repeat runs, the file size in bytes and the size relative to plain pickle.
+Synthetic texts use a small vocabulary, real prose compresses less.
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from personal_assistant.common import load_data, save_data
+from benchmarks.generators import make_book, make_notes
+from benchmarks.run import measure
+
+
+DEFAULT_FORMATS = ["none", "zlib:1", "zlib:6", "lzma:1", "lzma:6"]
+
+
+def run_compression_benchmarks(sizes: list[int], formats: list[str] = DEFAULT_FORMATS,
+                               repeat: int = 3) -> dict[str, dict[str, Any]]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for name, data in (("book", make_book(size)), ("notes", make_notes(size))):
+                plain_size = None
+                for spec in formats:
+                    path = Path(tmp) / f"{name}_{size}.pkl"
+                    save = measure(lambda: save_data(data, path, spec), repeat)
+                    load = measure(lambda: load_data(path), repeat)
+                    file_size = path.stat().st_size
+                    if plain_size is None or spec == "none":
+                        plain_size = file_size
+                    results[f"{name}.{spec}[{size}]"] = {
+                        "save": save["best"],
+                        "load": load["best"],
+                        "bytes": file_size,
+                        "ratio": file_size / plain_size,
+                    }
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Personal assistant compressed data files benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated dataset sizes")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="comma separated formats: none, zlib[:level], lzma[:level] (first is the reference)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per format")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = [spec.strip() for spec in args.formats.split(",")]
+    print(json.dumps(run_compression_benchmarks(sizes, formats, args.repeat), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
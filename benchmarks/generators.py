@@ -0,0 +1,73 @@
+"""Deterministic synthetic data for benchmarks: the same seed and size always give the same records"""
+import random
+from datetime import date, timedelta
+from typing import Iterator
+from personal_assistant.addr_book.classes import AddressBook, Record, Phone, Email
+from personal_assistant.notes.classes import NoteRecord, Notes
+
+
+FIRST_NAMES = [
+    "John", "Jane", "Olena", "Taras", "Maria", "Ivan", "Anna", "Petro", "Sofia", "Andrii",
+    "Kateryna", "Dmytro", "Iryna", "Oleh", "Natalia", "Yurii", "Oksana", "Serhii", "Yulia", "Bohdan",
+]
+LAST_NAMES = [
+    "Smith", "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Oliinyk",
+    "Shevchuk", "Polishchuk", "Lysenko", "Melnyk", "Boiko", "Moroz", "Koval", "Savchenko",
+]
+CITIES = ["Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Chernihiv", "Poltava", "Vinnytsia"]
+STREETS = ["Main", "Shevchenka", "Franka", "Bandery", "Sadova", "Lesi Ukrainky", "Hrushevskoho"]
+DOMAINS = ["example.com", "mail.ua", "test.org", "company.net"]
+WORDS = [
+    "meeting", "report", "budget", "travel", "family", "shopping", "idea", "project", "review",
+    "call", "doctor", "birthday", "garden", "book", "movie", "recipe", "plan", "deadline",
+]
+TAGS = [f"tag{i}" for i in range(50)] + ["work", "home", "urgent", "later", "personal"]
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def generate_records(count: int, seed: int = 0) -> Iterator[Record]:
+    """Contacts with unique names, 1-3 phones, 0-2 emails, birthday and address for most of them"""
+    rng = random.Random(seed)
+    first_day = date(1950, 1, 1)
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        record = Record(f"{first} {last} {i}")
+        record.phones.extend(Phone(f"380{rng.randrange(10**9):09d}") for _ in range(rng.randint(1, 3)))
+        record.emails.extend(
+            Email(f"{first.lower()}.{last.lower()}{i}{n}@{rng.choice(DOMAINS)}")
+            for n in range(rng.randint(0, 2))
+        )
+        if rng.random() < 0.9:
+            birthday = first_day + timedelta(days=rng.randrange(365 * 55))
+            record.birthday = birthday.strftime("%d.%m.%Y")
+        if rng.random() < 0.8:
+            record.address = f"{rng.choice(CITIES)}, {rng.choice(STREETS)} str, {rng.randint(1, 200)}"
+        yield record
+
+
+def generate_notes(count: int, seed: int = 0) -> Iterator[NoteRecord]:
+    """Notes with ULID-like ids, 5-40 words of text and 0-4 tags"""
+    rng = random.Random(seed)
+    for i in range(count):
+        note_id = "".join(rng.choice(CROCKFORD) for _ in range(26))
+        words = [rng.choice(WORDS) for _ in range(rng.randint(5, 40))]
+        words += [f"#{rng.choice(TAGS)}" for _ in range(rng.randint(0, 4))]
+        rng.shuffle(words)
+        yield NoteRecord(f"{rng.choice(WORDS).title()} {i}", " ".join(words), id=note_id)
+
+
+def make_book(count: int, seed: int = 0) -> AddressBook:
+    book = AddressBook()
+    for record in generate_records(count, seed):
+        book.add_record(record)
+    return book
+
+
+def make_notes(count: int, seed: int = 0) -> Notes:
+    notes = Notes()
+    for note in generate_notes(count, seed):
+        notes.add(note)
+    return notes
@@ -0,0 +1,175 @@
+"""
+Load test of the service mode (personal-assistant --serve).
+
+    python -m benchmarks.load_test --size 10000 --clients 8 --requests 2000 --pipeline 16
+
+The service is started in a child process on a temporary Unix socket (--port for TCP)
+with synthetic contacts and notes in journal storage. Every client sends --requests requests
+in batches of --pipeline pipelined requests, --writes is the share of write requests.
+Prints JSON with requests per second and latency percentiles in milliseconds
+(latency of a request is the time from sending its batch to receiving its response).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from personal_assistant.addr_book.classes import AddressBook
+from personal_assistant.notes.classes import Notes
+from personal_assistant.server import Client, Service, start_server
+from personal_assistant.storage import JournalStorage
+from personal_assistant.common import save_data
+from benchmarks.generators import generate_records, make_book, make_notes
+
+
+def serve(tmp_dir: str, size: int, socket_path: str | None, port: int, fsync: bool) -> None:
+    """Child process: create data and serve it"""
+    book_path, notes_path = Path(tmp_dir) / "addressbook.pkl", Path(tmp_dir) / "notes.pkl"
+    save_data(make_book(size), book_path)
+    save_data(make_notes(size), notes_path)
+    book_storage = JournalStorage(book_path, fsync=fsync)
+    notes_storage = JournalStorage(notes_path, fsync=fsync)
+    book_storage.load(AddressBook)
+    notes_storage.load(Notes)
+    service = Service(book_storage, notes_storage)
+    service.warm_up()
+
+    async def main() -> None:
+        server = await start_server(service, socket_path, port=port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def make_request(rnd: random.Random, names: list[str], writes: float) -> tuple[str, dict[str, Any]]:
+    name = rnd.choice(names)
+    if rnd.random() < writes:
+        if rnd.random() < 0.5:
+            return "contacts.edit", {"name": name, "address": f"Kyiv, Main st. {rnd.randint(1, 999)}"}
+        return "notes.add", {"title": f"Load test {rnd.randint(1, 10**6)}", "text": "load #test"}
+    return rnd.choice([
+        ("contacts.get", {"name": name}),
+        ("contacts.find", {"criteria": name.split()[-1][:4].casefold(), "limit": 10}),
+        ("contacts.birthdays", {"days": 7, "limit": 20}),
+        ("notes.find", {"tags": rnd.choice(["work", "home urgent", "tag1"]), "limit": 20}),
+    ])
+
+
+async def run_client(n: int, address: dict[str, Any], names: list[str], requests: int,
+                     pipeline: int, writes: float) -> tuple[list[float], int]:
+    """Returns latencies of requests and number of error responses"""
+    rnd = random.Random(n)
+    client = await Client.connect(**address)
+    latencies, errors = [], 0
+    try:
+        sent = 0
+        while sent < requests:
+            batch = [make_request(rnd, names, writes) for _ in range(min(pipeline, requests - sent))]
+            sent += len(batch)
+            start = time.perf_counter()
+            for op, args in batch:
+                client.send(op, **args)
+            await client.writer.drain()
+            for _ in batch:
+                response = await client.receive()
+                latencies.append(time.perf_counter() - start)
+                errors += not response["ok"]
+    finally:
+        await client.close()
+    return latencies, errors
+
+
+async def wait_ready(address: dict[str, Any], timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            client = await Client.connect(**address)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+        else:
+            await client.close()
+            return
+
+
+def percentile(values: list[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run_load_test(size: int = 10_000, clients: int = 8, requests: int = 2000, pipeline: int = 16,
+                  writes: float = 0.1, port: int | None = None, fsync: bool = False) -> dict[str, Any]:
+    names = [record.name.value for record in generate_records(size)]
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = None if port else str(Path(tmp) / "assistant.sock")
+        address = {"socket_path": socket_path} if socket_path else {"port": port}
+        process = multiprocessing.Process(target=serve, args=(tmp, size, socket_path, port, fsync), daemon=True)
+        process.start()
+        try:
+            asyncio.run(wait_ready(address))
+
+            async def load() -> list[tuple[list[float], int]]:
+                return await asyncio.gather(*(run_client(n, address, names, requests, pipeline, writes)
+                                              for n in range(clients)))
+
+            start = time.perf_counter()
+            results = asyncio.run(load())
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.join()
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return {
+        "size": size,
+        "clients": clients,
+        "pipeline": pipeline,
+        "writes": writes,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Personal assistant service load test")
+    parser.add_argument("--size", type=int, default=10_000, help="contacts and notes in the service")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=16, help="requests sent before reading responses")
+    parser.add_argument("--writes", type=float, default=0.1, help="share of write requests (0..1)")
+    parser.add_argument("--port", type=int, help="use localhost TCP port instead of a Unix socket")
+    parser.add_argument("--fsync", action="store_true", help="fsync the journal on every write")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = run_load_test(args.size, args.clients, args.requests, args.pipeline, args.writes, args.port, args.fsync)
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Benchmarks of hot paths on synthetic data.
+
+    python -m benchmarks.run --sizes 1000,10000 --output results.json
+
+Results are printed (or written to --output) as JSON: best and median time in seconds
+for every "benchmark[size]". When the baseline file exists, results are compared
+with it and the run fails (exit code 1) if any benchmark is slower than
+baseline * (1 + tolerance) + min_delta or has no baseline. --save-baseline writes results as the new baseline.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from personal_assistant.common import PAGE_SIZE, build_table, load_data, save_data
+from personal_assistant.addr_book.views import CONTACT_TABLE_CONFIG
+from benchmarks.generators import make_book, make_notes
+
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+TABLE_ROWS = 200
+
+FIND_QUERIES = ["smith", "380501", "mail.ua", "lviv, franka", "zzz"]
+NOTES_QUERIES = ["work", "home urgent", "tag1 tag2 tag3", "missing"]
+TEXT_QUERIES = ["budget", "meeting report", '"travel plan"', "proj*", "missing"]
+COMPLETE_PREFIXES = ["a", "jo", "mar", "smi", "zz"]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Best and median time of repeat runs, func is called once before for warm up"""
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"best": min(times), "median": statistics.median(times)}
+
+
+def render_table(records: list) -> str:
+    from rich.console import Console
+
+    console = Console(file=io.StringIO(), width=120, force_terminal=True)
+    console.print(build_table("Contacts", CONTACT_TABLE_CONFIG, records))
+    return console.file.getvalue()
+
+
+def size_benchmarks(size: int, tmp_dir: Path) -> dict[str, Callable[[], Any]]:
+    book = make_book(size)
+    notes = make_notes(size)
+    # queries are repeated: measure the queries themselves, cache hits are measured separately
+    book.query_cache.maxsize = 0
+    notes.query_cache.maxsize = 0
+    cached_book = make_book(size)
+    book_path = tmp_dir / f"book_{size}.pkl"
+    notes_path = tmp_dir / f"notes_{size}.pkl"
+    save_data(book, book_path)
+    save_data(notes, notes_path)
+    page = list(islice(book.values(), PAGE_SIZE))
+    table = list(islice(book.values(), TABLE_ROWS))
+
+    def build_indexes():
+        book._init_indexes()
+        book._ensure_indexes()
+
+    return {
+        "book.index": build_indexes,
+        "book.find": lambda: [book.find(query) for query in FIND_QUERIES],
+        "book.find_cached": lambda: [cached_book.find(query) for query in FIND_QUERIES],
+        "book.complete": lambda: [book.complete_names(prefix) for prefix in COMPLETE_PREFIXES],
+        "notes.complete": lambda: [notes.complete(prefix) for prefix in COMPLETE_PREFIXES],
+        "book.birthdays_7": lambda: book.get_upcoming_birthdays(7),
+        "book.birthdays_30": lambda: book.get_upcoming_birthdays(30),
+        "notes.find": lambda: [notes.find(query) for query in NOTES_QUERIES],
+        "notes.search": lambda: [notes.search(query) for query in TEXT_QUERIES],
+        "book.save": lambda: save_data(book, book_path),
+        "book.load": lambda: load_data(book_path),
+        "notes.save": lambda: save_data(notes, notes_path),
+        "notes.load": lambda: load_data(notes_path),
+        "draw_table.page": lambda: render_table(page),
+        f"draw_table.{TABLE_ROWS}": lambda: render_table(table),
+    }
+
+
+def run_benchmarks(sizes: list[int], repeat: int = 5, only: list[str] | None = None) -> dict[str, dict[str, float]]:
+    """Returns {"name[size]": {"best": seconds, "median": seconds}}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for name, func in size_benchmarks(size, Path(tmp)).items():
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                results[f"{name}[{size}]"] = measure(func, repeat)
+    return results
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]],
+            tolerance: float = 0.5, min_delta: float = 0.002) -> list[str]:
+    """
+    Returns descriptions of benchmarks slower than the baseline
+    and of benchmarks missing in it (the baseline must be saved again).
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            regressions.append(f"{key}: {result['best']:.6f}s, no baseline")
+            continue
+        expected = baseline[key]["best"]
+        if result["best"] > expected * (1 + tolerance) + min_delta:
+            regressions.append(f"{key}: {result['best']:.6f}s, baseline {expected:.6f}s "
+                               f"(+{(result['best'] / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Personal assistant benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated dataset sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--only", action="append", help="run benchmarks with the name prefix (repeatable)")
+    parser.add_argument("--output", type=Path, help="write JSON results to the file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown (default: 0.5)")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="allowed absolute slowdown in seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "sizes": sizes,
+        },
+        "results": run_benchmarks(sizes, args.repeat, args.only),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(output + "\n", encoding="utf-8")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline {args.baseline}, comparison skipped", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    regressions = compare(report["results"], baseline, args.tolerance, args.min_delta)
+    for regression in regressions:
+        print(f"SLOWER {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
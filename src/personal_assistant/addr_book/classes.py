@@ -1,14 +1,32 @@
 from collections import UserDict, UserList
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import re
+from typing import Iterator
 from personal_assistant.addr_book import exceptions as excp
-from personal_assistant.common import UniqueList
+from personal_assistant.cache import CachedQueries, cached_query
+from personal_assistant.common import Observable, UniqueList
+from personal_assistant.indexes import NgramIndex, DayOfYearIndex, ExactIndex, PrefixIndex, COMPLETION_LIMIT
 
 
 class Field:
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
+    @classmethod
+    def from_value(cls, value):
+        """Create field from already validated value (used on load)"""
+        field = cls.__new__(cls)
+        field.value = value
+        return field
+
+    def __setstate__(self, state):
+        """Load fields pickled before __slots__ ({'value': ...}) and slot state (None, {'value': ...})"""
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.value = state.get("value")
+
     def __str__(self) -> str:
         return str(self.value)
 
@@ -17,6 +35,8 @@ class Name(Field):
     """
     Field Name for address book record
     """
+    __slots__ = ()
+
     def __init__(self, value: str):
          super().__init__(str(value).strip().title())
 
@@ -28,6 +48,8 @@ class Phone(Field):
     """
     Field Phone for address book record
     """
+    __slots__ = ()
+
     def __init__(self, value: str):
         """
         International format phone number.
@@ -50,14 +72,17 @@ class Phone(Field):
         return "".join(ch for ch in str(value) if ch.isdigit())
 
     def __eq__(self, other) -> bool:
-        if not isinstance(other, (Phone, str, int)):
-            return NotImplemented
         if isinstance(other, Phone):
             return self.value == other.value
+        if not isinstance(other, (str, int)):
+            return NotImplemented
         try:
             return self.value == self._clear_phone(str(other))
         except:
             return False
+
+    def __hash__(self) -> int:
+        return hash(self.value)
     
 
 class PhoneFactory:
@@ -81,14 +106,27 @@ class PhoneFactory:
         return phones, errors
 
 class PhoneList(UniqueList[Phone]):
+    __slots__ = ()
+
+    @classmethod
+    def _coerce(cls, item):
+        if isinstance(item, Phone):
+            return item
+        try:
+            return Phone(item)
+        except excp.PhoneFormatError:
+            return None
+
     def __str__(self) -> str:
-        return '\n'.join(str(p) for p in self.data)
+        return '\n'.join(str(p) for p in self._items)
 
 
 class Email(Field):
     """
     Field Email for address book record
     """
+    __slots__ = ()
+
     def __init__(self, value: str):
         """
         Email format.
@@ -117,10 +155,10 @@ class Email(Field):
         return str(value).strip().casefold()
          
     def __eq__(self, other) -> bool:
-        if not isinstance(other, (Email, str)):
-            return NotImplemented
         if isinstance(other, Email):
             return self.value == other.value
+        if not isinstance(other, str):
+            return NotImplemented
         try:
             email = self._clear_email(other)
             self._check_email_format(email)
@@ -128,6 +166,9 @@ class Email(Field):
         except:
             return False
 
+    def __hash__(self) -> int:
+        return hash(self.value)
+
 
 class EmailFactory:
     @staticmethod
@@ -151,19 +192,39 @@ class EmailFactory:
 
 
 class EmailList(UniqueList[Email]):
+    __slots__ = ()
+
+    @classmethod
+    def _coerce(cls, item):
+        if isinstance(item, Email):
+            return item
+        try:
+            return Email(item)
+        except excp.EmailFormatError:
+            return None
+
     def __str__(self) -> str:
-        return '\n'.join(str(p) for p in self.data)
+        return '\n'.join(str(p) for p in self._items)
 
 
 class Birthday(Field):
     """
     Field Birthday for address book record. Date format DD.MM.YYYY.
     """
+    __slots__ = ()
+
+    # same dates as strptime "%d.%m.%Y" accepts, without strptime overhead (bulk import)
+    _DATE_RE = re.compile(r"([0-9]{1,2})\.([0-9]{1,2})\.([0-9]{4})")
+
     def __init__(self, value=None):
         self.value = None
         try:
             if value is not None:
-                self.value = datetime.strptime(str(value).strip().casefold(), "%d.%m.%Y").date()
+                match = self._DATE_RE.fullmatch(str(value).strip())
+                if match is None:
+                    raise ValueError(value)
+                day, month, year = match.groups()
+                self.value = date(int(year), int(month), int(day))
         except ValueError:
             raise excp.BirthdayFormatError("Invalid date format. Use DD.MM.YYYY")
 
@@ -175,6 +236,8 @@ class PostAddress(Field):
     """
     Field Address for address book record.
     """
+    __slots__ = ()
+
     def __init__(self, value: str|None = None):
         # TODO: parse address to post, country, sity, street and other
         self.value = None if value is None else value.strip()
@@ -183,14 +246,17 @@ class PostAddress(Field):
         return self.value if self.value is not None else "Unknown"
 
 
-class Record:
+class Record(Observable):
     """
     Record for address book.
+    Observers (callback(record)) are notified after any field of the record was changed.
     """
+    __slots__ = ("name", "__phones", "__emails", "__birthday", "__address", "_observers", "__weakref__")
+
     def __init__(self, name: str):
         self.name: Name = Name(name)
-        self.__phones: PhoneList = PhoneList()
-        self.__emails: EmailList = EmailList()
+        self.__phones: PhoneList = PhoneList(owner=self)
+        self.__emails: EmailList = EmailList(owner=self)
         self.__birthday = Birthday()
         self.__address = PostAddress()
 
@@ -209,6 +275,7 @@ class Record:
     @birthday.setter
     def birthday(self, bd: str | None):
         self.__birthday = Birthday(bd)
+        self._changed()
 
     @property
     def address(self) -> PostAddress:
@@ -217,66 +284,248 @@ class Record:
     @address.setter
     def address(self, address):
         self.__address = PostAddress(address)
+        self._changed()
+
+    def _changed(self) -> None:
+        self._notify(self)
+
+    def __getstate__(self) -> tuple:
+        """Compact state: (name, phones, emails, birthday ordinal, address)"""
+        bd = self.__birthday.value
+        return (
+            self.name.value,
+            tuple(phone.value for phone in self.__phones),
+            tuple(email.value for email in self.__emails),
+            bd.toordinal() if bd is not None else None,
+            self.__address.value,
+        )
+
+    def __setstate__(self, state: tuple | dict) -> None:
+        if isinstance(state, dict):
+            # pickled before __slots__
+            self.name = state["name"]
+            self.__phones = state["_Record__phones"]
+            self.__emails = state["_Record__emails"]
+            self.__birthday = state["_Record__birthday"]
+            self.__address = state["_Record__address"]
+            self.__phones._owner = self
+            self.__emails._owner = self
+            return
+
+        name, phones, emails, bd, address = state
+        self.name = Name.from_value(name)
+        self.__phones = PhoneList((Phone.from_value(phone) for phone in phones), owner=self)
+        self.__emails = EmailList((Email.from_value(email) for email in emails), owner=self)
+        self.__birthday = Birthday.from_value(date.fromordinal(bd) if bd is not None else None)
+        self.__address = PostAddress.from_value(address)
 
     def __str__(self):
         return f"Name: {self.name}, bd: {self.birthday}, phones: {self.phones}, emails: {self.emails}, address: {self.address}"
 
 
-class AddressBook(UserDict[str, Record]):
+class AddressBook(CachedQueries, UserDict[str, Record], Observable):
     """
     Address book 
+    Observers (callback(key, record)) are notified after a record was added or changed,
+    record is None when it was deleted.
     """
+    def __init__(self):
+        super().__init__()
+        self._init_indexes()
+
+    def _init_indexes(self) -> None:
+        self._indexes_ready = False
+        self._order: dict[str, int] = {}
+        self._next_order = 0
+        self._search_index: NgramIndex[str] = NgramIndex(3)
+        self._birthday_index: DayOfYearIndex[str] = DayOfYearIndex()
+        self._phone_index: ExactIndex[str] = ExactIndex()
+        self._email_index: ExactIndex[str] = ExactIndex()
+        self._name_index: PrefixIndex[str] = PrefixIndex()
+        self._name_index_ready = False
+        for record in self.data.values():
+            record.subscribe(self._on_record_changed)
+
+    def _ensure_indexes(self) -> None:
+        """Build indexes on first search, so loading a book stays fast"""
+        if self._indexes_ready:
+            return
+        self._indexes_ready = True
+        for key, record in self.data.items():
+            self._index_record(key, record)
+
+    def _ensure_name_index(self) -> None:
+        """Build name completion index on first completion"""
+        if self._name_index_ready:
+            return
+        self._name_index_ready = True
+        self._name_index.build((key, self._name_words(key)) for key in self.data)
+
+    @staticmethod
+    def _name_words(key: str) -> list[str]:
+        """Name key and its tails from every word: 'john smith' -> 'john smith', 'smith'"""
+        words = key.split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
     def add_record(self, record: Record):
-        self.data[self._normalize_name(record.name)] = record
+        key = self._normalize_name(record.name)
+        old = self.data.get(key)
+        if old is not None and old is not record:
+            old.unsubscribe(self._on_record_changed)
+        self.data[key] = record
+        self._index_record(key, record)
+        record.subscribe(self._on_record_changed)
+        self._notify(key, record)
 
+    @staticmethod
+    def _search_texts(rec: Record) -> tuple[str, ...]:
+        """Texts of the record fields which are used in search"""
+        return (
+            str(rec.name).casefold(),
+            str(rec.phones).casefold(),
+            str(rec.emails).casefold(),
+            str(rec.address).casefold(),
+        )
+
+    def _index_record(self, key: str, record: Record) -> None:
+        if self._name_index_ready and key not in self._name_index:
+            self._name_index.add(key, self._name_words(key))
+        if not self._indexes_ready:
+            return
+        if key not in self._order:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        self._search_index.add(key, self._search_texts(record))
+        self._birthday_index.add(key, record.birthday.value)
+        self._phone_index.add(key, (phone.value for phone in record.phones))
+        self._email_index.add(key, (email.value for email in record.emails))
+
+    def _on_record_changed(self, record: Record) -> None:
+        key = self._normalize_name(record.name)
+        if self.data.get(key) is record:
+            self._index_record(key, record)
+            self._notify(key, record)
+
+    @cached_query()
     def find(self, criteria: str) -> list[Record]:
         """
         Search for a contact using criteria.
         The criteria may match the name, phone numbers, emails, or address.
+        Uses trigram index to get candidates, short criteria checks all contacts.
         """
-        result = []
+        return list(self.iter_find(criteria))
+
+    def iter_find(self, criteria: str) -> Iterator[Record]:
+        """Same as find(), yields found records one by one"""
+        self._ensure_indexes()
         criteria = criteria.casefold()
-        for rec in self.values():
-            if str(rec.name).casefold().find(criteria) >= 0 \
-                or str(rec.phones).casefold().find(criteria) >= 0 \
-                or str(rec.emails).casefold().find(criteria) >= 0 \
-                or str(rec.address).casefold().find(criteria) >= 0 \
-            :
-                result.append(rec)
-                continue
+        candidates = self._search_index.candidates(criteria)
+        if candidates is None:
+            keys = list(self.data)
+        else:
+            keys = sorted(candidates, key=self._order.__getitem__)
+
+        for key in keys:
+            # the key could be deleted since the search started (see iter_locked)
+            rec = self.data.get(key)
+            if rec is not None and any(text.find(criteria) >= 0 for text in self._search_texts(rec)):
+                yield rec
+
+    def complete_names(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[Record]:
+        """
+        Contacts with the name (or a word of the name and the rest of it) starting with the prefix,
+        for argument completion. Ordered by the matched text.
+        """
+        self._ensure_name_index()
+        return [self.data[key] for key in self._name_index.keys(self._normalize_prefix(prefix), limit)]
 
-        return result
+    @staticmethod
+    def _normalize_prefix(prefix: str) -> str:
+        """Casefolded prefix with single spaces, a trailing space is kept (end of a word)"""
+        return " ".join(prefix.casefold().split()) + (" " if prefix[-1:].isspace() and prefix.strip() else "")
 
-    def delete(self, name: str):
-        self.data.pop(self._normalize_name(name), None)
+    def lookup(self, value: str) -> list[Record]:
+        """
+        Exact search by phone number (in any format, e.g. '+38 (050) 123-45-67') or email.
+        Returns all contacts with the number or email, in the order they were added.
+        """
+        self._ensure_indexes()
+        value = str(value).strip()
+        if "@" in value:
+            keys = self._email_index.get(Email._clear_email(value))
+        else:
+            keys = self._phone_index.get(Phone._clear_phone(value))
+        return [self.data[key] for key in sorted(keys, key=self._order.__getitem__)]
+
+    def shared_contacts(self) -> Iterator[tuple[str, list[Record]]]:
+        """Yields phone numbers and emails which belong to several contacts, with the contacts"""
+        self._ensure_indexes()
+        for index in (self._phone_index, self._email_index):
+            for value, keys in index.shared():
+                yield value, [self.data[key] for key in sorted(keys, key=self._order.__getitem__)]
 
+    def delete(self, name: str):
+        key = self._normalize_name(name)
+        record = self.data.pop(key, None)
+        if record is None:
+            return
+        record.unsubscribe(self._on_record_changed)
+        self._search_index.remove(key)
+        self._birthday_index.remove(key)
+        self._phone_index.remove(key)
+        self._email_index.remove(key)
+        self._name_index.remove(key)
+        self._order.pop(key, None)
+        self._notify(key, None)
+
+    @cached_query(key=lambda self, days=7: (days, datetime.today().date()))
     def get_upcoming_birthdays(self, days: int=7) -> list[Record]:
         """
         Returns a list of users whose birthdays are within the next 'days' from today.
         If 'days' is not provided, it defaults to 7 days.
+        Birthdays on weekend are moved to Monday, 29 February is 28 February in not leap year.
+        Reads only calendar index buckets of the days, the window can cross the end of year.
         """
         today = datetime.today().date()
         result = []
 
-        end_date = today + timedelta(days=days -1) 
+        # (month, day) of birthday -> date of birthday in the window
+        dates: dict[tuple[int, int], date] = {}
+        for offset in range(min(days, DayOfYearIndex.DAYS)):
+            day = today + timedelta(days=offset)
+            dates.setdefault((day.month, day.day), day)
+            if day.month == 2 and day.day == 28 and not self._is_leap(day.year):
+                dates.setdefault((2, 29), day)
 
-        for key, user in self.data.items():
+        for user in self._records_by_birthday(list(dates)):
             bd = user.birthday.value
-            if not bd:
-                continue
-            try:
-                bd_this_year = bd.replace(year=today.year)
-            except ValueError:
-                bd_this_year = bd.replace(year=today.year, day=28)
-            if today <= bd_this_year <= end_date:
-                if bd_this_year.weekday() > 4: 
-                    days_until_monday = (7 - bd_this_year.weekday())
-                    bd_this_year += timedelta(days=days_until_monday)
-                result.append((user, (bd_this_year - today).days))
+            bd_date = dates[(bd.month, bd.day)]
+            if bd_date.weekday() > 4: 
+                days_until_monday = (7 - bd_date.weekday())
+                bd_date += timedelta(days=days_until_monday)
+            result.append((user, (bd_date - today).days))
         result = sorted(result, key = lambda pair: (pair[1], str(pair[0].name)))
         result = [pair[0] for pair in result]
         return result
 
+    @staticmethod
+    def _is_leap(year: int) -> bool:
+        return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+    def _records_by_birthday(self, month_days: list[tuple[int, int]]) -> Iterator[Record]:
+        """Returns records with birthday on the (month, day) pairs"""
+        self._ensure_indexes()
+        for month, day in month_days:
+            for key in self._birthday_index.get(month, day):
+                yield self.data[key]
+
+    def restore(self, key: str, record: Record | None) -> None:
+        """Apply a stored change: add or replace the record, None deletes the key"""
+        if record is None:
+            self.delete(key)
+        else:
+            self.add_record(record)
+
     def _normalize_name(self, name: str | Name) -> str:
         return str(name).strip().casefold()
 
@@ -288,3 +537,10 @@ class AddressBook(UserDict[str, Record]):
     
     def __setitem__(self, name: str, item: Record) -> None:
         raise KeyError("Error. Use method add_record()")
+
+    def __getstate__(self) -> dict:
+        return {"data": self.data}
+
+    def __setstate__(self, state: dict) -> None:
+        self.data = state["data"]
+        self._init_indexes()
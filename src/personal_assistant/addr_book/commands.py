@@ -3,13 +3,19 @@ import sys
 from pathlib import Path
 import types
 from colorama import Fore, Back, Style, init
+from contextlib import AbstractContextManager, nullcontext
 from functools import wraps
-from typing import Callable
+from itertools import chain
+from typing import Callable, Iterator
 from personal_assistant.addr_book import exceptions as excp
 from personal_assistant.addr_book.classes import AddressBook, Record, Phone, Email, PhoneFactory, EmailFactory, Birthday
-from personal_assistant.common import promt_pretty, read_command
+from personal_assistant.common import command_failed, iter_locked, promt_pretty, read_command
 from personal_assistant.addr_book.exceptions import ContactExist, BirthdayFormatError
 from personal_assistant.addr_book import views
+from personal_assistant.addr_book import importer
+from personal_assistant.addr_book import dedupe
+from personal_assistant.addr_book.snapshot import write_snapshot
+from personal_assistant import exporter
 from personal_assistant.views import draw_help
 
 
@@ -18,10 +24,15 @@ init(autoreset=True)
 ADDRESS_BOOK_COMMANDS_LIST = [
     types.SimpleNamespace(command="add <name>", cmd="add", description="add contact"),
     types.SimpleNamespace(command="search <criteria>", cmd="search", description="search contacts by name, phone, email, address"),
+    types.SimpleNamespace(command="lookup <phone|email>", cmd="lookup", description="find contacts by exact phone number or email"),
     types.SimpleNamespace(command="edit <name>", cmd="edit", description="edit contact"),
     types.SimpleNamespace(command="delete <name>", cmd="delete", description="delete contact"),
     types.SimpleNamespace(command="birthdays <days>", cmd="birthdays", description="show birthdays in coming days (default 7 days)"),
+    types.SimpleNamespace(command="dedupe", cmd="dedupe", description="find and merge duplicate contacts"),
     types.SimpleNamespace(command="all", cmd="all", description="show all contacts"),
+    types.SimpleNamespace(command="import <file> [--workers N]", cmd="import", description="import contacts from CSV or vCard (.vcf) file"),
+    types.SimpleNamespace(command="export <file> [criteria]", cmd="export", description="export contacts (all or found by criteria) to CSV or JSONL file"),
+    types.SimpleNamespace(command="snapshot <file>", cmd="snapshot", description="write read-only snapshot for fast lookups"),
     types.SimpleNamespace(command="help, ?", cmd="help", description="this help"),
     types.SimpleNamespace(command="back", cmd="back", description="back to main menu"),
     types.SimpleNamespace(command="close, exit, quit", cmd="close, exit, quit", description="exit")
@@ -36,11 +47,14 @@ def input_error(func):
         try:
             return func(*args, **kwargs)
         except excp.ApplicationBaseError as e:
+            command_failed(e.strerror)
             return f"{Fore.RED}{e.strerror}"
         except (ValueError, IndexError) as e:
+            command_failed("Wrong arguments for the command")
             if func.__name__ in funcs_local:
                 return f"{Fore.RED}Wrong arguments for the command. Type '?' for help."
         except Exception as e:
+            command_failed(f"Error: {e}")
             return f"{Fore.RED}Error: {e}"
     return wraper
 
@@ -58,9 +72,11 @@ def parse_input(line: str):
 
 
 @input_error
-def cmd_add_contact(book: AddressBook, args: list[str]) -> str:
+def cmd_add_contact(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: add <name>, fields are asked without lock"""
     name = " ".join(args)
-    found_contact = book.get(name)
+    with lock:
+        found_contact = book.get(name)
 
     if found_contact:
         raise ContactExist("Contact already exist!!")
@@ -75,7 +91,8 @@ def cmd_add_contact(book: AddressBook, args: list[str]) -> str:
     record.phones.extend(phones)
 
     if errors:
-        print(f"{Fore.RED}{", ".join(errors)}")
+        print(f"{Fore.RED}{', '.join(errors)}")
+        command_failed(", ".join(errors))
 
     email_str = promt_pretty("Emails", multiline=True)
     if email_str is None:
@@ -84,7 +101,8 @@ def cmd_add_contact(book: AddressBook, args: list[str]) -> str:
     record.emails.extend(emails)
 
     if errors:
-        print(f"{Fore.RED}{", ".join(errors)}")
+        print(f"{Fore.RED}{', '.join(errors)}")
+        command_failed(", ".join(errors))
 
     address = promt_pretty("Address", multiline=True)
     record.address = address
@@ -97,33 +115,83 @@ def cmd_add_contact(book: AddressBook, args: list[str]) -> str:
             record.birthday = birthday if birthday.casefold().strip() else None
     except BirthdayFormatError as err:
         print(f"{Fore.RED}{err.strerror}")
+        command_failed(err.strerror)
 
-    book.add_record(record)
+    with lock:
+        # another instance could add the contact meanwhile
+        if book.get(name) is not None:
+            raise ContactExist("Contact already exist!!")
+        book.add_record(record)
 
     return f"{Fore.GREEN}Contact saved."
 
 
+# Commands with a contact name argument
+NAME_ARGUMENT_COMMANDS = {"search", "edit", "delete"}
+
+
+def complete_argument(book: AddressBook, command: str, text: str) -> Iterator[tuple[str, str]]:
+    """Completions (name, phones) of the contact name argument of the command"""
+    if command in NAME_ARGUMENT_COMMANDS:
+        for record in book.complete_names(text):
+            yield record.name.value, ", ".join(phone.value for phone in record.phones)
+
+
 @input_error
-def cmd_search_contacts(book: AddressBook, args: list[str]):
+def cmd_search_contacts(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()):
+    """Command: search <criteria>, results are found page by page under lock and shown without it"""
     search_value = " ".join(args)
-    found_contacts = book.find(search_value)
+    found_contacts = iter_locked(book.iter_find(search_value), lock)
 
-    if not found_contacts:
+    first = next(found_contacts, None)
+    if first is None:
         raise excp.ContactNotFound()
 
-    views.draw_contacts(f"🔍 Search results for: '{search_value}'", found_contacts)
+    views.draw_contacts_pages(f"🔍 Search results for: '{search_value}'", chain([first], found_contacts))
     return ""
 
 
 @input_error
-def cmd_edit_contact(book: AddressBook, args: list[str]) -> str:
-    """Command: edit <name>"""
-    name = " ".join(args)
+def cmd_lookup_contacts(book: AddressBook, args: list[str]) -> str:
+    """Command: lookup <phone|email>"""
+    value = " ".join(args)
+    if not value.strip():
+        raise ValueError()
+    found_contacts = book.lookup(value)
+    if not found_contacts:
+        raise excp.ContactNotFound()
+
+    views.draw_contacts(f"🔍 Contacts with: '{value}'", found_contacts)
+    if len(found_contacts) > 1:
+        return f"{Fore.YELLOW}'{value}' is attached to {len(found_contacts)} contacts"
+    return ""
+
+
+def _current_record(book: AddressBook, name: str, state: tuple) -> Record:
+    """Record of the name if it wasn't changed since its state was taken (under lock)"""
     record = book.get(name)
-    if not record:
+    if record is None:
         raise excp.ContactNotFound(f"Contact '{name}' not found")
+    if record.__getstate__() != state:
+        raise excp.ContactChanged()
+    return record
+
+
+@input_error
+def cmd_edit_contact(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: edit <name>, fields are asked without lock"""
+    name = " ".join(args)
+    with lock:
+        record = book.get(name)
+        if not record:
+            raise excp.ContactNotFound(f"Contact '{name}' not found")
+        # the record can be reloaded or changed by another instance while the user edits it
+        state = record.__getstate__()
+        current_phones = str(record.phones)
+        current_emails = str(record.emails)
+        current_address = str(record.address)
+        current_birthday = str(record.birthday)
 
-    current_phones = str(record.phones)
     new_phones = promt_pretty("Phones", current_phones, multiline=True)
     if new_phones is None:
         raise excp.CancelCommand()
@@ -131,8 +199,8 @@ def cmd_edit_contact(book: AddressBook, args: list[str]) -> str:
     phones, errors = PhoneFactory.create(new_phones)
     if errors:
         print(f"{Fore.RED}{', '.join(errors)}")
+        command_failed(", ".join(errors))
 
-    current_emails = str(record.emails)
     new_emails = promt_pretty("Emails", current_emails, multiline=True)
     if new_emails is None:
         raise excp.CancelCommand()
@@ -140,52 +208,58 @@ def cmd_edit_contact(book: AddressBook, args: list[str]) -> str:
     emails, errors = EmailFactory.create(new_emails)
     if errors:
         print(f"{Fore.RED}{', '.join(errors)}")
+        command_failed(", ".join(errors))
 
-    current_address = str(record.address)
     new_address = promt_pretty("Address", current_address, multiline=True)
     if new_address is None:
         raise excp.CancelCommand()
 
-    current_birthday = str(record.birthday)
     new_birthday = promt_pretty("Birthday (DD.MM.YYYY)", current_birthday)
     if new_birthday is None:
         raise excp.CancelCommand()
 
-    birthday = str(record.birthday)
+    birthday = current_birthday
     try:
         new_birthday = new_birthday.casefold().strip()
         new_birthday = new_birthday if new_birthday else None
         birthday = str(Birthday(new_birthday)) if new_birthday else None
     except BirthdayFormatError as e:
         print(f"{Fore.RED}{e.strerror}")
+        command_failed(e.strerror)
 
     answer = read_command("Save changes (yes/no): ")
     if answer.casefold() not in ("yes", "y"):
         return ""
 
-    record.phones.clear()
-    record.phones.extend(phones)
-    record.emails.clear()
-    record.emails.extend(emails)
-    record.address = new_address
-    record.birthday = birthday
+    with lock:
+        record = _current_record(book, name, state)
+        record.phones.clear()
+        record.phones.extend(phones)
+        record.emails.clear()
+        record.emails.extend(emails)
+        record.address = new_address
+        record.birthday = birthday
     
     return f"{Fore.GREEN}Contact updated successfully!"
 
 
 @input_error
-def cmd_delete_contact(book: AddressBook, args: list[str]) -> str:
-    """Command: delete <name>"""
+def cmd_delete_contact(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: delete <name>, confirmation is asked without lock"""
     name = " ".join(args)
-    record = book.get(name)
-    if not record:
-        raise excp.ContactNotFound(f"Contact '{name}' not found")
+    with lock:
+        record = book.get(name)
+        if not record:
+            raise excp.ContactNotFound(f"Contact '{name}' not found")
+        state = record.__getstate__()
 
     views.draw_contacts(f"{Fore.RED}Contact to delete", [record])
 
     answer = read_command(f"Are you sure you want to delete this contact? (yes/no): ", color="ansired")
     if answer.casefold() in ("y", "yes"):
-        book.delete(name)
+        with lock:
+            _current_record(book, name, state)
+            book.delete(name)
         return f"{Fore.GREEN}Contact '{name}' deleted successfully!"
     
     return f"{Fore.RED}Contact deletion cancelled."
@@ -206,14 +280,105 @@ def cmd_birthdays(book: AddressBook, args: list[str]) -> str:
     return ""
 
 
+def choose_value(title: str, values: list[str]) -> str | None:
+    """Ask user to choose one of different values, returns None on quit and Ctrl+C"""
+    options = list(dict.fromkeys(values))
+    if len(options) == 1:
+        return options[0]
+    for i, value in enumerate(options, start=1):
+        print(f"  {i}. {value}")
+    while True:
+        answer = read_command(f"{title} [1-{len(options)}, Enter - 1, q - quit]: ", default="quit").strip()
+        if not answer:
+            return options[0]
+        if answer.isdigit() and 1 <= int(answer) <= len(options):
+            return options[int(answer) - 1]
+        if answer.casefold() in ("q", "quit"):
+            return None
+
+
 @input_error
-def cmd_show_all(book: AddressBook, args: list[str]) -> str:
+def cmd_dedupe_contacts(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: dedupe, data is read and merged under lock, questions are asked without it"""
+    with lock:
+        groups = dedupe.find_duplicates(book.values())
+    if not groups:
+        return f"{Fore.GREEN}No duplicate contacts found."
+
+    merged = 0
+    for n, group in enumerate(groups, start=1):
+        views.draw_contacts(f"Possible duplicates ({n} of {len(groups)})", group)
+        answer = read_command("Merge these contacts? (yes/no/quit): ", default="quit").strip().casefold()
+        if answer in ("q", "quit"):
+            break
+        if answer not in ("y", "yes"):
+            continue
+
+        name = choose_value("Name", [rec.name.value for rec in group])
+        birthdays = [str(rec.birthday) for rec in group if rec.birthday.value]
+        birthday = choose_value("Birthday", birthdays) if birthdays else None
+        addresses = [rec.address.value for rec in group if rec.address.value]
+        address = choose_value("Address", addresses) if addresses else None
+        if name is None or (birthdays and birthday is None) or (addresses and address is None):
+            # quit or Ctrl+C: the group is not merged
+            break
+
+        with lock:
+            # another instance could change the contacts while the user was choosing
+            if any(book.get(rec.name.value) is not rec for rec in group):
+                print(f"{Fore.YELLOW}Contacts were changed meanwhile, the group is skipped.")
+                continue
+            record = dedupe.merge_records(book, group, name=name, birthday=birthday, address=address)
+        views.draw_contacts("Merged contact", [record])
+        merged += 1
+
+    return f"{Fore.GREEN}Merged {merged} of {len(groups)} duplicate groups."
+
+
+@input_error
+def cmd_show_all(book: AddressBook, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
     """Command: all"""
-    contacts = list(book.values())
-    views.draw_contacts("Contact list", contacts)
+    with lock:
+        keys = list(book.keys())
+    records = (record for key in keys if (record := book.get(key)) is not None)
+    views.draw_contacts_pages("Contact list", iter_locked(records, lock))
     return ""
 
 
+@input_error
+def cmd_import_contacts(book: AddressBook, args: list[str]) -> str:
+    """Command: import <file> [--workers N]"""
+    workers = 0
+    if len(args) > 2 and args[-2] == "--workers":
+        workers = int(args[-1])
+        args = args[:-2]
+    path = Path(" ".join(args)).expanduser()
+
+    def print_error(error: importer.RowError):
+        print(f"{Fore.RED}Line {error.line} ({error.name}): {error.message}")
+
+    report = importer.import_file(book, path, workers=workers, on_error=print_error)
+    return f"{Fore.GREEN}{report}"
+
+
+@input_error
+def cmd_export_contacts(book: AddressBook, args: list[str]) -> str:
+    """Command: export <file> [criteria]"""
+    path, *criteria = args
+    count = exporter.export_contacts(book, Path(path).expanduser(), " ".join(criteria))
+    return f"{Fore.GREEN}Exported {count} contacts to '{path}'"
+
+
+@input_error
+def cmd_write_snapshot(book: AddressBook, args: list[str]) -> str:
+    """Command: snapshot <file>"""
+    path = Path(" ".join(args)).expanduser()
+    if not args:
+        raise ValueError()
+    count = write_snapshot(book, path)
+    return f"{Fore.GREEN}Snapshot with {count} contacts saved to '{path}'"
+
+
 def get_function_names():
     current_module = sys.modules[__name__]
     return [
@@ -1,49 +1,79 @@
+from contextlib import nullcontext
+from functools import partial
 from colorama import Fore, Back, Style, init
-from typing import cast
 from personal_assistant.addr_book.classes import AddressBook
 from personal_assistant.addr_book import commands
-from personal_assistant.common import get_data_path, read_command, load_data, save_data
+from personal_assistant.common import command_failed, get_data_path, is_batch, make_completer, read_command
+from personal_assistant.storage import open_storage
 
 
 init(autoreset=True)
 
 ADDR_BOOK_FILENAME = get_data_path("addressbook.pkl")
 
+# Commands waiting for the user (pages, questions) take the storage lock only to read and change data
+UNLOCKED_COMMANDS = {"add", "edit", "delete", "search", "all", "dedupe"}
+
 def main():
-    data = load_data(ADDR_BOOK_FILENAME)
-    book = cast(AddressBook, data) if data else AddressBook()
+    # batch mode saves at the end of the script and on 'commit' commands
+    batch = is_batch()
+    storage = open_storage(ADDR_BOOK_FILENAME, autosave=not batch)
+    book = storage.load(AddressBook)
     print(f"{Fore.CYAN}Addressbook contains {len(book.keys())} contacts")
 
+    completer = make_completer(commands.COMMAND_LIST, partial(commands.complete_argument, book))
+
     while True:
-        cmd_str = read_command("Book command: ", commands=commands.COMMAND_LIST)
+        cmd_str = read_command("Book command: ", completer=completer)
         if not cmd_str:
             command = None
             continue
         command, *args = commands.parse_input(cmd_str)
 
-        match command:
-            case "hello":
-                print(f"{Fore.BLUE}How can I help you?")
-            case "help" | "?":
-                commands.cmd_show_help()
-            case "add":
-                print(commands.cmd_add_contact(book, args))
-            case "search":
-                print(commands.cmd_search_contacts(book, args))
-            case "edit":
-                print(commands.cmd_edit_contact(book, args))
-            case "delete":
-                print(commands.cmd_delete_contact(book, args))
-            case "birthdays" | "bds":
-                print(commands.cmd_birthdays(book, args))
-            case "all":
-                print(commands.cmd_show_all(book, args))
-            case "close" | "exit" | "quit" | "back":
-                break
-            case _:
-                print(f"{Fore.RED}Invalid command.")
-
-    save_data(book, ADDR_BOOK_FILENAME)
+        # another instance could save the data since the last command
+        storage.refresh()
+        # autosave pickles data in background, commands change it under the lock
+        lock = nullcontext() if command in UNLOCKED_COMMANDS else storage.lock
+        with lock:
+            match command:
+                case "hello":
+                    print(f"{Fore.BLUE}How can I help you?")
+                case "help" | "?":
+                    commands.cmd_show_help()
+                case "add":
+                    print(commands.cmd_add_contact(book, args, storage.lock))
+                case "search":
+                    print(commands.cmd_search_contacts(book, args, storage.lock))
+                case "lookup":
+                    print(commands.cmd_lookup_contacts(book, args))
+                case "edit":
+                    print(commands.cmd_edit_contact(book, args, storage.lock))
+                case "delete":
+                    print(commands.cmd_delete_contact(book, args, storage.lock))
+                case "birthdays" | "bds":
+                    print(commands.cmd_birthdays(book, args))
+                case "dedupe":
+                    print(commands.cmd_dedupe_contacts(book, args, storage.lock))
+                case "all":
+                    print(commands.cmd_show_all(book, args, storage.lock))
+                case "import":
+                    print(commands.cmd_import_contacts(book, args))
+                case "export":
+                    print(commands.cmd_export_contacts(book, args))
+                case "snapshot":
+                    print(commands.cmd_write_snapshot(book, args))
+                case "commit":
+                    storage.commit()
+                case "close" | "exit" | "quit" | "back":
+                    break
+                case _:
+                    print(f"{Fore.RED}Invalid command.")
+                    command_failed("Invalid command")
+
+        if not batch:
+            storage.commit()
+
+    storage.close()
 
     return "exit" if command in {"close", "exit", "quit"} else None
 
@@ -0,0 +1,148 @@
+import re
+from difflib import SequenceMatcher
+from typing import Iterable
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.addr_book.exceptions import ContactExist
+
+
+# Names with similarity >= NAME_THRESHOLD are duplicates even without a shared phone or email
+NAME_THRESHOLD = 0.85
+# Phone and email blocks larger than this (e.g. a company switchboard number) are not compared,
+# larger name prefix blocks are split by longer prefixes
+MAX_BLOCK = 50
+# Length of name token prefixes in the fuzzy name blocking key
+NAME_PREFIX = 4
+
+
+def name_tokens(name: str) -> list[str]:
+    """Sorted casefolded words of the name"""
+    return sorted(re.findall(r"\w+", str(name).casefold()))
+
+
+def name_similarity(a: str, b: str) -> float:
+    """Similarity (0..1) of names ignoring case and word order"""
+    return SequenceMatcher(None, " ".join(name_tokens(a)), " ".join(name_tokens(b))).ratio()
+
+
+def blocking_keys(record: Record) -> set[str]:
+    """
+    Keys of blocks the record is compared in:
+    phones, emails, sorted name words and sorted prefixes of name words.
+    """
+    tokens = name_tokens(record.name.value)
+    keys = {f"phone:{phone.value}" for phone in record.phones}
+    keys |= {f"email:{email.value}" for email in record.emails}
+    if tokens:
+        keys.add("name:" + " ".join(tokens))
+        keys.add(prefix_key(tokens, NAME_PREFIX))
+    return keys
+
+
+def prefix_key(tokens: list[str], length: int) -> str:
+    return "prefix:" + " ".join(sorted(token[:length] for token in tokens))
+
+
+def split_block(records: list[Record], members: list[int], length: int) -> list[list[int]]:
+    """
+    Sub-blocks of a prefix block by name word prefixes one character longer.
+    Members with whole names in the prefixes are left out (they are in their name blocks).
+    """
+    sub_blocks: dict[str, list[int]] = {}
+    for n in members:
+        tokens = name_tokens(records[n].name.value)
+        if any(len(token) > length for token in tokens):
+            sub_blocks.setdefault(prefix_key(tokens, length + 1), []).append(n)
+    return list(sub_blocks.values())
+
+
+def is_duplicate(a: Record, b: Record) -> bool:
+    """Records share a phone or email, or have similar names"""
+    if set(a.phones) & set(b.phones) or set(a.emails) & set(b.emails):
+        return True
+    return name_similarity(a.name.value, b.name.value) >= NAME_THRESHOLD
+
+
+def find_duplicates(records: Iterable[Record]) -> list[list[Record]]:
+    """
+    Returns groups of duplicate records (2 and more records, in the original order).
+    Only records sharing a blocking key are compared, so the work is near-linear
+    in the number of records. Duplicates are transitive: a ~ b and b ~ c makes one group.
+    """
+    items: list[Record] = []
+    blocks: dict[str, list[int]] = {}
+    for record in records:
+        n = len(items)
+        items.append(record)
+        for key in blocking_keys(record):
+            blocks.setdefault(key, []).append(n)
+
+    parent = list(range(len(items)))
+
+    def find(n: int) -> int:
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    compared: set[tuple[int, int]] = set()
+    pending = [(key, members, NAME_PREFIX) for key, members in blocks.items()]
+    while pending:
+        key, members, length = pending.pop()
+        if len(members) < 2:
+            continue
+        if key.startswith("name:"):
+            # same name words, all are duplicates of the first one
+            for b in members[1:]:
+                parent[find(b)] = find(members[0])
+            continue
+        if len(members) > MAX_BLOCK:
+            if key.startswith("prefix:"):
+                pending.extend((key, sub_block, length + 1) for sub_block in split_block(items, members, length))
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in compared or find(a) == find(b):
+                    continue
+                compared.add((a, b))
+                if is_duplicate(items[a], items[b]):
+                    parent[find(b)] = find(a)
+
+    groups: dict[int, list[Record]] = {}
+    for n, record in enumerate(items):
+        groups.setdefault(find(n), []).append(record)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def merge_records(book: AddressBook, records: list[Record], name: str | None = None,
+                  birthday: str | None = None, address: str | None = None) -> Record:
+    """
+    Merge records into the first one: union of phones and emails, given birthday and address
+    (first known value if not given). Other records are deleted from the book.
+    If name is given the merged record is saved under the name,
+    ContactExist is raised (nothing is changed) if another contact has the name.
+    """
+    target, others = records[0], records[1:]
+    if name is not None:
+        existing = book.get(name)
+        if existing is not None and all(existing is not rec for rec in records):
+            raise ContactExist(f"Contact '{name}' already exist")
+    if birthday is None:
+        birthday = next((str(rec.birthday) for rec in records if rec.birthday.value), None)
+    if address is None:
+        address = next((rec.address.value for rec in records if rec.address.value), None)
+
+    for rec in others:
+        book.delete(rec.name.value)
+    if name is not None and book._normalize_name(name) != book._normalize_name(target.name):
+        book.delete(target.name.value)
+        merged = Record(name)
+        merged.phones.extend(target.phones)
+        merged.emails.extend(target.emails)
+        target = merged
+
+    target.phones.extend(phone for rec in others for phone in rec.phones)
+    target.emails.extend(email for rec in others for email in rec.emails)
+    target.birthday = birthday
+    target.address = address
+    book.add_record(target)
+    return target
@@ -12,6 +12,11 @@ class ContactExist(ContactBaseError):
         super().__init__(msg, args)
 
 
+class ContactChanged(ContactBaseError):
+    def __init__(self, msg: str = "Contact was changed by another instance, try again", *args: object) -> None:
+        super().__init__(msg, args)
+
+
 class PhoneFormatError(ContactBaseError):
     def __init__(self, msg: str = "Phone format error", *args: object) -> None:
         super().__init__(msg, args)
@@ -25,3 +30,18 @@ class EmailFormatError(ContactBaseError):
 class BirthdayFormatError(ContactBaseError):
     def __init__(self, msg: str = "Date format error", *args: object) -> None:
         super().__init__(msg, args)
+
+
+class ImportFormatError(ContactBaseError):
+    def __init__(self, msg: str = "Import file format error", *args: object) -> None:
+        super().__init__(msg, args)
+
+
+class SnapshotFormatError(ContactBaseError):
+    def __init__(self, msg: str = "Snapshot file format error", *args: object) -> None:
+        super().__init__(msg, args)
+
+
+class ReadOnlyError(ContactBaseError):
+    def __init__(self, msg: str = "Address book is read-only", *args: object) -> None:
+        super().__init__(msg, args)
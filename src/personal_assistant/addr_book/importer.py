@@ -0,0 +1,254 @@
+import csv
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+from personal_assistant.addr_book import exceptions as excp
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory, EmailFactory
+
+
+BATCH_SIZE = 1000
+
+CSV_COLUMNS = {
+    "name": ("name", "full name", "fn"),
+    "phones": ("phones", "phone", "tel"),
+    "emails": ("emails", "email", "e-mail"),
+    "birthday": ("birthday", "bday", "birth date"),
+    "address": ("address", "adr", "post address"),
+}
+
+
+class ContactRow(NamedTuple):
+    """Raw contact from import file, line is the number of the first line of the contact"""
+    line: int
+    name: str
+    phones: str = ""
+    emails: str = ""
+    birthday: str = ""
+    address: str = ""
+
+
+class RowError(NamedTuple):
+    """Import error for the contact starting at line"""
+    line: int
+    name: str
+    message: str
+
+
+class ImportReport:
+    """Import result: number of imported contacts and errors (if not passed to on_error)"""
+    def __init__(self):
+        self.imported = 0
+        self.rows = 0
+        self.error_count = 0
+        self.errors: list[RowError] = []
+
+    def add_error(self, error: RowError) -> None:
+        self.error_count += 1
+        self.errors.append(error)
+
+    def __str__(self) -> str:
+        return f"Imported {self.imported} of {self.rows} contacts, {self.error_count} errors"
+
+
+def normalize_birthday(value: str) -> str:
+    """Convert ISO dates (YYYY-MM-DD, YYYYMMDD) to DD.MM.YYYY"""
+    value = value.strip()
+    match = re.fullmatch(r"(\d{4})-?(\d{2})-?(\d{2})", value)
+    if match:
+        year, month, day = match.groups()
+        return f"{day}.{month}.{year}"
+    return value
+
+
+def read_csv(path: Path | str) -> Iterator[ContactRow]:
+    """
+    Read contacts from CSV file with header.
+    Columns: name, phones, emails, birthday, address (other columns are ignored).
+    Several phones or emails in a cell are separated by ',' or ';'.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [column.strip().casefold() for column in header]
+        columns: dict[str, int] = {}
+        for field, names in CSV_COLUMNS.items():
+            for i, column in enumerate(header):
+                if column in names:
+                    columns[field] = i
+                    break
+        if "name" not in columns:
+            raise excp.ImportFormatError("CSV file must have 'name' column")
+
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            fields = {
+                field: values[i].strip() if i < len(values) else ""
+                for field, i in columns.items()
+            }
+            yield ContactRow(line=reader.line_num, **fields)
+
+
+def _unescape_vcard(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _unfold_vcard(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Join folded lines (continuation lines start with space or tab)"""
+    current = None
+    current_no = 0
+    for no, line in enumerate(lines, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_no, current
+        current, current_no = line, no
+    if current is not None:
+        yield current_no, current
+
+
+def read_vcard(path: Path | str) -> Iterator[ContactRow]:
+    """
+    Read contacts from vCard file (versions 2.1, 3.0, 4.0).
+    Uses FN (or N), TEL, EMAIL, BDAY and ADR properties.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        card: dict[str, list[str]] | None = None
+        start = 0
+        for no, line in _unfold_vcard(f):
+            if ":" not in line:
+                continue
+            prop, value = line.split(":", 1)
+            name = prop.split(";", 1)[0].split(".")[-1].upper()
+
+            if name == "BEGIN" and value.strip().upper() == "VCARD":
+                card, start = {}, no
+            elif name == "END" and value.strip().upper() == "VCARD" and card is not None:
+                full_name = (card.get("FN") or [""])[0]
+                if not full_name and card.get("N"):
+                    parts = [p.strip() for p in card["N"][0].split(";")]
+                    full_name = " ".join(p for p in parts[1:2] + parts[:1] if p)
+                yield ContactRow(
+                    line=start,
+                    name=_unescape_vcard(full_name).strip(),
+                    phones=",".join(_unescape_vcard(v) for v in card.get("TEL", [])),
+                    emails=",".join(_unescape_vcard(v) for v in card.get("EMAIL", [])),
+                    birthday=normalize_birthday((card.get("BDAY") or [""])[0]),
+                    address="\n".join(
+                        ", ".join(_unescape_vcard(p).strip() for p in re.split(r"(?<!\\);", v) if p.strip())
+                        for v in card.get("ADR", [])
+                    ),
+                )
+                card = None
+            elif card is not None:
+                card.setdefault(name, []).append(value.strip())
+
+
+READERS: dict[str, Callable[[Path | str], Iterator[ContactRow]]] = {
+    ".csv": read_csv,
+    ".vcf": read_vcard,
+    ".vcard": read_vcard,
+}
+
+
+def read_contacts(path: Path | str) -> Iterator[ContactRow]:
+    """Read contacts from CSV or vCard file (format by file extension)"""
+    reader = READERS.get(Path(path).suffix.casefold())
+    if reader is None:
+        raise excp.ImportFormatError(f"Unknown file format '{Path(path).suffix}'. Use .csv or .vcf")
+    return reader(path)
+
+
+def validate_row(row: ContactRow) -> tuple[Record | None, list[str]]:
+    """
+    Create record from row.
+    Returns record (None if row can't be imported) and list of errors.
+    """
+    if not row.name.strip():
+        return None, ["Contact name is empty"]
+
+    errors = []
+    record = Record(row.name)
+    phones, phone_errors = PhoneFactory.create(row.phones.replace(";", ","))
+    record.phones.extend(phones)
+    errors.extend(phone_errors)
+
+    emails, email_errors = EmailFactory.create(row.emails.replace(";", ","))
+    record.emails.extend(emails)
+    errors.extend(email_errors)
+
+    if row.birthday.strip():
+        try:
+            record.birthday = normalize_birthday(row.birthday)
+        except excp.BirthdayFormatError as e:
+            errors.append(f"{e.strerror}: '{row.birthday}'")
+
+    if row.address.strip():
+        record.address = row.address
+
+    return record, errors
+
+
+def import_contacts(
+    book: AddressBook,
+    rows: Iterable[ContactRow],
+    batch_size: int = BATCH_SIZE,
+    workers: int = 0,
+    on_error: Callable[[RowError], None] | None = None,
+) -> ImportReport:
+    """
+    Validate rows in batches and add contacts to the book.
+    Only one batch is kept in memory, workers > 1 validates batches in a process pool.
+    Existing contacts (and repeated names) are skipped.
+    Errors are passed to on_error or collected in the report.
+    """
+    report = ImportReport()
+
+    def report_error(error: RowError) -> None:
+        if on_error is None:
+            report.add_error(error)
+        else:
+            report.error_count += 1
+            on_error(error)
+
+    rows = iter(rows)
+    executor = None
+    if workers > 1:
+        # multiprocessing is heavy to import, it is needed for parallel import only
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers)
+
+    try:
+        while batch := list(islice(rows, batch_size)):
+            if executor is not None:
+                chunksize = max(1, len(batch) // (workers * 4))
+                results = executor.map(validate_row, batch, chunksize=chunksize)
+            else:
+                results = map(validate_row, batch)
+
+            for row, (record, errors) in zip(batch, results):
+                report.rows += 1
+                for message in errors:
+                    report_error(RowError(row.line, row.name, message))
+                if record is None:
+                    continue
+                if record.name.value.casefold() in book:
+                    report_error(RowError(row.line, row.name, "Contact already exist"))
+                    continue
+                book.add_record(record)
+                report.imported += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return report
+
+
+def import_file(book: AddressBook, path: Path | str, **kwargs) -> ImportReport:
+    """Import contacts from CSV or vCard file, see import_contacts() for options"""
+    return import_contacts(book, read_contacts(path), **kwargs)
@@ -0,0 +1,312 @@
+import mmap
+import struct
+import weakref
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator
+from personal_assistant.addr_book import exceptions as excp
+from personal_assistant.addr_book.classes import AddressBook, Record, Phone, Email
+from personal_assistant.common import atomic_open
+from personal_assistant.indexes import DayOfYearIndex, COMPLETION_LIMIT
+
+
+MAGIC = b"PABSNAP1"
+VERSION = 1
+
+# Header: magic, version, number of records, then (offset, length) of every section
+HEADER = struct.Struct("<8sIQ")
+SECTION = struct.Struct("<QQ")
+
+# Text columns are stored as offsets (uint64, count + 1) and utf-8 data
+TEXT_COLUMNS = ("key", "name", "phones", "emails", "address", "search")
+SECTIONS = (
+    *(f"{column}.{part}" for column in TEXT_COLUMNS for part in ("offsets", "data")),
+    "order",        # uint32 record numbers sorted by key bytes
+    "birthday",     # int32 date ordinal, 0 - no birthday
+    "flags",        # uint8, FLAG_NO_ADDRESS
+    "bd.buckets",   # uint32 start of every day of year in bd.order (DayOfYearIndex.DAYS + 1)
+    "bd.order",     # uint32 record numbers sorted by day of year of birthday
+)
+FLAG_NO_ADDRESS = 1
+
+ALIGN = 8
+
+
+def _search_blob(record: Record) -> str:
+    # fields are separated (and terminated) by \0, so a match never spans two fields or records
+    return "\0".join(AddressBook._search_texts(record)) + "\0"
+
+
+def write_snapshot(book: AddressBook, path: Path | str) -> int:
+    """
+    Write read-only columnar snapshot of the book, returns number of records.
+    The file is replaced atomically (see atomic_open).
+    """
+    texts = {column: (array("Q", [0]), bytearray()) for column in TEXT_COLUMNS}
+    birthdays = array("i")
+    flags = bytearray()
+    slots: list[list[int]] = [[] for _ in range(DayOfYearIndex.DAYS)]
+
+    def add_text(column: str, text: str) -> None:
+        offsets, data = texts[column]
+        data += text.encode("utf-8")
+        offsets.append(len(data))
+
+    count = 0
+    for record in book.values():
+        add_text("key", book._normalize_name(record.name))
+        add_text("name", record.name.value)
+        add_text("phones", "\n".join(phone.value for phone in record.phones))
+        add_text("emails", "\n".join(email.value for email in record.emails))
+        add_text("address", record.address.value or "")
+        add_text("search", _search_blob(record))
+        flags.append(FLAG_NO_ADDRESS if record.address.value is None else 0)
+        bd = record.birthday.value
+        birthdays.append(bd.toordinal() if bd else 0)
+        if bd:
+            slots[DayOfYearIndex.slot(bd.month, bd.day)].append(count)
+        count += 1
+
+    key_offsets, key_data = texts["key"]
+    order = array("I", sorted(range(count), key=lambda i: key_data[key_offsets[i]:key_offsets[i + 1]]))
+    buckets = array("I", [0])
+    bd_order = array("I")
+    for slot in slots:
+        bd_order.extend(slot)
+        buckets.append(len(bd_order))
+
+    sections = {
+        **{f"{column}.offsets": offsets.tobytes() for column, (offsets, _) in texts.items()},
+        **{f"{column}.data": bytes(data) for column, (_, data) in texts.items()},
+        "order": order.tobytes(),
+        "birthday": birthdays.tobytes(),
+        "flags": bytes(flags),
+        "bd.buckets": buckets.tobytes(),
+        "bd.order": bd_order.tobytes(),
+    }
+
+    with atomic_open(path) as f:
+        position = HEADER.size + SECTION.size * len(SECTIONS)
+        table = []
+        for name in SECTIONS:
+            position += -position % ALIGN
+            table.append((position, len(sections[name])))
+            position += len(sections[name])
+
+        f.write(HEADER.pack(MAGIC, VERSION, count))
+        for offset, length in table:
+            f.write(SECTION.pack(offset, length))
+        for name, (offset, length) in zip(SECTIONS, table):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sections[name])
+    return count
+
+
+class SnapshotAddressBook(AddressBook):
+    """
+    Read-only address book over a memory mapped snapshot (see write_snapshot).
+    Opening maps the file only, records are created for found keys and search hits.
+    Several processes opening the same snapshot share the page cache.
+    """
+    def __init__(self, path: Path | str):
+        self.data = {}
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._records: weakref.WeakValueDictionary[int, Record] = weakref.WeakValueDictionary()
+
+        try:
+            magic, version, self._count = HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic, version = b"", 0
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise excp.SnapshotFormatError(f"'{self.path}' is not an address book snapshot")
+
+        self._sections: dict[str, tuple[int, int]] = {}
+        for i, name in enumerate(SECTIONS):
+            self._sections[name] = SECTION.unpack_from(self._mmap, HEADER.size + SECTION.size * i)
+
+        self._offsets = {column: self._array(f"{column}.offsets", "Q") for column in TEXT_COLUMNS}
+        self._order = self._array("order", "I")
+        self._birthdays = self._array("birthday", "i")
+        self._flags = self._section("flags")
+        self._bd_buckets = self._array("bd.buckets", "I")
+        self._bd_order = self._array("bd.order", "I")
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def _array(self, name: str, typecode: str) -> memoryview:
+        return self._section(name).cast(typecode)
+
+    def _bytes(self, column: str, i: int) -> bytes:
+        offsets = self._offsets[column]
+        start = self._sections[f"{column}.data"][0]
+        return self._mmap[start + offsets[i]:start + offsets[i + 1]]
+
+    def _text(self, column: str, i: int) -> str:
+        return str(self._bytes(column, i), "utf-8")
+
+    def _record(self, i: int) -> Record:
+        """Create record number i (the same object while it is referenced)"""
+        record = self._records.get(i)
+        if record is not None:
+            return record
+
+        phones = self._text("phones", i)
+        emails = self._text("emails", i)
+        bd = self._birthdays[i]
+        record = Record.__new__(Record)
+        record.__setstate__((
+            self._text("name", i),
+            tuple(phones.split("\n")) if phones else (),
+            tuple(emails.split("\n")) if emails else (),
+            bd or None,
+            None if self._flags[i] & FLAG_NO_ADDRESS else self._text("address", i),
+        ))
+        self._records[i] = record
+        return record
+
+    def _lower_bound(self, target: bytes) -> int:
+        """Binary search, returns position in order of the first key >= target"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes("key", self._order[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find_key(self, key: str) -> int | None:
+        """Binary search of the key, returns record number"""
+        target = key.encode("utf-8")
+        position = self._lower_bound(target)
+        if position < self._count:
+            i = self._order[position]
+            if self._bytes("key", i) == target:
+                return i
+        return None
+
+    def complete_names(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[Record]:
+        """Contacts with the name starting with the prefix (binary search of sorted keys)"""
+        target = self._normalize_prefix(prefix).encode("utf-8")
+        result = []
+        position = self._lower_bound(target)
+        while position < self._count and len(result) < limit:
+            i = self._order[position]
+            if not self._bytes("key", i).startswith(target):
+                break
+            result.append(self._record(i))
+            position += 1
+        return result
+
+    def iter_find(self, criteria: str) -> Iterator[Record]:
+        """
+        Search for a contact using criteria.
+        Search texts are scanned in the mapped file, records are created for matches only.
+        """
+        needle = criteria.casefold().encode("utf-8")
+        offsets = self._offsets["search"]
+        start, length = self._sections["search.data"]
+        position, end = start, start + length
+        while position < end:
+            position = self._mmap.find(needle, position, end)
+            if position < 0:
+                return
+            i = bisect_right(offsets, position - start) - 1
+            yield self._record(i)
+            position = start + offsets[i + 1]
+
+    def lookup(self, value: str) -> list[Record]:
+        """Exact search by phone number or email: substring search verified by the record values"""
+        value = str(value).strip()
+        if "@" in value:
+            email = Email._clear_email(value)
+            return [rec for rec in self.iter_find(email) if any(e.value == email for e in rec.emails)]
+        phone = Phone._clear_phone(value)
+        if not phone:
+            return []
+        return [rec for rec in self.iter_find(phone) if any(p.value == phone for p in rec.phones)]
+
+    def shared_contacts(self) -> Iterator[tuple[str, list[Record]]]:
+        for column in ("phones", "emails"):
+            owners: dict[str, list[int]] = {}
+            for i in range(self._count):
+                text = self._text(column, i)
+                for value in set(text.split("\n")) if text else ():
+                    owners.setdefault(value, []).append(i)
+            for value, numbers in owners.items():
+                if len(numbers) > 1:
+                    yield value, [self._record(i) for i in numbers]
+
+    def _records_by_birthday(self, month_days: list[tuple[int, int]]) -> Iterator[Record]:
+        for month, day in month_days:
+            slot = DayOfYearIndex.slot(month, day)
+            for n in range(self._bd_buckets[slot], self._bd_buckets[slot + 1]):
+                yield self._record(self._bd_order[n])
+
+    def get(self, key, default=None):
+        i = self._find_key(self._normalize_name(key))
+        return default if i is None else self._record(i)
+
+    def __getitem__(self, name: str) -> Record:
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __contains__(self, name: object) -> bool:
+        return self._find_key(self._normalize_name(str(name))) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._text("key", i)
+
+    def values(self) -> Iterator[Record]:
+        """Returns records in insertion order"""
+        return (self._record(i) for i in range(self._count))
+
+    def add_record(self, record: Record):
+        raise excp.ReadOnlyError()
+
+    def delete(self, name: str):
+        raise excp.ReadOnlyError()
+
+    def restore(self, key: str, record: Record | None) -> None:
+        raise excp.ReadOnlyError()
+
+    def close(self) -> None:
+        """Release the mapped file, records created before stay valid"""
+        if self._mmap.closed:
+            return
+        for name in ("_offsets",):
+            for view in getattr(self, name, {}).values():
+                view.release()
+        for name in ("_order", "_birthdays", "_flags", "_bd_buckets", "_bd_order"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "SnapshotAddressBook":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        raise TypeError("SnapshotAddressBook can't be pickled")
+
+
+def open_snapshot(path: Path | str) -> SnapshotAddressBook:
+    """Open snapshot file written by write_snapshot"""
+    return SnapshotAddressBook(path)
@@ -1,7 +1,8 @@
 from colorama import Fore, Back, Style, init
 from personal_assistant.addr_book.classes import Record
 from personal_assistant.addr_book.classes import Record
-from personal_assistant.common import draw_table
+from typing import Iterable
+from personal_assistant.common import draw_table, draw_table_pages
 
 
 def contact_info_format(rec: Record) -> str:
@@ -53,3 +54,12 @@ def draw_contacts(caption: str, contact_list: list[Record]):
         columns_config = CONTACT_TABLE_CONFIG,
         data = contact_list
     )
+
+
+def draw_contacts_pages(caption: str, contacts: Iterable[Record]):
+    """Print contacts page by page"""
+    draw_table_pages(
+        title = caption,
+        columns_config = CONTACT_TABLE_CONFIG,
+        data = contacts
+    )
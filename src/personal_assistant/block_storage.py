@@ -0,0 +1,254 @@
+import os
+import pickle
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO
+from personal_assistant.common import file_lock
+from personal_assistant.notes.classes import NoteRecord
+from personal_assistant.storage import JournalStorage, COMPACT_SIZE
+
+
+# Shorter texts are kept in the snapshot and the journal
+INLINE_BODY_SIZE = 256
+# Characters of bodies kept in memory by the LRU cache
+BODY_CACHE_SIZE = 4 * 1024 * 1024
+
+
+class BodyFile:
+    """
+    One generation of the block file, opened for reading.
+    The file stays readable after it was deleted by compaction (while references to it exist).
+    """
+    def __init__(self, path: Path, generation: int):
+        self.path = path
+        self.generation = generation
+        self._lock = threading.Lock()
+        try:
+            self._file: BinaryIO | None = open(path, "rb")
+        except FileNotFoundError:
+            self._file = None
+        else:
+            weakref.finalize(self, self._file.close)
+
+    @property
+    def exists(self) -> bool:
+        return self._file is not None
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self._file is None:
+            raise FileNotFoundError(f"Note body file '{self.path}' not found")
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        if len(data) != length:
+            raise EOFError(f"Note body at {offset} in '{self.path}' is truncated")
+        return data
+
+
+class BodyRef:
+    """
+    Reference to a note body in the block file.
+    Pickled by BlockStorage as a persistent ID, plain pickle stores the text itself.
+    """
+    __slots__ = ("store", "file", "offset", "length")
+
+    def __init__(self, store: "BodyStore", file: BodyFile, offset: int, length: int):
+        self.store = store
+        self.file = file
+        self.offset = offset
+        self.length = length
+
+    def read(self) -> str:
+        return self.store.read(self)
+
+    def __reduce__(self):
+        return str, (self.read(),)
+
+
+class BodyStore:
+    """
+    Note bodies in append-only block files <stem>.<generation>.bodies next to the snapshot.
+    Bodies are utf-8 blocks addressed by (generation, offset, length),
+    read on demand and kept in an LRU cache of cache_size characters.
+    Compaction copies live bodies to a new generation and deletes the old files.
+    Bodies are appended under the exclusive file lock of the storage.
+    """
+    def __init__(self, path: Path | str, cache_size: int = BODY_CACHE_SIZE, min_size: int = INLINE_BODY_SIZE):
+        path = Path(path)
+        self.directory = path.parent
+        self.stem = path.stem
+        self.cache_size = cache_size
+        self.min_size = min_size
+        self.generation = 0
+        self._files: dict[int, BodyFile] = {}
+        self._writer: BinaryIO | None = None
+        self._written = False
+        self._cache: OrderedDict[tuple[int, int], str] = OrderedDict()
+        self._cached_size = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def path(self, generation: int) -> Path:
+        return self.directory / f"{self.stem}.{generation}.bodies"
+
+    def generations(self) -> list[int]:
+        pattern = re.compile(re.escape(self.stem) + r"\.([0-9]+)\.bodies")
+        return sorted(int(m.group(1)) for p in self.directory.glob(f"{self.stem}.*.bodies")
+                      if (m := pattern.fullmatch(p.name)))
+
+    def refresh(self) -> None:
+        """Append to the newest generation (another process could compact the bodies)"""
+        generation = max(self.generations(), default=0)
+        if generation != self.generation:
+            self._close_writer()
+            self.generation = generation
+
+    def file(self, generation: int) -> BodyFile:
+        file = self._files.get(generation)
+        if file is None or not file.exists:
+            file = self._files[generation] = BodyFile(self.path(generation), generation)
+        return file
+
+    def ref(self, generation: int, offset: int, length: int) -> BodyRef:
+        return BodyRef(self, self.file(generation), offset, length)
+
+    def store(self, text: str | BodyRef) -> str | BodyRef:
+        """Body to keep in a note: reference for long texts and texts of old generations"""
+        if isinstance(text, BodyRef):
+            if text.file.generation == self.generation:
+                return text
+            text = text.read()
+        if len(text) < self.min_size:
+            return text
+        return self.append(text)
+
+    def append(self, text: str) -> BodyRef:
+        if self._writer is None:
+            self._writer = open(self.path(self.generation), "ab", buffering=0)
+        data = memoryview(text.encode("utf-8"))
+        offset = self._writer.seek(0, os.SEEK_END)
+        while data:
+            data = data[self._writer.write(data):]
+        self._written = True
+        ref = self.ref(self.generation, offset, self._writer.tell() - offset)
+        self._remember(ref, text)
+        return ref
+
+    def sync(self, fsync: bool = True) -> None:
+        """Persist appended bodies (before the snapshot or journal entries referencing them)"""
+        if self._written and self._writer is not None and fsync:
+            os.fsync(self._writer.fileno())
+        self._written = False
+
+    def read(self, ref: BodyRef) -> str:
+        key = (ref.file.generation, ref.offset)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                return text
+        text = str(ref.file.read(ref.offset, ref.length), "utf-8")
+        self._remember(ref, text)
+        return text
+
+    def _remember(self, ref: BodyRef, text: str) -> None:
+        if len(text) > self.cache_size:
+            return
+        with self._lock:
+            key = (ref.file.generation, ref.offset)
+            if key in self._cache:
+                return
+            self._cache[key] = text
+            self._cached_size += len(text)
+            while self._cached_size > self.cache_size:
+                _, old = self._cache.popitem(last=False)
+                self._cached_size -= len(old)
+
+    def start_generation(self) -> None:
+        """Append to a new generation file (compaction)"""
+        self._close_writer()
+        self.generation = max(self.generations(), default=self.generation) + 1
+
+    def remove_old_generations(self) -> None:
+        """Delete block files of generations before the current one"""
+        for generation in self.generations():
+            if generation < self.generation:
+                try:
+                    self.path(generation).unlink()
+                except OSError:
+                    # still open by another process on Windows, deleted by the next compaction
+                    pass
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self) -> None:
+        self._close_writer()
+
+
+class _BodyPickler(pickle.Pickler):
+    def __init__(self, f: BinaryIO, store: BodyStore):
+        super().__init__(f)
+        self.store = store
+
+    def persistent_id(self, obj: Any) -> Any:
+        if type(obj) is NoteRecord:
+            obj._store_text(self.store)
+        elif type(obj) is BodyRef:
+            return ("body", obj.file.generation, obj.offset, obj.length)
+        return None
+
+
+class _BodyUnpickler(pickle.Unpickler):
+    def __init__(self, f: BinaryIO, store: BodyStore):
+        super().__init__(f)
+        self.store = store
+
+    def persistent_load(self, pid: Any) -> Any:
+        kind, generation, offset, length = pid
+        if kind != "body":
+            raise pickle.UnpicklingError(f"Unknown persistent ID {kind!r}")
+        return self.store.ref(generation, offset, length)
+
+
+class BlockStorage(JournalStorage):
+    """
+    Journal storage with note bodies out of line (see BodyStore).
+    Snapshot and journal keep IDs, titles and tags of notes and references to bodies,
+    so loading and memory depend on the number of notes, not on the volume of their texts.
+    Bodies are read when text of a note is used (edit, all, full-text search).
+    """
+    def __init__(self, path: Path | str, compact_size: int = COMPACT_SIZE, fsync: bool = True,
+                 cache_size: int = BODY_CACHE_SIZE):
+        super().__init__(path, compact_size, fsync)
+        self.bodies = BodyStore(self.path, cache_size)
+
+    def _dump(self, obj: Any, f: BinaryIO) -> None:
+        _BodyPickler(f, self.bodies).dump(obj)
+
+    def _sync(self) -> None:
+        self.bodies.sync(self.fsync)
+
+    def _load(self, f: BinaryIO) -> Any:
+        return _BodyUnpickler(f, self.bodies).load()
+
+    def _read(self, factory):
+        self.bodies.refresh()
+        return super()._read(factory)
+
+    def compact(self) -> None:
+        """Rewrite the snapshot with live bodies in a new block file, truncate the journal"""
+        with file_lock(self.path), self.lock:
+            self._catch_up(truncate=True)
+            self.bodies.start_generation()
+            super().compact()
+            self.bodies.remove_old_generations()
+
+    def close(self) -> None:
+        super().close()
+        self.bodies.close()
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results for one generation of the data.
+    Entries of older generations are never returned: the cache is cleared
+    when it is used with a new generation.
+    """
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get_or_compute(self, key: Hashable, generation: int, compute: Callable[[], Any]) -> Any:
+        if generation != self.generation:
+            self._entries.clear()
+            self.generation = generation
+        try:
+            result = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = compute()
+        if self.maxsize > 0:
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedQueries:
+    """
+    Mixin of observable containers with cached queries (see cached_query).
+    Every change notification of the container (added, deleted or changed record)
+    advances generation, so cached results are valid until the next change.
+    Set QUERY_CACHE_SIZE = 0 to disable caching (e.g. data changed by other processes).
+    """
+    QUERY_CACHE_SIZE = 128
+    generation = 0
+
+    @property
+    def query_cache(self) -> QueryCache:
+        cache = self.__dict__.get("_query_cache")
+        if cache is None:
+            cache = self.__dict__["_query_cache"] = QueryCache(self.QUERY_CACHE_SIZE)
+        return cache
+
+    def _notify(self, *args: Any) -> None:
+        self.generation += 1
+        super()._notify(*args)
+
+
+def cached_query(key: Callable[..., Hashable] | None = None) -> Callable:
+    """
+    Decorator of CachedQueries methods returning lists: results are cached by arguments
+    (or by key(self, *args, **kwargs)), a copy of the cached list is returned.
+    Calls with unhashable arguments are not cached.
+    """
+    def decorator(method: Callable[..., list]) -> Callable[..., list]:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.query_cache
+            if cache.maxsize <= 0:
+                return method(self, *args, **kwargs)
+            cache_key = (method.__name__, key(self, *args, **kwargs) if key else (args, tuple(kwargs.items())))
+            try:
+                hash(cache_key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+            return list(cache.get_or_compute(cache_key, self.generation, lambda: method(self, *args, **kwargs)))
+        return wrapper
+    return decorator
@@ -1,45 +1,215 @@
+import gc
+import os
 import pickle
-from collections import UserList
-from typing import Generic, TypeVar, Iterable, List, Dict, Any
+import threading
+from collections.abc import Iterator, MutableSequence
+from contextlib import contextmanager
+from functools import cache
+from itertools import islice
+from typing import Generic, TypeVar, Iterable, List, Dict, Any, BinaryIO, Callable, TYPE_CHECKING
 from pathlib import Path
-from appdirs import user_data_dir
-from colorama import Fore, Back, Style, init
-from prompt_toolkit import prompt, PromptSession
-from prompt_toolkit.completion import WordCompleter, Completer, Completion
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.shortcuts import CompleteStyle
-from rich.console import Console
-from rich.table import Table
-from rich.text import Text
-import rich.box as box
+from personal_assistant.compression import compressed_writer, compression_from_env, open_reader, parse_compression
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks (Windows)
+    fcntl = None
+
+# rich and prompt_toolkit are imported on first use: they are slow to import
+# and not needed by data classes, tests and scripts
+if TYPE_CHECKING:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.completion import Completer
+    from rich.console import Console
+    from rich.table import Table
 
 
 T = TypeVar('T')
 
 
-class UniqueList(UserList, Generic[T]):
+class Observable:
+    """
+    Keeps a list of observers and notifies them about changes.
+    Observers are not pickled, owners subscribe again after loading.
+    Classes with __slots__ must have '_observers' slot.
+    """
+    __slots__ = ()
+    _observers: list[Callable[..., None]]
+
+    def subscribe(self, observer: Callable[..., None]) -> None:
+        observers = getattr(self, "_observers", None)
+        if observers is None:
+            observers = self._observers = []
+        if observer not in observers:
+            observers.append(observer)
+
+    def unsubscribe(self, observer: Callable[..., None]) -> None:
+        observers = getattr(self, "_observers", None)
+        if observers and observer in observers:
+            observers.remove(observer)
+
+    @contextmanager
+    def muted(self) -> Iterator[None]:
+        """Don't notify observers in the block (e.g. while reloading saved state)"""
+        observers = getattr(self, "_observers", None)
+        self._observers = []
+        try:
+            yield
+        finally:
+            self._observers = observers if observers is not None else []
+
+    def _notify(self, *args: Any) -> None:
+        observers = getattr(self, "_observers", None)
+        if observers:
+            for observer in list(observers):
+                observer(*args)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_observers", None)
+        return state
+
+
+class UniqueList(MutableSequence, Generic[T]):
+    """
+    Insertion-ordered set of hashable items with list interface.
+    Items are kept in a tuple: no per-instance dict and no over-allocation.
+    Lists longer than INDEX_SIZE also keep a hash set of items for membership checks,
+    short lists are scanned (faster and smaller than hashing a few items).
+    extend() deduplicates through a set, so bulk adding is linear.
+    owner._changed() (if owner is set) is called after every modification.
+    """
+    __slots__ = ("_items", "_index", "_owner")
+
+    INDEX_SIZE = 8
+
+    def __init__(self, initlist: Iterable[T] | None = None, owner: Any = None):
+        self._items: tuple[T, ...] = ()
+        self._index: set[T] | None = None
+        self._owner = None
+        if initlist is not None:
+            self.extend(initlist)
+        self._owner = owner
+
+    @property
+    def data(self) -> list[T]:
+        """Copy of items"""
+        return list(self._items)
+
+    @classmethod
+    def _coerce(cls, item: Any) -> Any:
+        """
+        Convert item to the stored form before lookup (e.g. str to Phone).
+        Returns None if the item can't be in the list.
+        """
+        return item
+
+    def _set_items(self, items: tuple[T, ...]) -> None:
+        self._items = items
+        self._index = set(items) if len(items) > self.INDEX_SIZE else None
+        if self._owner is not None:
+            self._owner._changed()
+
+    def _has(self, item: Any) -> bool:
+        if self._index is not None:
+            try:
+                return item in self._index
+            except TypeError:
+                return False
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.__class__(self._items[i])
+        return self._items[i]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def __reversed__(self) -> Iterator[T]:
+        return reversed(self._items)
+
+    def __contains__(self, item: object) -> bool:
+        item = self._coerce(item)
+        return item is not None and self._has(item)
+
+    def index(self, item: Any, start: int = 0, stop: int | None = None) -> int:
+        return self._items.index(self._coerce(item), start, len(self._items) if stop is None else stop)
+
+    def count(self, item: Any) -> int:
+        return 1 if item in self else 0
+
     def append(self, item: T) -> None:
-        if item not in self.data:
-            super().append(item)
+        if not self._has(item):
+            self._set_items(self._items + (item,))
 
     def extend(self, other: Iterable[T]) -> None:
+        seen = set(self._items)
+        new_items = []
         for item in other:
-            self.append(item)
+            if item not in seen:
+                seen.add(item)
+                new_items.append(item)
+        if new_items:
+            self._set_items(self._items + tuple(new_items))
 
     def insert(self, i: int, item: T) -> None:
-        if item not in self.data:
-            super().insert(i, item)
+        if not self._has(item):
+            items = list(self._items)
+            items.insert(i, item)
+            self._set_items(tuple(items))
     
     def change(self, item: T, new_item: T):
-        try:
-            self.data.remove(item)
-            self.data.append(new_item)
-        except ValueError as e:
-            pass
+        """Remove item and append new_item to the end (nothing is changed if item is not in the list)"""
+        if not self._has(item):
+            return
+        items = [x for x in self._items if x != item]
+        if new_item not in items:
+            items.append(new_item)
+        self._set_items(tuple(items))
+
+    def clear(self) -> None:
+        if self._items:
+            self._set_items(())
+
+    def __setitem__(self, i, item) -> None:
+        items = list(self._items)
+        items[i] = item
+        self._set_items(tuple(dict.fromkeys(items)))
+
+    def __delitem__(self, i) -> None:
+        items = list(self._items)
+        del items[i]
+        self._set_items(tuple(items))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, UniqueList):
+            return self._items == other._items
+        if isinstance(other, (list, tuple)):
+            return list(self._items) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self):
+        return (self.__class__, (self._items,))
+
+    def __setstate__(self, state: dict) -> None:
+        """Load lists pickled before __slots__ (UserList with 'data')"""
+        self._owner = None
+        self._items = ()
+        self._index = None
+        self.extend(state.get("data", ()))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self._items)!r})"
 
     def __str__(self) -> str:
-        return '; '.join(str(p) for p in self.data)
+        return '; '.join(str(p) for p in self._items)
 
 
 def is_dev_mode() -> bool:
@@ -52,14 +222,97 @@ def get_data_path(filename: str) -> Path:
         data_dir = Path("data")
         data_dir.mkdir(exist_ok=True)
     else:
+        from appdirs import user_data_dir
         data_dir = Path(user_data_dir("personal_assistant"))
         data_dir.mkdir(parents=True, exist_ok=True)
 
     return data_dir / filename
 
 
+class ScriptInput:
+    """
+    Batch mode input: prompts read lines of a script instead of the terminal, no prompt is shown.
+    A command prompt reads the next line, lines starting with '#' are comments there.
+    A value prompt reads the next line: an empty line keeps the default text,
+    lines between '<<<' and '>>>' lines make one multiline value (an empty block is an empty value).
+    The end of the script works as Ctrl+C.
+    The script stops at the first failed command (see fail): prompts read the end of the script,
+    so the value lines of the failed command are never run as commands.
+    quiet - don't draw tables.
+    """
+    BLOCK_START = "<<<"
+    BLOCK_END = ">>>"
+
+    def __init__(self, lines: Iterable[str], quiet: bool = False):
+        self._lines = iter(lines)
+        self.quiet = quiet
+        self.line_no = 0
+        # "line N: message" of the first failed command
+        self.error: str | None = None
+
+    def fail(self, message: str) -> None:
+        if self.error is None:
+            self.error = f"line {self.line_no}: {message}"
+
+    def _next_line(self) -> str | None:
+        if self.error is not None:
+            return None
+        line = next(self._lines, None)
+        if line is None:
+            return None
+        self.line_no += 1
+        return line.rstrip("\r\n")
+
+    def read_command(self) -> str | None:
+        while (line := self._next_line()) is not None:
+            if not line.lstrip().startswith("#"):
+                return line
+        return None
+
+    def read_value(self, default_text: str = "") -> str | None:
+        line = self._next_line()
+        if line is None:
+            return None
+        if line.strip() != self.BLOCK_START:
+            return line or default_text
+        block = []
+        while (line := self._next_line()) is not None and line.strip() != self.BLOCK_END:
+            block.append(line)
+        return "\n".join(block)
+
+
+_script: ScriptInput | None = None
+
+
+@contextmanager
+def script_input(lines: Iterable[str], quiet: bool = False) -> Iterator[ScriptInput]:
+    """Run the block in batch mode: read_command and promt_pretty read lines (see ScriptInput)"""
+    global _script
+    previous, _script = _script, ScriptInput(lines, quiet)
+    try:
+        yield _script
+    finally:
+        _script = previous
+
+
+def is_batch() -> bool:
+    return _script is not None
+
+
+def command_failed(message: str) -> None:
+    """Report a failed command (after printing the error): batch mode stops the script"""
+    if _script is not None:
+        _script.fail(message)
+
+
 def promt_pretty(message: str, default_text: str = "", multiline: bool = False) -> str | None:
     """Read pretty user input and handle Ctrl+C"""
+    if _script is not None:
+        return _script.read_value(default_text)
+
+    from prompt_toolkit import prompt
+    from prompt_toolkit.formatted_text import HTML
+
     try:
         message = f"{message} (Alt+Enter or Esc→Enter to end):\n" if multiline else f"{message}: "
         return prompt(HTML(f"<ansimagenta>{message}</ansimagenta>"), 
@@ -70,51 +323,201 @@ def promt_pretty(message: str, default_text: str = "", multiline: bool = False)
         return None
 
 
-# Used for promt command
-cmd_history = FileHistory(get_data_path(".command_history"))
-promt_session = PromptSession(
-    history=cmd_history,
-    complete_style=CompleteStyle.READLINE_LIKE,
-    complete_while_typing=False,
-)
+@cache
+def get_prompt_session() -> "PromptSession":
+    """Session with history used for promt command, created on first use"""
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.history import FileHistory
+    from prompt_toolkit.shortcuts import CompleteStyle
+
+    return PromptSession(
+        history=FileHistory(get_data_path(".command_history")),
+        complete_style=CompleteStyle.READLINE_LIKE,
+        complete_while_typing=False,
+    )
+
+
+def make_completer(commands: Iterable[str],
+                   complete_argument: Callable[[str, str], Iterable[tuple[str, str]]] | None = None) -> "Completer | None":
+    """
+    Completer for read_command, created once per controller run (None in batch mode).
+    Commands are completed by the list, arguments by complete_argument(command, text) -> (completion, description).
+    """
+    if _script is not None:
+        return None
+
+    from personal_assistant.completion import CommandCompleter
+
+    return CommandCompleter(commands, complete_argument)
 
-class FirstWordOnlyCompleter(WordCompleter):
-    def get_completions(self, document, complete_event):
-        if not document.text_before_cursor.strip():
-            return
-        if " " in document.text_before_cursor:
-            return
 
-        yield from super().get_completions(document, complete_event)
+def read_command(message: str = "Command: ", commands: list[str] = [], default: str = "exit", color: str = "ansiyellow",
+                 completer: "Completer | None" = None) -> str:
+    """
+    Read command and handle Ctrl+C (returns default).
+    completer is made once by make_completer, else the commands list is completed.
+    """
+    if _script is not None:
+        command = _script.read_command()
+        return default if command is None else command
 
+    from prompt_toolkit.formatted_text import HTML
+
+    if completer is None and commands:
+        completer = make_completer(commands)
 
-def read_command(message: str = "Command: ", commands: list[str] = [], default: str = "exit", color: str = "ansiyellow") -> str:
-    """Read command and handle Ctrl+C (returns default)"""
     try:
-        command_completer = FirstWordOnlyCompleter(commands , ignore_case=True, match_middle=True)
-        return promt_session.prompt(HTML(f"<{color}>{message}</{color}>"),
-                      completer=command_completer)
+        return get_prompt_session().prompt(HTML(f"<{color}>{message}</{color}>"), completer=completer)
     except KeyboardInterrupt:
         return default
 
 
-def save_data(book: Any, path: Path|str ="data.pkl"):
-    """Save data to file"""
-    with open(path, "wb") as f:
-        pickle.dump(book, f)
+@contextmanager
+def atomic_open(path: Path | str) -> Iterator[BinaryIO]:
+    """
+    Open temporary file for writing instead of path.
+    On success the file is fsynced and renamed over path, so path always holds
+    either the old or the new complete content. On error the temporary file is removed.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
 
 
-def load_data(path: Path|str = "data.pkl") -> Any:
-    """Load data from file"""
+def _fsync_dir(path: Path) -> None:
+    """Persist rename in the directory (not supported on Windows)"""
     try:
-        with open(Path(path), "rb") as f:
-            return pickle.load(f)
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# Locks held by the thread: lock file path -> [open lock file, nesting count, shared]
+_file_locks = threading.local()
+
+
+@contextmanager
+def file_lock(path: Path | str, shared: bool = False) -> Iterator[None]:
+    """
+    Advisory lock of the data file between processes: shared for reading, exclusive for writing.
+    flock is taken on a separate '<file>.lock' file, because saving replaces the data file.
+    Locks are reentrant in a thread (a nested lock keeps the mode of the outer one,
+    exclusive lock can't be nested in a shared one). No-op where fcntl is not available,
+    and for a shared lock when the lock file can't be created (read-only data directory).
+    """
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = Path(path).with_name(Path(path).name + ".lock")
+    held = getattr(_file_locks, "held", None)
+    if held is None:
+        held = _file_locks.held = {}
+    entry = held.get(lock_path)
+    if entry is not None:
+        if entry[2] and not shared:
+            raise RuntimeError(f"Exclusive lock of '{path}' is requested under a shared lock")
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+        return
+
+    try:
+        f = open(lock_path, "a+b")
+    except OSError:
+        if not shared:
+            raise
+        # nobody can save to the directory either, read without the lock
+        f = None
+    if f is None:
+        yield
+        return
+
+    with f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[lock_path] = [f, 1, shared]
+        try:
+            yield
+        finally:
+            del held[lock_path]
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def file_signature(path: Path | str) -> tuple[int, int, int] | None:
+    """
+    (inode, size, modification time) of the file, None if it doesn't exist.
+    Changes on every save: atomic save creates a new inode, appending changes size.
+    """
+    try:
+        st = os.stat(path)
     except FileNotFoundError:
         return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
 
 
-def draw_table(title: str, columns_config: List[Dict], data: List[Any], row_sep: str | None = "─"):
-    console = Console()
+def save_data(book: Any, path: Path|str ="data.pkl", compression: str | None = None):
+    """
+    Save data to file atomically (see atomic_open) under exclusive file lock.
+    compression - "zlib", "lzma:1", "none", ... (see compression.parse_compression),
+    default from PERSONAL_ASSISTANT_COMPRESSION environment variable.
+    """
+    codec = compression_from_env() if compression is None else parse_compression(compression)
+    with file_lock(path), atomic_open(path) as f, compressed_writer(f, codec) as out:
+        pickle.dump(book, out)
+
+
+def load_data(path: Path|str = "data.pkl", load: Callable[[BinaryIO], Any] = pickle.load) -> Any:
+    """
+    Load data from file under shared file lock, load(file) unpickles it.
+    Compressed files are decompressed while unpickling.
+    Garbage collector is paused while loading: unpickling creates many objects
+    and repeated collections would scan them again and again.
+    """
+    try:
+        with file_lock(path, shared=True), open(Path(path), "rb") as f:
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return load(open_reader(f))
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except FileNotFoundError:
+        return None
+
+
+# Rows per page for paged tables
+PAGE_SIZE = 20
+
+
+@cache
+def get_console() -> "Console":
+    from rich.console import Console
+    return Console()
+
+
+def build_table(title: str, columns_config: List[Dict], data: List[Any], row_sep: str | None = "─") -> "Table":
+    from rich.table import Table
+    from rich.text import Text
+    import rich.box as box
+
     table = Table(
         title=title, 
         show_header=True,
@@ -143,4 +546,74 @@ def draw_table(title: str, columns_config: List[Dict], data: List[Any], row_sep:
             separator_row = [separator_line for _ in columns_config]
             table.add_row(*separator_row)            
 
-    console.print(table)
+    return table
+
+
+def draw_table(title: str, columns_config: List[Dict], data: List[Any], row_sep: str | None = "─"):
+    if _script is not None and _script.quiet:
+        return
+    get_console().print(build_table(title, columns_config, data, row_sep))
+
+
+def iter_locked(items: Iterable[T], lock: Any, chunk_size: int = PAGE_SIZE) -> Iterator[T]:
+    """
+    Items pulled from the iterator chunk by chunk under lock and yielded without it,
+    so pages of the lazy iterator are shown without holding the lock.
+    The iterator must tolerate changes of the data between chunks (e.g. iterate over copied keys).
+    """
+    iterator = iter(items)
+    while True:
+        with lock:
+            chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from chunk
+
+
+def draw_table_pages(title: str, columns_config: List[Dict], data: Iterable[Any], 
+                     row_sep: str | None = "─", page_size: int = PAGE_SIZE):
+    """
+    Print table page by page.
+    Rows are pulled from data iterator only for the shown page (and one page ahead),
+    shown pages are kept for navigation back.
+    Navigation: Enter or 'n' - next page, 'p' - previous page, 'q' - quit.
+    In batch mode all rows are drawn in one table.
+    """
+    if _script is not None:
+        if not _script.quiet:
+            draw_table(title, columns_config, list(data), row_sep)
+        return
+
+    rows = iter(data)
+    pages: list[list[Any]] = []
+    page_no = 0
+
+    while True:
+        while len(pages) <= page_no + 1:
+            page = list(islice(rows, page_size))
+            if not page:
+                break
+            pages.append(page)
+
+        if not pages:
+            draw_table(title, columns_config, [], row_sep)
+            return
+
+        has_next = page_no + 1 < len(pages)
+        caption = title if not has_next and page_no == 0 else f"{title} (page {page_no + 1})"
+        draw_table(caption, columns_config, pages[page_no], row_sep)
+
+        if not has_next and page_no == 0:
+            return
+
+        choices = (["n"] if has_next else []) + (["p"] if page_no > 0 else []) + ["q"]
+        hints = {"n": "Enter/n - next", "p": "p - previous", "q": "q - quit"}
+        answer = read_command(f"{', '.join(hints[c] for c in choices)}: ", commands=choices, default="q")
+        answer = answer.strip().casefold() or ("n" if has_next else "q")
+
+        if answer == "n" and has_next:
+            page_no += 1
+        elif answer == "p" and page_no > 0:
+            page_no -= 1
+        elif answer == "q":
+            return
@@ -0,0 +1,38 @@
+from typing import Callable, Iterable
+from prompt_toolkit.completion import Completer, Completion, WordCompleter
+
+
+# complete_argument(command, text) -> (completion, description) pairs for the argument text
+ArgumentCompletions = Callable[[str, str], Iterable[tuple[str, str]]]
+
+
+class FirstWordOnlyCompleter(WordCompleter):
+    def get_completions(self, document, complete_event):
+        if not document.text_before_cursor.strip():
+            return
+        if " " in document.text_before_cursor:
+            return
+
+        yield from super().get_completions(document, complete_event)
+
+
+class CommandCompleter(Completer):
+    """
+    Completes the command (first word) by the command list
+    and the rest of the line by complete_argument(command, text).
+    """
+    def __init__(self, commands: Iterable[str], complete_argument: ArgumentCompletions | None = None):
+        self.command_completer = FirstWordOnlyCompleter(list(commands), ignore_case=True, match_middle=True)
+        self.complete_argument = complete_argument
+
+    def get_completions(self, document, complete_event):
+        command, separator, argument = document.text_before_cursor.lstrip().partition(" ")
+        if not separator:
+            yield from self.command_completer.get_completions(document, complete_event)
+            return
+        if self.complete_argument is None:
+            return
+        argument = argument.lstrip()
+        for text, description in self.complete_argument(command.casefold(), argument):
+            yield Completion(text, start_position=-len(argument), display_meta=description)
+
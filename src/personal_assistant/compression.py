@@ -0,0 +1,136 @@
+import io
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+# Data files compression: "none" (default), "zlib" or "lzma" with optional level, e.g. "zlib:9"
+COMPRESSION_ENV = "PERSONAL_ASSISTANT_COMPRESSION"
+
+# Compressed file: MAGIC, codec id, then chunks (compressed size, raw size, data), a zero size ends the file.
+# Chunks are compressed separately, so a file is decompressed chunk by chunk while it is unpickled.
+MAGIC = b"PAZC"
+CODECS = {"zlib": 1, "lzma": 2}
+DEFAULT_LEVELS = {"zlib": 6, "lzma": 6}
+CHUNK = struct.Struct("<II")
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_compression(spec: str | None) -> tuple[str, int] | None:
+    """'zlib', 'lzma:1' -> (codec, level), None for 'none' or empty spec"""
+    spec = (spec or "").strip().casefold()
+    if spec in ("", "none"):
+        return None
+    codec, _, level = spec.partition(":")
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression '{codec}'")
+    if not level:
+        return codec, DEFAULT_LEVELS[codec]
+    if not level.isdigit() or not 0 <= int(level) <= 9:
+        raise ValueError(f"Compression level must be 0-9, got '{level}'")
+    return codec, int(level)
+
+
+def compression_from_env() -> tuple[str, int] | None:
+    return parse_compression(os.environ.get(COMPRESSION_ENV))
+
+
+def _compressor(codec: str, level: int):
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, level)
+    import lzma
+    return lambda data: lzma.compress(data, preset=level)
+
+
+def _decompressor(codec_id: int):
+    if codec_id == CODECS["zlib"]:
+        return zlib.decompress
+    if codec_id == CODECS["lzma"]:
+        import lzma
+        return lzma.decompress
+    raise ValueError(f"Unknown compression codec {codec_id}")
+
+
+class ChunkWriter:
+    """Writer compressing CHUNK_SIZE chunks of written data to f, finish() ends the file"""
+    def __init__(self, f: BinaryIO, codec: str, level: int, chunk_size: int = CHUNK_SIZE):
+        self._f = f
+        self._compress = _compressor(codec, level)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        f.write(MAGIC + bytes([CODECS[codec]]))
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._write_chunk(self._buffer[:self._chunk_size])
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def _write_chunk(self, raw: bytes | bytearray) -> None:
+        data = self._compress(bytes(raw))
+        self._f.write(CHUNK.pack(len(data), len(raw)))
+        self._f.write(data)
+
+    def finish(self) -> None:
+        """Write the rest and the end of the file (f stays open)"""
+        if self._buffer:
+            self._write_chunk(self._buffer)
+            self._buffer.clear()
+        self._f.write(CHUNK.pack(0, 0))
+
+
+class ChunkReader(io.RawIOBase):
+    """Readable stream of data decompressed chunk by chunk from f (after MAGIC)"""
+    def __init__(self, f: BinaryIO, codec_id: int):
+        self._f = f
+        self._decompress = _decompressor(codec_id)
+        self._chunk = memoryview(b"")
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk and not self._eof:
+            self._next_chunk()
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def _next_chunk(self) -> None:
+        header = self._f.read(CHUNK.size)
+        if len(header) != CHUNK.size:
+            raise EOFError("Compressed data file is truncated")
+        size, raw_size = CHUNK.unpack(header)
+        if size == 0:
+            self._eof = True
+            return
+        data = self._f.read(size)
+        if len(data) != size:
+            raise EOFError("Compressed data file is truncated")
+        data = self._decompress(data)
+        if len(data) != raw_size:
+            raise EOFError("Compressed data file is corrupted")
+        self._chunk = memoryview(data)
+
+
+@contextmanager
+def compressed_writer(f: BinaryIO, compression: tuple[str, int] | None) -> Iterator[BinaryIO | ChunkWriter]:
+    """Write to f through compression (see parse_compression), f itself without compression"""
+    if compression is None:
+        yield f
+        return
+    writer = ChunkWriter(f, *compression)
+    yield writer
+    writer.finish()
+
+
+def open_reader(f: io.BufferedReader) -> BinaryIO:
+    """Returns stream of f decompressed if f is a compressed file (by MAGIC), else f"""
+    if f.peek(len(MAGIC) + 1)[:len(MAGIC)] != MAGIC:
+        return f
+    codec_id = f.read(len(MAGIC) + 1)[-1]
+    return io.BufferedReader(ChunkReader(f, codec_id), CHUNK_SIZE)
@@ -0,0 +1,117 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TextIO
+from personal_assistant.exceptions import ApplicationBaseError
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.notes.classes import NoteRecord, Notes
+
+
+CONTACT_FIELDS = ["name", "phones", "emails", "birthday", "address"]
+NOTE_FIELDS = ["id", "title", "text", "tags"]
+
+
+class ExportFormatError(ApplicationBaseError):
+    def __init__(self, msg: str = "Export file format error", *args: object) -> None:
+        super().__init__(msg, args)
+
+
+def contact_to_csv(record: Record) -> dict[str, str]:
+    """Contact row in the format accepted by import"""
+    return {
+        "name": record.name.value,
+        "phones": "; ".join(p.value for p in record.phones),
+        "emails": "; ".join(e.value for e in record.emails),
+        "birthday": str(record.birthday),
+        "address": record.address.value or "",
+    }
+
+
+def contact_to_json(record: Record) -> dict[str, Any]:
+    birthday = record.birthday.value
+    return {
+        "name": record.name.value,
+        "phones": [p.value for p in record.phones],
+        "emails": [e.value for e in record.emails],
+        "birthday": birthday.isoformat() if birthday else None,
+        "address": record.address.value,
+    }
+
+
+def note_to_csv(note: NoteRecord) -> dict[str, str]:
+    return {"id": note.id, "title": note.title, "text": note.text, "tags": " ".join(sorted(note.tags))}
+
+
+def note_to_json(note: NoteRecord) -> dict[str, Any]:
+    return {"id": note.id, "title": note.title, "text": note.text, "tags": sorted(note.tags)}
+
+
+def write_csv(rows: Iterable[dict], f: TextIO, fields: list[str]) -> int:
+    """Write rows one by one, returns number of rows"""
+    writer = csv.DictWriter(f, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[dict], f: TextIO, fields: list[str] | None = None) -> int:
+    """Write rows as JSON Lines, returns number of rows"""
+    count = 0
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def _export(items: Iterable[Any], path: Path | str, fields: list[str],
+            to_csv: Callable[[Any], dict], to_json: Callable[[Any], dict]) -> int:
+    suffix = Path(path).suffix.casefold()
+    match suffix:
+        case ".csv":
+            write, convert = write_csv, to_csv
+        case ".jsonl" | ".ndjson":
+            write, convert = write_jsonl, to_json
+        case _:
+            raise ExportFormatError(f"Unknown file format '{suffix}'. Use .csv or .jsonl")
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        return write(map(convert, items), f, fields)
+
+
+def iter_contacts(book: AddressBook, criteria: str | None = None) -> Iterator[Record]:
+    """All contacts or contacts found by criteria"""
+    if criteria and criteria.strip():
+        return book.iter_find(criteria)
+    return iter(book.values())
+
+
+def iter_notes(notes: Notes, tags: Iterable[str] | None = None) -> Iterator[NoteRecord]:
+    """All notes or notes with any of tags"""
+    search_tags = {tag.strip("#").casefold() for tag in tags or ()} - {""}
+    if not search_tags:
+        return iter(notes.values())
+    return (
+        note for note in notes.values()
+        if any(tag.casefold() in search_tags for tag in note.tags)
+    )
+
+
+def export_contacts(book: AddressBook, path: Path | str, criteria: str | None = None) -> int:
+    """
+    Export contacts to CSV (.csv) or JSON Lines (.jsonl) file.
+    Records are written as they are read from the book.
+    Returns number of exported contacts.
+    """
+    return _export(iter_contacts(book, criteria), path, CONTACT_FIELDS, contact_to_csv, contact_to_json)
+
+
+def export_notes(notes: Notes, path: Path | str, tags: Iterable[str] | None = None) -> int:
+    """
+    Export notes to CSV (.csv) or JSON Lines (.jsonl) file.
+    Returns number of exported notes.
+    """
+    return _export(iter_notes(notes, tags), path, NOTE_FIELDS, note_to_csv, note_to_json)
@@ -0,0 +1,423 @@
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from sys import intern
+from datetime import date
+from typing import Generic, Hashable, Iterable, Iterator, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+
+
+class NgramIndex(Generic[K]):
+    """
+    Inverted index from character n-grams to keys.
+    Used to narrow substring search to a set of candidate keys.
+    Candidates must be verified by the caller, the index can return false positives.
+    """
+    def __init__(self, n: int = 3):
+        self.n = n
+        self._postings: defaultdict[str, set[K]] = defaultdict(set)
+        self._grams: dict[K, frozenset[str]] = {}
+
+    def grams(self, text: str) -> set[str]:
+        """Returns n-grams of text (text must be already normalized)"""
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, key: K, texts: Iterable[str]) -> None:
+        """
+        Index key by texts. Each text is split separately, so grams never span two texts.
+        Replaces previous indexed texts of the key.
+        """
+        self.remove(key)
+        grams: set[str] = set()
+        for text in texts:
+            grams |= self.grams(text)
+        self._grams[key] = frozenset(grams)
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def remove(self, key: K) -> None:
+        for gram in self._grams.pop(key, ()):
+            keys = self._postings.get(gram)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._postings[gram]
+
+    def candidates(self, query: str) -> set[K] | None:
+        """
+        Returns keys which contain all n-grams of the query.
+        Returns None when the query is shorter than n and can't be narrowed.
+        """
+        grams = self.grams(query)
+        if not grams:
+            return None
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for keys in postings[1:]:
+            if not result:
+                break
+            result &= keys
+        return result
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._grams.clear()
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._grams
+
+
+class ExactIndex(Generic[K]):
+    """
+    Inverted index from exact (already normalized) values to keys.
+    A value can belong to several keys, a key can have several values.
+    """
+    def __init__(self):
+        self._postings: dict[str, set[K]] = {}
+        self._values: dict[K, frozenset[str]] = {}
+
+    def add(self, key: K, values: Iterable[str]) -> None:
+        """Index key by values, replaces previous values of the key"""
+        self.remove(key)
+        values = frozenset(values)
+        if not values:
+            return
+        self._values[key] = values
+        for value in values:
+            self._postings.setdefault(value, set()).add(key)
+
+    def remove(self, key: K) -> None:
+        for value in self._values.pop(key, ()):
+            keys = self._postings.get(value)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._postings[value]
+
+    def get(self, value: str) -> set[K]:
+        """Returns keys with the value"""
+        return self._postings.get(value, set())
+
+    def shared(self) -> Iterator[tuple[str, set[K]]]:
+        """Yields values which belong to several keys"""
+        for value, keys in self._postings.items():
+            if len(keys) > 1:
+                yield value, keys
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# Max number of completions (see PrefixIndex)
+COMPLETION_LIMIT = 20
+
+
+class PrefixIndex(Generic[K]):
+    """
+    Prefix index of (already normalized) words to keys for completion.
+    A flattened trie: sorted array of (word, key) pairs, words with a prefix are
+    a contiguous range found by binary search, so a lookup is O(log n + k).
+    Kept up to date incrementally, keys must be comparable (used as tie breaker).
+    """
+    def __init__(self):
+        self._entries: list[tuple[str, K]] = []
+        self._words: dict[K, tuple[str, ...]] = {}
+
+    def add(self, key: K, words: Iterable[str]) -> None:
+        """Index key by words, replaces previous words of the key"""
+        self.remove(key)
+        words = tuple(set(words))
+        self._words[key] = words
+        for word in words:
+            insort(self._entries, (word, key))
+
+    def build(self, items: Iterable[tuple[K, Iterable[str]]]) -> None:
+        """Index many keys at once (one sort instead of an insert per word)"""
+        for key, words in items:
+            self.remove(key)
+            words = tuple(set(words))
+            self._words[key] = words
+            self._entries.extend((word, key) for word in words)
+        self._entries.sort()
+
+    def remove(self, key: K) -> None:
+        entries = self._entries
+        for word in self._words.pop(key, ()):
+            i = bisect_left(entries, (word, key))
+            if i < len(entries) and entries[i] == (word, key):
+                del entries[i]
+
+    def keys(self, prefix: str, limit: int | None = None) -> list[K]:
+        """Keys having a word with the prefix, ordered by the word (first match of a key)"""
+        entries = self._entries
+        i = bisect_left(entries, (prefix,))
+        result: dict[K, None] = {}
+        while i < len(entries) and (limit is None or len(result) < limit):
+            word, key = entries[i]
+            if not word.startswith(prefix):
+                break
+            result[key] = None
+            i += 1
+        return list(result)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._words.clear()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._words
+
+
+class SortedIndex:
+    """
+    Sorted array of string keys for range (and prefix) queries by binary search, O(log n + k).
+    Kept up to date incrementally.
+    """
+    def __init__(self, keys: Iterable[str] = ()):
+        self._keys: list[str] = sorted(keys)
+
+    def add(self, key: str) -> None:
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            keys.insert(i, key)
+
+    def remove(self, key: str) -> None:
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def range(self, start: str, stop: str, limit: int | None = None) -> list[str]:
+        """Keys start <= key < stop in sorted order"""
+        keys = self._keys
+        i, j = bisect_left(keys, start), bisect_left(keys, stop)
+        if limit is not None:
+            j = min(j, i + limit)
+        return keys[i:j]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+
+class DayOfYearIndex(Generic[K]):
+    """
+    Calendar index: 366 buckets (leap year calendar) of keys by month and day of a date.
+    """
+    DAYS = 366
+
+    def __init__(self):
+        self._buckets: list[set[K]] = [set() for _ in range(self.DAYS)]
+        self._slots: dict[K, int] = {}
+
+    @staticmethod
+    def slot(month: int, day: int) -> int:
+        """Returns bucket number (0..365) of the month and day"""
+        return date(2000, month, day).timetuple().tm_yday - 1
+
+    def add(self, key: K, value: date | None) -> None:
+        """Index key by month and day of the date, None removes key from index"""
+        self.remove(key)
+        if value is None:
+            return
+        slot = self.slot(value.month, value.day)
+        self._slots[key] = slot
+        self._buckets[slot].add(key)
+
+    def remove(self, key: K) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self._buckets[slot].discard(key)
+
+    def get(self, month: int, day: int) -> set[K]:
+        """Returns keys with the month and day"""
+        return self._buckets[self.slot(month, day)]
+
+    def clear(self) -> None:
+        for bucket in self._buckets:
+            bucket.clear()
+        self._slots.clear()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+WORD_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def tokenize(text: str) -> list[str]:
+    """Returns casefolded words of text"""
+    return WORD_RE.findall(text.casefold())
+
+
+def parse_query(query: str) -> list[tuple[str, tuple[str, ...]]]:
+    """
+    Split search query to parts: ("term", (word,)), ("prefix", (word,)) for word*
+    and ("phrase", words) for "quoted words" (or words joined by punctuation, like e-mail).
+    """
+    parts = []
+    for phrase, word in QUERY_RE.findall(query):
+        tokens = tuple(tokenize(phrase or word))
+        if not tokens:
+            continue
+        if len(tokens) > 1:
+            parts.append(("phrase", tokens))
+        elif not phrase and word.endswith("*"):
+            parts.append(("prefix", tokens))
+        else:
+            parts.append(("term", tokens))
+    return parts
+
+
+class TextIndex(Generic[K]):
+    """
+    Full-text inverted index (word -> key -> word count) with BM25 ranking.
+    Supports words, prefixes (word*) and phrases ("several words").
+    Word sequences of keys are kept to check phrases and to remove keys.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings: dict[str, dict[K, int]] = {}
+        self._docs: dict[K, tuple[str | None, ...]] = {}
+        self._lengths: dict[K, int] = {}
+        self._total_length = 0
+        self._terms: list[str] = []
+
+    def add(self, key: K, texts: Iterable[str]) -> None:
+        """
+        Index key by texts, phrases never span two texts.
+        Replaces previous indexed texts of the key.
+        """
+        self.remove(key)
+        words: list[str | None] = []
+        for text in texts:
+            if words:
+                words.append(None)
+            # interned: word sequences share strings with each other and the postings
+            words.extend(map(intern, tokenize(text)))
+
+        counts = Counter(words)
+        counts.pop(None, None)
+        postings_of = self._postings
+        for term, count in counts.items():
+            postings = postings_of.get(term)
+            if postings is None:
+                postings = postings_of[term] = {}
+                insort(self._terms, term)
+            postings[key] = count
+
+        self._docs[key] = tuple(words)
+        length = len(words) - words.count(None)
+        self._lengths[key] = length
+        self._total_length += length
+
+    def remove(self, key: K) -> None:
+        self._total_length -= self._lengths.pop(key, 0)
+        for term in set(self._docs.pop(key, ())):
+            postings = self._postings.get(term) if term is not None else None
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+
+    def _prefix_terms(self, prefix: str) -> list[str]:
+        """Returns all indexed words with the prefix (a sorted range of terms)"""
+        terms = self._terms
+        start = end = bisect_left(terms, prefix)
+        while end < len(terms) and terms[end].startswith(prefix):
+            end += 1
+        return terms[start:end]
+
+    def _phrase(self, tokens: tuple[str, ...]) -> dict[K, int]:
+        """Returns key -> number of phrase occurrences"""
+        postings = [self._postings.get(token) for token in tokens]
+        if not all(postings):
+            return {}
+        keys = min(postings, key=len)
+        first, size = tokens[0], len(tokens)
+        result = {}
+        for key in keys:
+            if not all(key in term_postings for term_postings in postings):
+                continue
+            words = self._docs[key]
+            count, i = 0, -1
+            try:
+                while True:
+                    i = words.index(first, i + 1)
+                    if words[i:i + size] == tokens:
+                        count += 1
+            except ValueError:
+                pass
+            if count:
+                result[key] = count
+        return result
+
+    def _add_scores(self, scores: dict[K, float], frequencies: dict[K, int]) -> None:
+        """Add BM25 scores of one query word (or phrase) with frequencies key -> count"""
+        count = len(self._lengths)
+        df = len(frequencies)
+        if not df:
+            return
+        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+        avg_length = self._total_length / count or 1
+        k1, b = self.K1, self.B
+        # norm = k1 * (1 - b + b * length / avg_length)
+        base, per_word = k1 * (1 - b), k1 * b / avg_length
+        weight = idf * (k1 + 1)
+        lengths, get_score = self._lengths, scores.get
+        for key, tf in frequencies.items():
+            scores[key] = get_score(key, 0.0) + weight * tf / (tf + base + per_word * lengths[key])
+
+    def scores(self, query: str) -> dict[K, float]:
+        """Returns BM25 scores of keys matching any part of the query"""
+        scores: dict[K, float] = {}
+        for kind, tokens in parse_query(query):
+            match kind:
+                case "term":
+                    self._add_scores(scores, self._postings.get(tokens[0], {}))
+                case "prefix":
+                    for term in self._prefix_terms(tokens[0]):
+                        self._add_scores(scores, self._postings[term])
+                case "phrase":
+                    self._add_scores(scores, self._phrase(tokens))
+        return scores
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._docs.clear()
+        self._lengths.clear()
+        self._total_length = 0
+        self._terms.clear()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._lengths
@@ -1,6 +1,7 @@
+import sys
 import types
 from colorama import Fore, Back, Style, init
-from personal_assistant.common import read_command
+from personal_assistant.common import ScriptInput, command_failed, read_command, script_input
 from personal_assistant.addr_book.controller import main as book_main
 from personal_assistant.notes.controller import main as notes_main
 from personal_assistant.views import draw_help
@@ -22,7 +23,49 @@ def cmd_show_help():
     draw_help("main commands help", MAIN_MENU_COMMANDS_LIST)
 
 
-def main():
+def parse_args(argv: list[str]):
+    # argparse is imported only when there are arguments
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="personal-assistant", description="Personal assistant")
+    parser.add_argument("--batch", metavar="SCRIPT",
+                        help="run commands and field values from the script file ('-' - stdin) without prompts")
+    parser.add_argument("--quiet", action="store_true", help="don't draw tables in batch mode")
+    parser.add_argument("--serve", action="store_true",
+                        help="share the address book and notes with local clients (JSON Lines protocol)")
+    parser.add_argument("--socket", help="Unix socket path of --serve (default: in the data directory)")
+    parser.add_argument("--port", type=int, help="serve on the localhost TCP port instead of a Unix socket")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Returns exit code: 1 if a command of the batch script failed"""
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv) if argv else None
+    if args is not None and args.serve:
+        from personal_assistant.server import run_server
+        run_server(args.socket, args.port)
+    elif args is None or args.batch is None:
+        run()
+    elif args.batch == "-":
+        with script_input(sys.stdin, quiet=args.quiet) as script:
+            run()
+        return batch_result(script)
+    else:
+        with open(args.batch, encoding="utf-8") as f, script_input(f, quiet=args.quiet) as script:
+            run()
+        return batch_result(script)
+    return 0
+
+
+def batch_result(script: ScriptInput) -> int:
+    if script.error is None:
+        return 0
+    print(f"{Fore.RED}Script stopped at {script.error}", file=sys.stderr)
+    return 1
+
+
+def run():
     print(f"{Fore.CYAN}Welcome to Personal assistant!")
     print(f"{Fore.CYAN}Select module (book/notes): ")
 
@@ -47,6 +90,7 @@ def main():
                 break
             case _:
                 print(f"{Fore.RED}Invalid command.")
+                command_failed("Invalid command")
 
         command = command if command in {"close", "exit", "quit"} else None
         
@@ -54,4 +98,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,10 +1,42 @@
 from collections import UserDict
-import ulid
+from datetime import datetime
+from operator import itemgetter
+from typing import Any
+from personal_assistant.cache import CachedQueries, cached_query
+from personal_assistant.common import Observable
+from personal_assistant.indexes import TextIndex, PrefixIndex, SortedIndex, COMPLETION_LIMIT
+from personal_assistant.notes import exceptions as excp
 
 
-class NoteRecord(object):
+# Note IDs are ULIDs: 10 characters of 48-bit creation time in milliseconds
+# and 16 random characters in Crockford's base32, so IDs sort by creation time
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ULID_LENGTH = 26
+ULID_TIME_LENGTH = 10
+
+
+def ulid_time_prefix(moment: datetime) -> str:
+    """Prefix of ULIDs created at the moment (ms precision)"""
+    ms = max(0, int(moment.timestamp() * 1000))
+    chars = []
+    for _ in range(ULID_TIME_LENGTH):
+        ms, digit = divmod(ms, 32)
+        chars.append(ULID_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class NoteRecord(Observable):
+    """
+    Note record.
+    Observers (callback(note)) are notified after title or text of the note was changed.
+    """
+    __slots__ = ("__id", "__tags", "__title", "__text", "_observers", "__weakref__")
+
     def __init__(self, title: str, text: str, id: str | None = None) -> None:
-        self.__id = str(id or ulid.new().str).upper()
+        if not id:
+            import ulid
+            id = ulid.new().str
+        self.__id = str(id).upper()
         self.__tags = frozenset()
         self.title = title
         self.text = text
@@ -13,6 +45,19 @@ class NoteRecord(object):
     def id(self):
         return self.__id
 
+    @property
+    def created(self) -> datetime | None:
+        """Creation time encoded in the ULID, None for other IDs"""
+        if len(self.__id) != ULID_LENGTH:
+            return None
+        ms = 0
+        for char in self.__id[:ULID_TIME_LENGTH]:
+            digit = ULID_ALPHABET.find(char)
+            if digit < 0:
+                return None
+            ms = ms * 32 + digit
+        return datetime.fromtimestamp(ms / 1000)
+
     @property
     def tags(self):
         """Note tags"""
@@ -26,30 +71,152 @@ class NoteRecord(object):
     @title.setter
     def title(self, title: str):
         self.__title = title
+        self._changed()
 
     @property
     def text(self):
-        """Note text"""
-        return self.__text
+        """Note text (read from the body store if it is stored out of line, see block_storage)"""
+        text = self.__text
+        return text if isinstance(text, str) else text.read()
 
     @text.setter
     def text(self, text: str):
         self.__text = text
         self.__tags = self.extract_tags(text)
+        self._changed()
 
     @staticmethod
     def extract_tags(text: str) -> frozenset[str]:
         words = text.replace("\n", " ").split()
         return frozenset([word.strip("#") for word in words if word.startswith("#")])
     
+    def _changed(self) -> None:
+        self._notify(self)
+
+    def _store_text(self, store: Any) -> None:
+        """Let the body store keep the text out of line: text is replaced by store.store(text)"""
+        self.__text = store.store(self.__text)
+
+    def __getstate__(self) -> tuple:
+        """
+        Compact state: (id, title, text), tags are extracted from text on load.
+        Text stored out of line is a body reference: (id, title, body, tags).
+        """
+        if isinstance(self.__text, str):
+            return (self.__id, self.__title, self.__text)
+        return (self.__id, self.__title, self.__text, tuple(self.__tags))
+
+    def __setstate__(self, state: tuple | dict) -> None:
+        if isinstance(state, dict):
+            # pickled before __slots__
+            state = (state["_NoteRecord__id"], state["_NoteRecord__title"], state["_NoteRecord__text"])
+        if len(state) == 4:
+            self.__id, self.__title, self.__text, tags = state
+            self.__tags = frozenset(tags)
+        else:
+            self.__id, self.__title, self.__text = state
+            self.__tags = self.extract_tags(self.__text)
+
     def __str__(self) -> str:
         return f"id: {self.id}, title: {self.title}, message: {self.text}, tags: {self.tags}"
 
 
-class Notes(UserDict[str, NoteRecord]):
+class Notes(CachedQueries, UserDict[str, NoteRecord], Observable):
+    """
+    Notes storage.
+    Keeps a tag -> note IDs index and a full-text index of titles and texts up to date for search.
+    Observers (callback(id, note)) are notified after a note was added or changed,
+    note is None when it was deleted.
+    """
+    def __init__(self):
+        super().__init__()
+        self._init_indexes()
+
+    def _init_indexes(self) -> None:
+        self._indexes_ready = False
+        self._tag_index: dict[str, set[str]] = {}
+        self._note_tags: dict[str, frozenset[str]] = {}
+        self._text_index: TextIndex[str] = TextIndex()
+        self._text_index_ready = False
+        self._order: dict[str, int] = {}
+        self._next_order = 0
+        self._completion_index: PrefixIndex[str] = PrefixIndex()
+        self._completion_index_ready = False
+        self._id_index = SortedIndex()
+        self._id_index_ready = False
+        for note in self.data.values():
+            note.subscribe(self._on_note_changed)
+
+    def _ensure_indexes(self) -> None:
+        """Build indexes on first search, so loading notes stays fast"""
+        if self._indexes_ready:
+            return
+        self._indexes_ready = True
+        for note in self.data.values():
+            self._index_note(note)
+
+    def _ensure_text_index(self) -> None:
+        """Build full-text index on first full-text search"""
+        self._ensure_indexes()
+        if self._text_index_ready:
+            return
+        self._text_index_ready = True
+        for note in self.data.values():
+            self._text_index.add(note.id, (note.title, note.text))
+
+    def _ensure_id_index(self) -> None:
+        """Build sorted ID index on first prefix or creation time query"""
+        if self._id_index_ready:
+            return
+        self._id_index_ready = True
+        self._id_index = SortedIndex(self.data)
+
+    def _ensure_completion_index(self) -> None:
+        """Build ID and title completion index on first completion"""
+        if self._completion_index_ready:
+            return
+        self._completion_index_ready = True
+        self._completion_index.build((note.id, self._completion_words(note)) for note in self.data.values())
+
+    @staticmethod
+    def _completion_words(note: NoteRecord) -> list[str]:
+        """ID and title tails from every word of the title, casefolded"""
+        words = note.title.casefold().split()
+        return [note.id.casefold(), *(" ".join(words[i:]) for i in range(len(words)))]
 
     def __normalize_key(self, key: str) -> str:
         return str(key).upper()
+
+    def _index_note(self, note: NoteRecord) -> None:
+        if self._completion_index_ready:
+            self._completion_index.add(note.id, self._completion_words(note))
+        if not self._indexes_ready:
+            return
+        if note.id not in self._order:
+            self._order[note.id] = self._next_order
+            self._next_order += 1
+        self._unindex_note(note.id)
+        tags = frozenset(tag.casefold() for tag in note.tags)
+        self._note_tags[note.id] = tags
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(note.id)
+        if self._text_index_ready:
+            self._text_index.add(note.id, (note.title, note.text))
+
+    def _unindex_note(self, note_id: str) -> None:
+        self._text_index.remove(note_id)
+        for tag in self._note_tags.pop(note_id, ()):
+            ids = self._tag_index.get(tag)
+            if ids is None:
+                continue
+            ids.discard(note_id)
+            if not ids:
+                del self._tag_index[tag]
+
+    def _on_note_changed(self, note: NoteRecord) -> None:
+        if self.data.get(note.id) is note:
+            self._index_note(note)
+            self._notify(note.id, note)
     
     def add(self, note: NoteRecord) -> None:
         """
@@ -60,18 +227,73 @@ class Notes(UserDict[str, NoteRecord]):
         if note.id in self.data:
             raise KeyError(f"Note with id {note.id} already exists.")
         self.data[note.id] = note
+        if self._id_index_ready:
+            self._id_index.add(note.id)
+        self._index_note(note)
+        note.subscribe(self._on_note_changed)
+        self._notify(note.id, note)
 
     def delete(self, key: str) -> NoteRecord | None:
         """
         Delete note.
         Returns deleted note or None if not found
         """
-        return self.data.pop(self.__normalize_key(key), None)
+        note = self.data.pop(self.__normalize_key(key), None)
+        if note is not None:
+            note.unsubscribe(self._on_note_changed)
+            self._unindex_note(note.id)
+            self._completion_index.remove(note.id)
+            self._id_index.remove(note.id)
+            self._order.pop(note.id, None)
+            self._notify(note.id, None)
+        return note
+
+    def restore(self, key: str, note: NoteRecord | None) -> None:
+        """Apply a stored change: add or replace the note in place (order is kept), None deletes the key"""
+        if note is None:
+            self.delete(key)
+            return
+        old = self.data.get(note.id)
+        if old is None:
+            self.add(note)
+            return
+        if old is not note:
+            old.unsubscribe(self._on_note_changed)
+            note.subscribe(self._on_note_changed)
+        self.data[note.id] = note
+        self._index_note(note)
+        self._notify(note.id, note)
 
     def get(self, key, default=None) -> NoteRecord | None:
         """Returns note by ID or None if not found"""
         return super().get(self.__normalize_key(key), default)
 
+    def _ids_between(self, start: str, stop: str, limit: int | None = None) -> list[str]:
+        """Sorted IDs start <= id < stop"""
+        self._ensure_id_index()
+        return self._id_index.range(start, stop, limit)
+
+    def resolve(self, key: str) -> NoteRecord | None:
+        """
+        Returns note by ID or unique ID prefix (like git short hashes), None if not found.
+        Raises:
+            AmbiguousNoteId: if several notes have IDs with the prefix
+        """
+        prefix = self.__normalize_key(key).strip()
+        note = self.get(prefix)
+        if note is not None or not prefix:
+            return note
+        ids = self._ids_between(prefix, prefix + "\uffff", limit=2)
+        if len(ids) > 1:
+            raise excp.AmbiguousNoteId(prefix)
+        return self.get(ids[0]) if ids else None
+
+    def created_between(self, start: datetime, end: datetime) -> list[NoteRecord]:
+        """Notes created start <= time < end (by ULID), oldest first"""
+        ids = self._ids_between(ulid_time_prefix(start), ulid_time_prefix(end))
+        notes = (self.get(note_id) for note_id in ids)
+        return [note for note in notes if note is not None and note.created is not None]
+
     def __setitem__(self, key: str, item: NoteRecord) -> None:
         raise KeyError("Error. Use method add()")
 
@@ -84,6 +306,14 @@ class Notes(UserDict[str, NoteRecord]):
         except Exception:
             return False
 
+    def __getstate__(self) -> dict:
+        return {"data": self.data}
+
+    def __setstate__(self, state: dict) -> None:
+        self.data = state["data"]
+        self._init_indexes()
+
+    @cached_query()
     def find(self, criteria: str) -> list[NoteRecord]:
         """
         Find notes that have matching tags.
@@ -92,14 +322,36 @@ class Notes(UserDict[str, NoteRecord]):
             alphabetical order of matching tags, 
             title
         """
-        result = []
+        self._ensure_indexes()
+        matches: dict[str, set[str]] = {}
         search_tags = set(criteria.casefold().split())
 
-        for rec in self.values():
-            rec_tags = set(tag.casefold() for tag in rec.tags)
-            matched_tags = rec_tags & search_tags
-            if matched_tags:
-                result.append((rec, matched_tags))
+        for tag in search_tags:
+            for note_id in self._tag_index.get(tag, ()):
+                matches.setdefault(note_id, set()).add(tag)
 
+        ids = sorted(matches, key=self._order.__getitem__)
+        result = [(self.data[note_id], matches[note_id]) for note_id in ids]
         result.sort(key=lambda pair: (-len(pair[1]), sorted(pair[1]), pair[0].title.casefold()))
         return [rec for rec, _ in result]
+
+    def complete(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[NoteRecord]:
+        """
+        Notes with ID or title (or a word of the title and the rest of it) starting with the prefix,
+        for argument completion. Ordered by the matched text.
+        """
+        self._ensure_completion_index()
+        prefix = " ".join(prefix.casefold().split()) + (" " if prefix[-1:].isspace() and prefix.strip() else "")
+        return [self.data[note_id] for note_id in self._completion_index.keys(prefix, limit)]
+
+    def search(self, query: str) -> list[NoteRecord]:
+        """
+        Full-text search in titles and texts.
+        Query words match whole words, word* matches words by prefix, "quoted words" match a phrase.
+        Returns notes matching any part of the query, the most relevant (BM25) first.
+        """
+        self._ensure_text_index()
+        scores = self._text_index.scores(query)
+        ranked = sorted(scores.items(), key=itemgetter(1), reverse=True)
+        data = self.data
+        return [data[note_id] for note_id, _ in ranked]
@@ -3,20 +3,27 @@ import sys
 from pathlib import Path
 import types
 from colorama import Fore, Back, Style, init
+from contextlib import AbstractContextManager, nullcontext
+from datetime import date, datetime, time, timedelta
 from functools import wraps
+from typing import Iterator
 from personal_assistant.notes import exceptions as excp
 from personal_assistant.notes.classes import NoteRecord, Notes
-from personal_assistant.common import promt_pretty, read_command
+from personal_assistant.common import command_failed, iter_locked, promt_pretty, read_command
 from personal_assistant.notes import views
+from personal_assistant import exporter
 from personal_assistant.views import draw_help
 
 
 HELP_COMMANDS_LIST = [
     types.SimpleNamespace(command="add", cmd="add", description="add note"),
-    types.SimpleNamespace(command="search <tags>", cmd="search", description="search notes by title or content"),
-    types.SimpleNamespace(command="edit <id>", cmd="edit", description="edit note"),
-    types.SimpleNamespace(command="delete <id>", cmd="delete", description="delete note"),
+    types.SimpleNamespace(command="search <query>", cmd="search", description='search notes by title or content: words, prefix*, "phrase"; #tags to search by tags'),
+    types.SimpleNamespace(command="show <id>", cmd="show", description="show note by ID or its unique start"),
+    types.SimpleNamespace(command="created <from> [to]", cmd="created", description="show notes created in the dates DD.MM.YYYY (to today by default)"),
+    types.SimpleNamespace(command="edit <id>", cmd="edit", description="edit note (ID or its unique start)"),
+    types.SimpleNamespace(command="delete <id>", cmd="delete", description="delete note (ID or its unique start)"),
     types.SimpleNamespace(command="all", cmd="all", description="show all notes"),
+    types.SimpleNamespace(command="export <file> [tags]", cmd="export", description="export notes (all or with tags) to CSV or JSONL file"),
     types.SimpleNamespace(command="help, ?", cmd="help", description="this help"),
     types.SimpleNamespace(command="back", cmd="back", description="back to main menu"),
     types.SimpleNamespace(command="close, exit, quit", cmd="close, exit, quit", description="exit")
@@ -31,11 +38,14 @@ def input_error(func):
         try:
             return func(*args, **kwargs)
         except excp.ApplicationBaseError as e:
+            command_failed(e.strerror)
             return f"{Fore.RED}{e.strerror}"
         except (ValueError, IndexError) as e:
+            command_failed("Wrong arguments for the command")
             if func.__name__ in funcs_local:
                 return f"{Fore.RED}Wrong arguments for the command. Type '?' for help."
         except Exception as e:
+            command_failed(f"Error: {e}")
             return f"{Fore.RED}Error: {e}"
     return wraper
 
@@ -53,7 +63,8 @@ def cmd_show_help():
 
 
 @input_error
-def cmd_add_note(notes: Notes):
+def cmd_add_note(notes: Notes, lock: AbstractContextManager = nullcontext()):
+    """Command: add, title and text are asked without lock"""
     title = promt_pretty("Enter a title")
     if title is None:
         raise excp.CancelCommand()
@@ -63,77 +74,147 @@ def cmd_add_note(notes: Notes):
 
     record = NoteRecord(title, text)
 
-    notes.add(record)
+    with lock:
+        notes.add(record)
 
     return "Note added."
 
 @input_error
-def cmd_show_all(notes: Notes):
-    if not notes.data:
+def cmd_show_all(notes: Notes, lock: AbstractContextManager = nullcontext()):
+    with lock:
+        ids = list(notes.keys())
+    if not ids:
         return "No notes found."
-    notes_list = list(notes.data.values())
-   
-    views.draw_notes("📝 All Notes", notes_list)
+
+    found_notes = (note for note_id in ids if (note := notes.get(note_id)) is not None)
+    views.draw_notes_pages("📝 All Notes", iter_locked(found_notes, lock))
     return ""
 
 
+def complete_argument(notes: Notes, command: str, text: str) -> Iterator[tuple[str, str]]:
+    """Completions of the note argument: (id, title) for edit and delete, (title, id) for search"""
+    if command in ("show", "edit", "delete"):
+        for note in notes.complete(text):
+            yield note.id, note.title
+    elif command == "search":
+        for note in notes.complete(text):
+            yield note.title, note.id
+
+
 @input_error
-def cmd_search_notes(note: Notes, args: list[str]):
+def cmd_search_notes(note: Notes, args: list[str], lock: AbstractContextManager = nullcontext()):
     search_value = " ".join(args)
 
     if not search_value.strip():
         raise ValueError()
 
-    found_notes = note.find(search_value)
+    words = search_value.split()
+    with lock:
+        if all(word.startswith("#") for word in words):
+            found_notes = note.find(" ".join(word.strip("#") for word in words))
+        else:
+            found_notes = note.search(search_value)
 
     if not found_notes:
         return "Not found a note. You look all notes with command: all"
 
-    views.draw_notes(f"🔍 Search results for: '{search_value}'", found_notes)
+    views.draw_notes_pages(f"🔍 Search results for: '{search_value}'", found_notes)
     return ""
 
 @input_error
-def cmd_change_note(notes: Notes, args: list[str]):
-    """Command: change title, message"""
-    id = args[0]
+def cmd_show_note(notes: Notes, args: list[str]) -> str:
+    """Command: show <id>"""
+    note_id = args[0]
+    record = notes.resolve(note_id)
+    if not record:
+        raise excp.NoteNotFound(f"Note with ID '{note_id}' not found")
+
+    views.draw_notes(f"📝 Note {record.id}", [record])
+    return ""
 
-    record = notes.get(id)
 
-    if not record:
-        raise excp.NoteNotFound()
+@input_error
+def cmd_created_notes(notes: Notes, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: created <from> [to]"""
+    start = datetime.strptime(args[0], "%d.%m.%Y")
+    end = datetime.strptime(args[1], "%d.%m.%Y") if len(args) > 1 else datetime.combine(date.today(), time())
+    with lock:
+        found_notes = notes.created_between(start, end + timedelta(days=1))
+    if not found_notes:
+        return "No notes created in these dates."
 
-    title = promt_pretty("Title", default_text=record.title)
+    views.draw_notes_pages(f"📝 Notes created {start:%d.%m.%Y} - {end:%d.%m.%Y}", found_notes)
+    return ""
+
+
+def _current_note(notes: Notes, note_id: str, content: tuple[str, str]) -> NoteRecord:
+    """Note of the ID if its (title, text) wasn't changed since it was read (under lock)"""
+    record = notes.get(note_id)
+    if record is None:
+        raise excp.NoteNotFound(f"Note with ID '{note_id}' not found")
+    if (record.title, record.text) != content:
+        raise excp.NoteChanged()
+    return record
+
+
+@input_error
+def cmd_change_note(notes: Notes, args: list[str], lock: AbstractContextManager = nullcontext()):
+    """Command: change title, message (asked without lock)"""
+    id = args[0]
+
+    with lock:
+        record = notes.resolve(id)
+        if not record:
+            raise excp.NoteNotFound()
+        # the note can be reloaded or changed by another instance while the user edits it
+        note_id, content = record.id, (record.title, record.text)
+
+    title = promt_pretty("Title", default_text=content[0])
     if title is None:
         raise excp.CancelCommand()
-    record.title = title
 
-    text = promt_pretty("Text", default_text=record.text, multiline=True)
+    text = promt_pretty("Text", default_text=content[1], multiline=True)
     if text is None:
         raise excp.CancelCommand()
-    record.text = text
+
+    with lock:
+        record = _current_note(notes, note_id, content)
+        record.title = title
+        record.text = text
 
     return "Note updated."
 
 
 @input_error
-def cmd_delete_note(notes: Notes, args: list[str]) -> str:
-    """Command: delete <id>"""
+def cmd_delete_note(notes: Notes, args: list[str], lock: AbstractContextManager = nullcontext()) -> str:
+    """Command: delete <id>, confirmation is asked without lock"""
     note_id = args[0]
-    record = notes.get(note_id)
-
-    if not record:
-        raise excp.NoteNotFound(f"Note with ID '{note_id}' not found")
+    with lock:
+        record = notes.resolve(note_id)
+        if not record:
+            raise excp.NoteNotFound(f"Note with ID '{note_id}' not found")
+        content = (record.title, record.text)
 
     views.draw_notes(f"{Fore.RED}Note to delete", [record])
 
     answer = read_command(f"Are you sure you want to delete this note? (yes/no): ", color="ansired")
     if answer.casefold() in ("y", "yes"):
-        notes.delete(note_id)
-        return f"{Fore.GREEN}Note with ID '{note_id}' deleted successfully!"
+        with lock:
+            _current_note(notes, record.id, content)
+            notes.delete(record.id)
+        return f"{Fore.GREEN}Note with ID '{record.id}' deleted successfully!"
     
     return f"{Fore.RED}Note deletion cancelled."
 
 
+@input_error
+def cmd_export_notes(notes: Notes, args: list[str]) -> str:
+    """Command: export <file> [tags]"""
+    path, *tags = args
+    count = exporter.export_notes(notes, Path(path).expanduser(), tags)
+    return f"{Fore.GREEN}Exported {count} notes to '{path}'"
+
+
 def get_function_names():
     current_module = sys.modules[__name__]
     return [
@@ -1,45 +1,71 @@
+from contextlib import nullcontext
+from functools import partial
 from colorama import Fore, Back, Style, init
-from typing import cast
 from personal_assistant.notes import commands
 from personal_assistant.notes.classes import Notes
-from personal_assistant.common import get_data_path, read_command, load_data, save_data
+from personal_assistant.common import command_failed, get_data_path, is_batch, make_completer, read_command
+from personal_assistant.storage import open_storage
 
 
 init(autoreset=True)
 
 NOTES_FILE_PATH = get_data_path("notes.pkl")
 
+# Commands waiting for the user (pages, questions) take the storage lock only to read and change data
+UNLOCKED_COMMANDS = {"add", "edit", "delete", "search", "created", "all"}
+
 def main():
-    data = load_data(NOTES_FILE_PATH)
-    book = cast(Notes, data) if data else Notes()
+    # batch mode saves at the end of the script and on 'commit' commands
+    batch = is_batch()
+    storage = open_storage(NOTES_FILE_PATH, autosave=not batch)
+    book = storage.load(Notes)
     print(f"{Fore.CYAN}Notes contains {len(book.keys())} records")
 
+    completer = make_completer(commands.COMMAND_LIST, partial(commands.complete_argument, book))
+
     while True:
-        cmd_str = read_command("Notes command: ", commands=commands.COMMAND_LIST)
+        cmd_str = read_command("Notes command: ", completer=completer)
         if not cmd_str:
             command = None
             continue
         command, *args = commands.parse_input(cmd_str)
 
-        match command:
-            case "help" | "?":
-                commands.cmd_show_help()
-            case "add":
-                print(commands.cmd_add_note(book))
-            case "search":
-                print(commands.cmd_search_notes(book, args))
-            case "edit":
-                print(commands.cmd_change_note(book, args))
-            case "delete":
-                print(commands.cmd_delete_note(book, args))
-            case "all":
-                print(commands.cmd_show_all(book))
-            case "close" | "exit" | "quit" | "back":
-                break
-            case _:
-                print(f"{Fore.RED}Invalid command.")
-
-    save_data(book, NOTES_FILE_PATH)
+        # another instance could save the data since the last command
+        storage.refresh()
+        # autosave pickles data in background, commands change it under the lock
+        lock = nullcontext() if command in UNLOCKED_COMMANDS else storage.lock
+        with lock:
+            match command:
+                case "help" | "?":
+                    commands.cmd_show_help()
+                case "add":
+                    print(commands.cmd_add_note(book, storage.lock))
+                case "search":
+                    print(commands.cmd_search_notes(book, args, storage.lock))
+                case "show":
+                    print(commands.cmd_show_note(book, args))
+                case "created":
+                    print(commands.cmd_created_notes(book, args, storage.lock))
+                case "edit":
+                    print(commands.cmd_change_note(book, args, storage.lock))
+                case "delete":
+                    print(commands.cmd_delete_note(book, args, storage.lock))
+                case "all":
+                    print(commands.cmd_show_all(book, storage.lock))
+                case "export":
+                    print(commands.cmd_export_notes(book, args))
+                case "commit":
+                    storage.commit()
+                case "close" | "exit" | "quit" | "back":
+                    break
+                case _:
+                    print(f"{Fore.RED}Invalid command.")
+                    command_failed("Invalid command")
+
+        if not batch:
+            storage.commit()
+
+    storage.close()
 
     return "exit" if command in {"close", "exit", "quit"} else None
 
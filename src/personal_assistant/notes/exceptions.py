@@ -5,3 +5,13 @@ class NoteBaseError(ApplicationBaseError): ...
 class NoteNotFound(ApplicationBaseError):
     def __init__(self, msg: str = "Note not found", *args: object) -> None:
         super().__init__(msg, args)
+
+
+class NoteChanged(NoteBaseError):
+    def __init__(self, msg: str = "Note was changed by another instance, try again", *args: object) -> None:
+        super().__init__(msg, args)
+
+
+class AmbiguousNoteId(NoteBaseError):
+    def __init__(self, prefix: str, *args: object) -> None:
+        super().__init__(f"Note ID '{prefix}' is ambiguous, type more characters", args)
@@ -1,5 +1,6 @@
 from personal_assistant.notes.classes import NoteRecord
-from personal_assistant.common import draw_table
+from typing import Iterable
+from personal_assistant.common import draw_table, draw_table_pages
 
 
 NOTE_TABLE_CONFIG = [
@@ -35,3 +36,12 @@ def draw_notes(caption: str, notes_list: list[NoteRecord]):
         columns_config = NOTE_TABLE_CONFIG,
         data = notes_list
     )
+
+
+def draw_notes_pages(caption: str, notes: Iterable[NoteRecord]):
+    """Print notes page by page"""
+    draw_table_pages(
+        title = caption,
+        columns_config = NOTE_TABLE_CONFIG,
+        data = notes
+    )
@@ -0,0 +1,379 @@
+"""
+Local service sharing one address book and notes between clients.
+
+Protocol: JSON Lines over a Unix socket or a localhost TCP port.
+Request: {"id": any, "op": "contacts.find", "args": {"criteria": "john"}}
+Response: {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false, "error": "message"}
+Operations (args): contacts.find (criteria, limit), contacts.get (name), contacts.birthdays (days, limit),
+contacts.add (name, phones, emails, birthday, address), contacts.edit (name, changed fields),
+contacts.delete (name), notes.find (tags, limit), notes.search (query, limit), notes.get (id),
+notes.add (title, text), notes.edit (id, title, text), notes.delete (id),
+cache.stats - hits and misses of query result caches.
+
+Requests of a connection are answered in order, so clients can pipeline them
+(send many requests before reading responses). Reads run in the event loop and are
+served between writes of other clients; a read of a storage whose lock is held by a commit
+in the executor thread waits for it in the executor, so the loop keeps serving other requests.
+Writes are serialized and answered after the change is saved (committed to the journal or
+database, the whole file is saved in pickle mode). Unexpected errors are logged and answered
+as "Internal error".
+"""
+import asyncio
+import json
+import logging
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable
+from personal_assistant.exceptions import ApplicationBaseError
+from personal_assistant.addr_book import exceptions as excp
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.addr_book.importer import ContactRow, validate_row
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.notes.exceptions import NoteNotFound
+from personal_assistant.exporter import contact_to_json, note_to_json
+from personal_assistant.storage import PickleStorage
+
+
+DEFAULT_PORT = 8765
+SOCKET_FILENAME = "assistant.sock"
+# Max request line size
+LINE_LIMIT = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class ProtocolError(ApplicationBaseError):
+    def __init__(self, msg: str = "Invalid request", *args: object) -> None:
+        super().__init__(msg, args)
+
+
+def _contact_row(name: str, phones: list[str] | None, emails: list[str] | None,
+                 birthday: str | None, address: str | None) -> ContactRow:
+    return ContactRow(0, name, ", ".join(phones or []), ", ".join(emails or []), birthday or "", address or "")
+
+
+def _check_str(name: str, value: Any, optional: bool = False) -> None:
+    """Arguments are checked before data is changed: a wrong type must not leave a half-changed record"""
+    if not isinstance(value, str) and not (optional and value is None):
+        raise ProtocolError(f"'{name}' must be a string")
+
+
+def _valid_record(row: ContactRow) -> Record:
+    record, errors = validate_row(row)
+    if errors:
+        raise excp.ContactBaseError("; ".join(errors))
+    return record
+
+
+class Service:
+    """
+    Operations over the address book and notes of the storages (already loaded).
+    Storage lock is held while data is changed (see AutoSaver).
+    """
+    def __init__(self, book_storage: PickleStorage, notes_storage: PickleStorage):
+        self.book_storage = book_storage
+        self.notes_storage = notes_storage
+        self.book: AddressBook = book_storage.data
+        self.notes: Notes = notes_storage.data
+        self._write_lock = asyncio.Lock()
+        self.requests = 0
+
+    def warm_up(self) -> None:
+        """Build lazy indexes before serving, so the first clients don't wait for them"""
+        self.book._ensure_indexes()
+        self.notes._ensure_indexes()
+        self.notes._ensure_text_index()
+
+    # contacts
+
+    def contacts_find(self, criteria: str, limit: int | None = None) -> list[dict]:
+        return [contact_to_json(record) for record in islice(self.book.iter_find(criteria), limit)]
+
+    def contacts_get(self, name: str) -> dict:
+        record = self.book.get(name)
+        if record is None:
+            raise excp.ContactNotFound(f"Contact '{name}' not found")
+        return contact_to_json(record)
+
+    def contacts_birthdays(self, days: int = 7, limit: int | None = None) -> list[dict]:
+        return [contact_to_json(record) for record in self.book.get_upcoming_birthdays(int(days))[:limit]]
+
+    def contacts_add(self, name: str, phones: list[str] | None = None, emails: list[str] | None = None,
+                     birthday: str | None = None, address: str | None = None) -> dict:
+        if self.book.get(name) is not None:
+            raise excp.ContactExist(f"Contact '{name}' already exist")
+        record = _valid_record(_contact_row(name, phones, emails, birthday, address))
+        self.book.add_record(record)
+        return contact_to_json(record)
+
+    def contacts_edit(self, name: str, **fields: Any) -> dict:
+        """Change given fields (phones, emails, birthday, address), None clears birthday and address"""
+        record = self.book.get(name)
+        if record is None:
+            raise excp.ContactNotFound(f"Contact '{name}' not found")
+        unknown = set(fields) - {"phones", "emails", "birthday", "address"}
+        if unknown:
+            raise ProtocolError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        current = contact_to_json(record)
+        current["birthday"] = str(record.birthday) if record.birthday.value else None
+        current.update(fields)
+        new = _valid_record(_contact_row(record.name.value, current["phones"], current["emails"],
+                                         current["birthday"], current["address"]))
+        record.phones.clear()
+        record.phones.extend(new.phones)
+        record.emails.clear()
+        record.emails.extend(new.emails)
+        record.birthday = str(new.birthday) if new.birthday.value else None
+        record.address = new.address.value
+        return contact_to_json(record)
+
+    def contacts_delete(self, name: str) -> bool:
+        if self.book.get(name) is None:
+            raise excp.ContactNotFound(f"Contact '{name}' not found")
+        self.book.delete(name)
+        return True
+
+    # notes
+
+    def notes_find(self, tags: str, limit: int | None = None) -> list[dict]:
+        return [note_to_json(note) for note in self.notes.find(tags)[:limit]]
+
+    def notes_search(self, query: str, limit: int | None = None) -> list[dict]:
+        return [note_to_json(note) for note in self.notes.search(query)[:limit]]
+
+    def notes_get(self, id: str) -> dict:
+        note = self.notes.get(id)
+        if note is None:
+            raise NoteNotFound(f"Note with ID '{id}' not found")
+        return note_to_json(note)
+
+    def notes_add(self, title: str, text: str = "") -> dict:
+        _check_str("title", title)
+        _check_str("text", text)
+        note = NoteRecord(title, text)
+        self.notes.add(note)
+        return note_to_json(note)
+
+    def notes_edit(self, id: str, title: str | None = None, text: str | None = None) -> dict:
+        note = self.notes.get(id)
+        if note is None:
+            raise NoteNotFound(f"Note with ID '{id}' not found")
+        _check_str("title", title, optional=True)
+        _check_str("text", text, optional=True)
+        if title is not None:
+            note.title = title
+        if text is not None:
+            note.text = text
+        return note_to_json(note)
+
+    def notes_delete(self, id: str) -> bool:
+        if self.notes.delete(id) is None:
+            raise NoteNotFound(f"Note with ID '{id}' not found")
+        return True
+
+    def cache_stats(self) -> dict:
+        return {"contacts": self.book.query_cache.stats(), "notes": self.notes.query_cache.stats()}
+
+    async def _commit(self, storage: PickleStorage) -> None:
+        if storage.commit_in_thread:
+            # the commit holds the storage lock only while it pickles changes, writing and fsync
+            # don't block the loop
+            await asyncio.get_running_loop().run_in_executor(None, storage.flush)
+        else:
+            storage.flush()
+
+    def _read(self, storage: PickleStorage, op: str, args: dict[str, Any]) -> Any:
+        with storage.lock:
+            return READ_OPS[op](self, **args)
+
+    async def call(self, op: str, args: dict[str, Any]) -> Any:
+        self.requests += 1
+        if op not in READ_OPS and op not in WRITE_OPS:
+            raise ProtocolError(f"Unknown operation '{op}'")
+        storage = self.book_storage if op.startswith("contacts.") else self.notes_storage
+        if op in READ_OPS:
+            loop = asyncio.get_running_loop()
+            # data can be saved by other instances (a stat call when it is not)
+            if storage.commit_in_thread and storage.changed():
+                # replaying waits for the file lock of the saving instance
+                await loop.run_in_executor(None, storage.refresh)
+            else:
+                storage.refresh()
+            if storage.lock.acquire(blocking=False):
+                try:
+                    return READ_OPS[op](self, **args)
+                finally:
+                    storage.lock.release()
+            if storage.commit_in_thread:
+                # held by a commit (or compaction) in the executor thread, wait for it there
+                return await loop.run_in_executor(None, self._read, storage, op, args)
+            return self._read(storage, op, args)
+
+        async with self._write_lock:
+            with storage.lock:
+                result = WRITE_OPS[op](self, **args)
+            await self._commit(storage)
+        return result
+
+    async def handle(self, request: Any) -> dict[str, Any]:
+        """Returns response to the decoded request"""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("op"), str):
+                raise ProtocolError()
+            args = request.get("args") or {}
+            if not isinstance(args, dict):
+                raise ProtocolError("Arguments must be an object")
+            try:
+                result = await self.call(request["op"], args)
+            except (TypeError, ValueError) as e:
+                raise ProtocolError(f"Invalid arguments: {e}")
+        except ApplicationBaseError as e:
+            return {"id": request_id, "ok": False, "error": e.strerror}
+        except Exception:
+            # a bug must not drop the connection with the pipelined requests of the client
+            logger.exception("Request %r failed", request)
+            return {"id": request_id, "ok": False, "error": "Internal error"}
+        return {"id": request_id, "ok": True, "result": result}
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"id": None, "ok": False, "error": "Invalid JSON"}
+                else:
+                    response = await self.handle(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                # don't let a pipelining client grow the buffer without limit
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+READ_OPS: dict[str, Callable[..., Any]] = {
+    "contacts.find": Service.contacts_find,
+    "contacts.get": Service.contacts_get,
+    "contacts.birthdays": Service.contacts_birthdays,
+    "notes.find": Service.notes_find,
+    "notes.search": Service.notes_search,
+    "notes.get": Service.notes_get,
+    "cache.stats": Service.cache_stats,
+}
+
+WRITE_OPS: dict[str, Callable[..., Any]] = {
+    "contacts.add": Service.contacts_add,
+    "contacts.edit": Service.contacts_edit,
+    "contacts.delete": Service.contacts_delete,
+    "notes.add": Service.notes_add,
+    "notes.edit": Service.notes_edit,
+    "notes.delete": Service.notes_delete,
+}
+
+
+async def start_server(service: Service, socket_path: Path | str | None = None,
+                       host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    """Listen on the Unix socket (if socket_path is given) or on host:port"""
+    if socket_path is not None:
+        Path(socket_path).unlink(missing_ok=True)
+        return await asyncio.start_unix_server(service.serve_client, socket_path, limit=LINE_LIMIT)
+    return await asyncio.start_server(service.serve_client, host, port, limit=LINE_LIMIT)
+
+
+class Client:
+    """Asyncio client of the service, requests can be pipelined with call_many"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, socket_path: Path | str | None = None,
+                      host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> "Client":
+        if socket_path is not None:
+            reader, writer = await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    def send(self, op: str, **args: Any) -> int:
+        """Send request without waiting for the response, returns request id"""
+        self._next_id += 1
+        request = {"id": self._next_id, "op": op, "args": args}
+        self.writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        return self._next_id
+
+    async def receive(self) -> dict[str, Any]:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        return json.loads(line)
+
+    async def call(self, op: str, **args: Any) -> Any:
+        """Send request and return result, raises ApplicationBaseError with the error of the response"""
+        self.send(op, **args)
+        await self.writer.drain()
+        response = await self.receive()
+        if not response["ok"]:
+            raise ApplicationBaseError(response["error"])
+        return response["result"]
+
+    async def call_many(self, requests: list[tuple[str, dict[str, Any]]]) -> list[dict[str, Any]]:
+        """Pipeline requests, returns responses in the same order"""
+        for op, args in requests:
+            self.send(op, **args)
+        await self.writer.drain()
+        return [await self.receive() for _ in requests]
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def run_server(socket_path: Path | str | None = None, port: int | None = None) -> None:
+    """
+    Serve the address book and notes of the data directory until interrupted.
+    Listens on the Unix socket in the data directory (or DEFAULT_PORT where Unix sockets
+    are not supported) if neither socket_path nor port is given.
+    """
+    from personal_assistant.common import get_data_path
+    from personal_assistant.storage import open_storage
+    from personal_assistant.addr_book.controller import ADDR_BOOK_FILENAME
+    from personal_assistant.notes.controller import NOTES_FILE_PATH
+
+    if socket_path is None and port is None:
+        if hasattr(asyncio, "start_unix_server"):
+            socket_path = get_data_path(SOCKET_FILENAME)
+        else:
+            port = DEFAULT_PORT
+
+    book_storage = open_storage(ADDR_BOOK_FILENAME)
+    notes_storage = open_storage(NOTES_FILE_PATH)
+    book_storage.load(AddressBook)
+    notes_storage.load(Notes)
+    service = Service(book_storage, notes_storage)
+    service.warm_up()
+
+    async def serve() -> None:
+        server = await start_server(service, socket_path, port=port or DEFAULT_PORT)
+        address = socket_path if socket_path is not None else f"127.0.0.1:{port}"
+        print(f"Serving {len(service.book)} contacts and {len(service.notes)} notes on {address}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        book_storage.close()
+        notes_storage.close()
+        if socket_path is not None:
+            Path(socket_path).unlink(missing_ok=True)
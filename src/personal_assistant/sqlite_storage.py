@@ -0,0 +1,541 @@
+import os
+import sqlite3
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+from personal_assistant.addr_book.classes import AddressBook, Record, Phone, Email
+from personal_assistant.notes.classes import Notes, NoteRecord
+from personal_assistant.indexes import TextIndex, parse_query, COMPLETION_LIMIT
+from personal_assistant.common import file_lock
+from personal_assistant.storage import PickleStorage, JournalStorage
+
+
+T = TypeVar('T')
+
+ADDRESS_BOOK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    birthday TEXT,
+    birthday_md INTEGER,
+    address TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_birthday_md ON contacts(birthday_md);
+CREATE TABLE IF NOT EXISTS phones (
+    contact_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (contact_id, pos)
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones(phone);
+CREATE TABLE IF NOT EXISTS emails (
+    contact_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (contact_id, pos)
+);
+CREATE INDEX IF NOT EXISTS emails_email ON emails(email);
+"""
+
+NOTES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_tags (
+    note_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (note_id, tag)
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags(tag);
+"""
+
+# Search texts of a contact (name, phones, emails, address) are stored in rows
+# with rowid = contact_id * SEARCH_FIELDS + field number.
+SEARCH_FIELDS = 4
+
+
+def create_search_table(connection: sqlite3.Connection, table: str) -> bool:
+    """
+    Create full-text search table with trigram tokenizer (substring search, SQLite 3.34+).
+    Falls back to a plain table when FTS5 trigram is not available.
+    Returns True if the table supports MATCH.
+    """
+    try:
+        connection.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(text, tokenize='trigram case_sensitive 1')"
+        )
+        return True
+    except sqlite3.OperationalError:
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (rowid INTEGER PRIMARY KEY, text TEXT NOT NULL)")
+        return False
+
+
+def create_text_table(connection: sqlite3.Connection, table: str, columns: list[str]) -> bool:
+    """
+    Create full-text search table with word tokenizer and BM25 ranking.
+    Returns False when FTS5 is not available.
+    """
+    try:
+        connection.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, tokenize='unicode61')"
+        )
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_query(query: str) -> str:
+    """Convert search query (words, word*, "phrases") to FTS5 MATCH expression"""
+    parts = []
+    for kind, tokens in parse_query(query):
+        phrase = '"' + " ".join(tokens).replace('"', '""') + '"'
+        parts.append(phrase + " *" if kind == "prefix" else phrase)
+    return " OR ".join(parts)
+
+
+class SqliteAddressBook(AddressBook):
+    """
+    Address book stored in SQLite database.
+    Records are loaded on demand and written to the database on every change,
+    changes are persisted by connection.commit().
+    """
+    # the database can be changed by other processes
+    QUERY_CACHE_SIZE = 0
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.data = {}
+        self.connection = connection
+        self.connection.executescript(ADDRESS_BOOK_SCHEMA)
+        self._fts = create_search_table(connection, "contacts_search")
+        self._records: weakref.WeakValueDictionary[str, Record] = weakref.WeakValueDictionary()
+
+    def _load(self, row: tuple) -> Record:
+        """Returns record from contacts row (id, key, name, birthday, address)"""
+        contact_id, key, name, birthday, address = row
+        record = self._records.get(key)
+        if record is not None:
+            return record
+
+        record = Record(name)
+        phones = self.connection.execute(
+            "SELECT phone FROM phones WHERE contact_id = ? ORDER BY pos", (contact_id,))
+        record.phones.extend(Phone(phone) for phone, in phones)
+        emails = self.connection.execute(
+            "SELECT email FROM emails WHERE contact_id = ? ORDER BY pos", (contact_id,))
+        record.emails.extend(Email(email) for email, in emails)
+        record.birthday = birthday
+        record.address = address
+
+        self._records[key] = record
+        record.subscribe(self._on_record_changed)
+        return record
+
+    def _select(self, where: str = "", params: tuple | list = ()) -> Iterator[Record]:
+        rows = self.connection.execute(
+            f"SELECT id, key, name, birthday, address FROM contacts {where} ORDER BY id", params)
+        for row in rows.fetchall():
+            yield self._load(row)
+
+    def _save(self, key: str, record: Record) -> None:
+        bd = record.birthday.value
+        values = (
+            str(record.name),
+            str(record.birthday) if bd else None,
+            bd.month * 100 + bd.day if bd else None,
+            record.address.value,
+        )
+        row = self.connection.execute("SELECT id FROM contacts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            cursor = self.connection.execute(
+                "INSERT INTO contacts (key, name, birthday, birthday_md, address) VALUES (?, ?, ?, ?, ?)",
+                (key, *values))
+            contact_id = cursor.lastrowid
+        else:
+            contact_id = row[0]
+            self.connection.execute(
+                "UPDATE contacts SET name = ?, birthday = ?, birthday_md = ?, address = ? WHERE id = ?",
+                (*values, contact_id))
+            self._delete_details(contact_id)
+
+        self.connection.executemany(
+            "INSERT INTO phones (contact_id, pos, phone) VALUES (?, ?, ?)",
+            [(contact_id, pos, str(phone)) for pos, phone in enumerate(record.phones)])
+        self.connection.executemany(
+            "INSERT INTO emails (contact_id, pos, email) VALUES (?, ?, ?)",
+            [(contact_id, pos, str(email)) for pos, email in enumerate(record.emails)])
+        self.connection.executemany(
+            "INSERT INTO contacts_search (rowid, text) VALUES (?, ?)",
+            [(contact_id * SEARCH_FIELDS + i, text) for i, text in enumerate(self._search_texts(record))])
+
+    def _delete_details(self, contact_id: int) -> None:
+        self.connection.execute("DELETE FROM phones WHERE contact_id = ?", (contact_id,))
+        self.connection.execute("DELETE FROM emails WHERE contact_id = ?", (contact_id,))
+        self.connection.execute(
+            "DELETE FROM contacts_search WHERE rowid BETWEEN ? AND ?",
+            (contact_id * SEARCH_FIELDS, contact_id * SEARCH_FIELDS + SEARCH_FIELDS - 1))
+
+    def add_record(self, record: Record):
+        key = self._normalize_name(record.name)
+        old = self._records.get(key)
+        if old is not None and old is not record:
+            old.unsubscribe(self._on_record_changed)
+        self._save(key, record)
+        self._records[key] = record
+        record.subscribe(self._on_record_changed)
+        self._notify(key, record)
+
+    def _on_record_changed(self, record: Record) -> None:
+        key = self._normalize_name(record.name)
+        if self._records.get(key) is record:
+            self._save(key, record)
+            self._notify(key, record)
+
+    def delete(self, name: str):
+        key = self._normalize_name(name)
+        row = self.connection.execute("SELECT id FROM contacts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self._delete_details(row[0])
+        self.connection.execute("DELETE FROM contacts WHERE id = ?", (row[0],))
+        record = self._records.pop(key, None)
+        if record is not None:
+            record.unsubscribe(self._on_record_changed)
+        self._notify(key, None)
+
+    def iter_find(self, criteria: str) -> Iterator[Record]:
+        """
+        Search for a contact using criteria.
+        Uses trigram full-text index, short criteria checks all contacts.
+        """
+        criteria = criteria.casefold()
+        if self._fts and len(criteria) >= 3:
+            search = "contacts_search MATCH ?"
+            param = '"' + criteria.replace('"', '""') + '"'
+        else:
+            search = "instr(text, ?) > 0"
+            param = criteria
+        where = f"WHERE id IN (SELECT rowid / {SEARCH_FIELDS} FROM contacts_search WHERE {search})"
+        return self._select(where, (param,))
+
+    def complete_names(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[Record]:
+        """Contacts with the name starting with the prefix (range scan of the key index)"""
+        prefix = self._normalize_prefix(prefix)
+        rows = self.connection.execute(
+            "SELECT id, key, name, birthday, address FROM contacts WHERE key >= ? AND key < ? ORDER BY key LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit))
+        return [self._load(row) for row in rows.fetchall()]
+
+    def lookup(self, value: str) -> list[Record]:
+        """Exact search by phone number or email"""
+        value = str(value).strip()
+        if "@" in value:
+            query = "SELECT contact_id FROM emails WHERE email = ?"
+            param = Email._clear_email(value)
+        else:
+            query = "SELECT contact_id FROM phones WHERE phone = ?"
+            param = Phone._clear_phone(value)
+        return list(self._select(f"WHERE id IN ({query})", (param,)))
+
+    def shared_contacts(self) -> Iterator[tuple[str, list[Record]]]:
+        for table, column in (("phones", "phone"), ("emails", "email")):
+            rows = self.connection.execute(
+                f"SELECT {column} FROM {table} GROUP BY {column} HAVING COUNT(DISTINCT contact_id) > 1").fetchall()
+            for value, in rows:
+                query = f"SELECT contact_id FROM {table} WHERE {column} = ?"
+                yield value, list(self._select(f"WHERE id IN ({query})", (value,)))
+
+    def _records_by_birthday(self, month_days: list[tuple[int, int]]) -> Iterator[Record]:
+        if not month_days:
+            return
+        params = [month * 100 + day for month, day in month_days]
+        yield from self._select(f"WHERE birthday_md IN ({', '.join('?' * len(params))})", params)
+
+    def get(self, key, default=None):
+        return next(self._select("WHERE key = ?", (self._normalize_name(key),)), default)
+
+    def __getitem__(self, name: str) -> Record:
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __contains__(self, name: object) -> bool:
+        row = self.connection.execute(
+            "SELECT 1 FROM contacts WHERE key = ?", (self._normalize_name(str(name)),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        for key, in self.connection.execute("SELECT key FROM contacts ORDER BY id").fetchall():
+            yield key
+
+    def values(self) -> Iterator[Record]:
+        """Returns records in insertion order"""
+        return self._select()
+
+    def __getstate__(self) -> dict:
+        raise TypeError("SqliteAddressBook can't be pickled")
+
+
+class SqliteNotes(Notes):
+    """
+    Notes stored in SQLite database.
+    Notes are loaded on demand and written to the database on every change,
+    changes are persisted by connection.commit().
+    """
+    # the database can be changed by other processes
+    QUERY_CACHE_SIZE = 0
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.data = {}
+        self.connection = connection
+        self.connection.executescript(NOTES_SCHEMA)
+        self._fts = create_text_table(connection, "notes_text", ["title", "text"])
+        if self._fts:
+            self._sync_text_table()
+        self._notes: weakref.WeakValueDictionary[str, NoteRecord] = weakref.WeakValueDictionary()
+
+    def _sync_text_table(self) -> None:
+        """Fill text search table of databases created before it was added"""
+        indexed, = self.connection.execute("SELECT COUNT(*) FROM notes_text").fetchone()
+        if indexed != len(self):
+            self.connection.execute("DELETE FROM notes_text")
+            self.connection.execute("INSERT INTO notes_text (rowid, title, text) SELECT seq, title, text FROM notes")
+
+    def _load(self, row: tuple) -> NoteRecord:
+        """Returns note from notes row (id, title, text)"""
+        note_id, title, text = row
+        note = self._notes.get(note_id)
+        if note is None:
+            note = NoteRecord(title, text, note_id)
+            self._notes[note_id] = note
+            note.subscribe(self._on_note_changed)
+        return note
+
+    def _select(self, where: str = "", params: tuple | list = ()) -> Iterator[NoteRecord]:
+        rows = self.connection.execute(f"SELECT id, title, text FROM notes {where} ORDER BY seq", params)
+        for row in rows.fetchall():
+            yield self._load(row)
+
+    def _save(self, note: NoteRecord) -> None:
+        cursor = self.connection.execute(
+            "UPDATE notes SET title = ?, text = ? WHERE id = ?", (note.title, note.text, note.id))
+        if cursor.rowcount == 0:
+            self.connection.execute(
+                "INSERT INTO notes (id, title, text) VALUES (?, ?, ?)", (note.id, note.title, note.text))
+        self.connection.execute("DELETE FROM note_tags WHERE note_id = ?", (note.id,))
+        self.connection.executemany(
+            "INSERT INTO note_tags (note_id, tag) VALUES (?, ?)",
+            [(note.id, tag) for tag in {tag.casefold() for tag in note.tags}])
+        if self._fts:
+            seq, = self.connection.execute("SELECT seq FROM notes WHERE id = ?", (note.id,)).fetchone()
+            self.connection.execute("DELETE FROM notes_text WHERE rowid = ?", (seq,))
+            self.connection.execute(
+                "INSERT INTO notes_text (rowid, title, text) VALUES (?, ?, ?)", (seq, note.title, note.text))
+
+    def _on_note_changed(self, note: NoteRecord) -> None:
+        if self._notes.get(note.id) is note:
+            self._save(note)
+            self._notify(note.id, note)
+
+    def add(self, note: NoteRecord) -> None:
+        """
+        Add note.
+        Raises:
+            KeyError: if duplicate note ID
+        """
+        if note.id in self:
+            raise KeyError(f"Note with id {note.id} already exists.")
+        self._save(note)
+        self._notes[note.id] = note
+        note.subscribe(self._on_note_changed)
+        self._notify(note.id, note)
+
+    def delete(self, key: str) -> NoteRecord | None:
+        """
+        Delete note.
+        Returns deleted note or None if not found
+        """
+        note = self.get(key)
+        if note is None:
+            return None
+        self.connection.execute("DELETE FROM note_tags WHERE note_id = ?", (note.id,))
+        if self._fts:
+            self.connection.execute(
+                "DELETE FROM notes_text WHERE rowid = (SELECT seq FROM notes WHERE id = ?)", (note.id,))
+        self.connection.execute("DELETE FROM notes WHERE id = ?", (note.id,))
+        self._notes.pop(note.id, None)
+        note.unsubscribe(self._on_note_changed)
+        self._notify(note.id, None)
+        return note
+
+    def get(self, key, default=None) -> NoteRecord | None:
+        """Returns note by ID or None if not found"""
+        return next(self._select("WHERE id = ?", (str(key).upper(),)), default)
+
+    def __getitem__(self, key: str) -> NoteRecord:
+        note = self.get(key)
+        if note is None:
+            raise KeyError(key)
+        return note
+
+    def __contains__(self, key: object) -> bool:
+        row = self.connection.execute("SELECT 1 FROM notes WHERE id = ?", (str(key).upper(),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        for note_id, in self.connection.execute("SELECT id FROM notes ORDER BY seq").fetchall():
+            yield note_id
+
+    def values(self) -> Iterator[NoteRecord]:
+        """Returns notes in insertion order"""
+        return self._select()
+
+    def _ids_between(self, start: str, stop: str, limit: int | None = None) -> list[str]:
+        """Sorted IDs start <= id < stop (range scan of the unique ID index)"""
+        rows = self.connection.execute(
+            "SELECT id FROM notes WHERE id >= ? AND id < ? ORDER BY id LIMIT ?",
+            (start, stop, -1 if limit is None else limit))
+        return [note_id for note_id, in rows.fetchall()]
+
+    def complete(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[NoteRecord]:
+        """Notes with ID or title starting with the prefix"""
+        prefix = " ".join(prefix.split())
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self.connection.execute(
+            "SELECT id, title, text FROM notes WHERE (id >= ? AND id < ?) OR title LIKE ? ESCAPE '\\' "
+            "ORDER BY title LIMIT ?", (prefix.upper(), prefix.upper() + "\U0010ffff", pattern, limit))
+        return [self._load(row) for row in rows.fetchall()]
+
+    def find(self, criteria: str) -> list[NoteRecord]:
+        """
+        Find notes that have matching tags.
+        Returns notes sorted by:
+            number of matching tags,
+            alphabetical order of matching tags,
+            title
+        """
+        search_tags = list(set(criteria.casefold().split()))
+        if not search_tags:
+            return []
+
+        matches: dict[str, set[str]] = {}
+        rows = self.connection.execute(
+            f"SELECT note_id, tag FROM note_tags WHERE tag IN ({', '.join('?' * len(search_tags))})",
+            search_tags)
+        for note_id, tag in rows:
+            matches.setdefault(note_id, set()).add(tag)
+        if not matches:
+            return []
+
+        ids = list(matches)
+        notes = self._select(f"WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        result = [(note, matches[note.id]) for note in notes]
+        result.sort(key=lambda pair: (-len(pair[1]), sorted(pair[1]), pair[0].title.casefold()))
+        return [rec for rec, _ in result]
+
+    def search(self, query: str) -> list[NoteRecord]:
+        """
+        Full-text search in titles and texts, the most relevant (BM25) first.
+        Without FTS5 notes are ranked by a temporary in-memory index.
+        """
+        if not self._fts:
+            index: TextIndex[str] = TextIndex()
+            notes = {}
+            for note in self.values():
+                index.add(note.id, (note.title, note.text))
+                notes[note.id] = note
+            scores = index.scores(query)
+            return [notes[note_id] for note_id in sorted(scores, key=lambda note_id: -scores[note_id])]
+
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = self.connection.execute(
+            "SELECT n.id, n.title, n.text FROM notes_text JOIN notes n ON n.seq = notes_text.rowid "
+            "WHERE notes_text MATCH ? ORDER BY bm25(notes_text), n.seq", (match,))
+        return [self._load(row) for row in rows.fetchall()]
+
+    def __getstate__(self) -> dict:
+        raise TypeError("SqliteNotes can't be pickled")
+
+
+SQLITE_CLASSES: dict[type, Callable[[sqlite3.Connection], Any]] = {
+    AddressBook: SqliteAddressBook,
+    Notes: SqliteNotes,
+}
+
+
+class SqliteStorage(PickleStorage):
+    """
+    SQLite storage, database file is the data file path with '.db' suffix.
+    Existing pickled data (with journal) is imported when the database is created (see _import).
+    """
+    # sqlite3 connection can be used only in the thread which created it
+    commit_in_thread = False
+
+    def __init__(self, path: Path | str):
+        super().__init__(path)
+        self.db_path = self.path.with_suffix(".db")
+        self.connection: sqlite3.Connection | None = None
+
+    def load(self, factory: Callable[[], T]) -> T:
+        with file_lock(self.path):
+            if not self.db_path.exists():
+                self._import(factory)
+        self.connection = sqlite3.connect(self.db_path)
+        self.data = SQLITE_CLASSES[factory](self.connection)
+        self.connection.commit()
+        return self.data
+
+    def _import(self, factory: Callable[[], T]) -> None:
+        """
+        Create the database with pickled data (and journal) imported.
+        It is written to a temporary file renamed when complete: an interrupted import
+        leaves no database, and the import runs again on the next start.
+        """
+        tmp_path = self.db_path.with_name(self.db_path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+        try:
+            connection = sqlite3.connect(tmp_path)
+            try:
+                data = SQLITE_CLASSES[factory](connection)
+                old_storage = JournalStorage(self.path)
+                try:
+                    for key, record in old_storage.load(factory).items():
+                        data.restore(key, record)
+                finally:
+                    old_storage.close()
+                connection.commit()
+            finally:
+                connection.close()
+            os.replace(tmp_path, self.db_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def refresh(self) -> bool:
+        # records are read from the database, SQLite locks it between processes itself
+        return False
+
+    def commit(self) -> None:
+        if self.connection is not None:
+            self.connection.commit()
+
+    def flush(self) -> None:
+        self.commit()
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,428 @@
+import atexit
+import io
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, TypeVar
+from personal_assistant.common import atomic_open, file_lock, file_signature, load_data
+from personal_assistant.compression import compressed_writer, compression_from_env
+
+
+T = TypeVar('T')
+
+# Storage mode: "journal" (default), "blocks", "pickle" or "sqlite"
+STORAGE_ENV = "PERSONAL_ASSISTANT_STORAGE"
+
+# Journal size (bytes) after which the snapshot is rewritten
+COMPACT_SIZE = 1024 * 1024
+
+# Autosave: seconds without changes before saving, and max seconds unsaved changes can wait
+AUTOSAVE_DELAY = 2.0
+AUTOSAVE_MAX_DELAY = 10.0
+
+
+class AutoSaver:
+    """
+    Background writer which calls save() after changes of data.
+    Saves are debounced (delay seconds without changes) and coalesced (one save for many changes).
+    A save starts at most max_delay seconds after the first unsaved change
+    (save() itself waits for the locks it needs).
+    """
+    def __init__(self, data: Any, save: Callable[[], None], name: str = "",
+                 delay: float = AUTOSAVE_DELAY, max_delay: float = AUTOSAVE_MAX_DELAY):
+        self.data = data
+        self.save = save
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self.saves = 0
+        self.error: Exception | None = None
+        self._first_change: float | None = None
+        self._last_change = 0.0
+        self._stopped = False
+        self._condition = threading.Condition()
+        # one save at a time
+        self._save_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"autosave {name}", daemon=True)
+
+    def start(self) -> None:
+        self.data.subscribe(self._on_change)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _on_change(self, *args: Any) -> None:
+        self.mark_dirty()
+
+    def mark_dirty(self) -> None:
+        with self._condition:
+            self._last_change = time.monotonic()
+            if self._first_change is None:
+                self._first_change = self._last_change
+            self._condition.notify()
+
+    @property
+    def dirty(self) -> bool:
+        return self._first_change is not None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and self._first_change is None:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                due = min(self._last_change + self.delay, self._first_change + self.max_delay)
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                # keep changes unsaved, the next change or close() retries
+                self.error = e
+
+    def flush(self) -> None:
+        """Save data now if there are unsaved changes"""
+        with self._save_lock:
+            with self._condition:
+                if self._first_change is None:
+                    return
+                # changes made from now on are saved by this or the next save
+                first_change, self._first_change = self._first_change, None
+            try:
+                self.save()
+            except BaseException:
+                with self._condition:
+                    if self._first_change is None:
+                        self._first_change = first_change
+                    self._last_change = time.monotonic()
+                raise
+            self.saves += 1
+            self.error = None
+
+    def close(self) -> None:
+        """Stop the thread and save unsaved changes"""
+        atexit.unregister(self.close)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.data.unsubscribe(self._on_change)
+        self.flush()
+
+
+class PickleStorage:
+    """
+    Storage which pickles the whole container on close.
+    Container (AddressBook, Notes) is loaded from snapshot file.
+    With autosave the container is also saved by a background AutoSaver after changes.
+
+    Several processes can use the same file: reads and writes are done under file_lock,
+    refresh() reloads data when another process saved the file (checked by file signature),
+    and a save merges changes of other processes first. Local changes win for keys
+    changed since the last save, other keys get the saved state.
+
+    Data must be changed under lock (a thread lock, autosave checks under it that data
+    wasn't changed while it was pickled).
+    The file lock is always taken before lock.
+    """
+    # commit() can run in another thread while data is not changed
+    commit_in_thread = True
+
+    def __init__(self, path: Path | str, autosave: bool = False,
+                 delay: float = AUTOSAVE_DELAY, max_delay: float = AUTOSAVE_MAX_DELAY):
+        self.path = Path(path)
+        self.data: Any = None
+        self.lock = threading.RLock()
+        self.autosave = autosave
+        self.delay = delay
+        self.max_delay = max_delay
+        self.autosaver: AutoSaver | None = None
+        # keys changed since the last save -> record (None for deleted)
+        self._dirty: dict[str, Any] = {}
+        # number of changes, tells save() that data was changed while it was pickled
+        self._changes = 0
+        self._signature: tuple | None = None
+        # snapshot compression (codec, level) or None, the journal is not compressed
+        self.compression = compression_from_env()
+
+    def load(self, factory: Callable[[], T]) -> T:
+        """Load container from file or create a new one by factory"""
+        with file_lock(self.path, shared=True):
+            self.data = self._read(factory)
+        self.data.subscribe(self._on_change)
+        if self.autosave:
+            self.autosaver = AutoSaver(self.data, self.save, self.path.name, self.delay, self.max_delay)
+            self.autosaver.start()
+        return self.data
+
+    def _dump(self, obj: Any, f: BinaryIO) -> None:
+        """Pickle obj to the file (all storage files are written by it)"""
+        pickle.dump(obj, f)
+
+    def _load(self, f: BinaryIO) -> Any:
+        """Unpickle object written by _dump"""
+        return pickle.load(f)
+
+    def _read(self, factory: Callable[[], T]) -> T:
+        """Read container from file (under file lock) and remember file signature"""
+        data = load_data(self.path, self._load)
+        self._signature = file_signature(self.path)
+        return data if data else factory()
+
+    def _on_change(self, key: str, record: Any) -> None:
+        self._dirty.pop(key, None)
+        self._dirty[key] = record
+        self._changes += 1
+
+    def changed(self) -> bool:
+        """Another process saved the file since it was read or written here (a stat call)"""
+        return file_signature(self.path) != self._signature
+
+    def refresh(self) -> bool:
+        """
+        Reload data if another process saved it, local changes are kept.
+        Returns True if data was reloaded.
+        """
+        if self.data is None or not self.changed():
+            return False
+        with file_lock(self.path, shared=True), self.lock:
+            self._catch_up()
+        return True
+
+    def _catch_up(self) -> None:
+        """Apply changes saved by other processes (under file lock and lock)"""
+        if self.changed():
+            self._merge(self._read(type(self.data)))
+
+    def _merge(self, saved: Any) -> None:
+        """Replace content of data by saved content in place, except locally changed keys"""
+        saved_keys = set(saved.keys())
+        with self.data.muted():
+            for key in list(self.data.keys()):
+                if key not in saved_keys and key not in self._dirty:
+                    self.data.restore(key, None)
+            for key, record in saved.items():
+                if key not in self._dirty:
+                    self.data.restore(key, record)
+
+    def save(self) -> None:
+        """
+        Merge changes of other processes and write the whole container.
+        Data is pickled without the lock, so commands don't wait for it (pickling 100k contacts
+        takes ~0.8 s), and again under the lock if it was changed meanwhile.
+        Compression and writing are done without the lock.
+        """
+        with file_lock(self.path):
+            with self.lock:
+                self._catch_up()
+                changes = self._changes
+            try:
+                payload = self._pickle()
+            except Exception:
+                # data changed while pickled (dictionary changed size during iteration)
+                payload = None
+            with self.lock:
+                if payload is None or self._changes != changes:
+                    payload = self._pickle()
+                dirty, self._dirty = self._dirty, {}
+            try:
+                with atomic_open(self.path) as f, compressed_writer(f, self.compression) as out:
+                    out.write(payload)
+            except BaseException:
+                with self.lock:
+                    self._dirty = {**dirty, **self._dirty}
+                raise
+            self._signature = file_signature(self.path)
+
+    def _pickle(self) -> memoryview:
+        buffer = io.BytesIO()
+        self._dump(self.data, buffer)
+        return buffer.getbuffer()
+
+    def commit(self) -> None:
+        """Persist changes made since the last commit"""
+
+    def flush(self) -> None:
+        """Save changes now (commit() of pickle storage leaves them to autosave or close())"""
+        if self.autosaver is not None:
+            self.autosaver.flush()
+        elif self._dirty:
+            self.save()
+
+    def close(self) -> None:
+        if self.data is None:
+            return
+        if self.autosaver is not None:
+            self.autosaver.close()
+            self.autosaver = None
+        elif self._dirty or not self.path.exists():
+            self.save()
+        self.data.unsubscribe(self._on_change)
+
+
+class JournalStorage(PickleStorage):
+    """
+    Append-only journal storage.
+    Changed records are appended to the journal file on commit,
+    load replays the journal over the snapshot.
+    The snapshot is rewritten and the journal is truncated when it grows over compact_size.
+    Journal entry is a pickled tuple (key, record), record is None for deleted keys.
+
+    Other processes' entries are replayed from the known journal size on refresh and commit,
+    the whole data is reloaded when another process rewrote the snapshot.
+    """
+    def __init__(self, path: Path | str, compact_size: int = COMPACT_SIZE, fsync: bool = True):
+        super().__init__(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.compact_size = compact_size
+        self.fsync = fsync
+        # size of the journal part applied to data
+        self._journal_size = 0
+
+    def load(self, factory: Callable[[], T]) -> T:
+        data = super().load(factory)
+        if self.changed():
+            # broken tail (or entries appended since reading)
+            with file_lock(self.path), self.lock:
+                self._catch_up(truncate=True)
+        if self._journal_size > self.compact_size:
+            self.compact()
+        return data
+
+    def _read(self, factory: Callable[[], T]) -> T:
+        data = super()._read(factory)
+        self._journal_size = 0
+        self._replay(data)
+        return data
+
+    def _replay(self, data: Any, truncate: bool = False) -> None:
+        """
+        Apply journal entries from the known journal size to data, except locally changed keys.
+        A broken tail (interrupted write) is skipped, it is cut off if truncate
+        (under exclusive file lock).
+        """
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            self._journal_size = 0
+            return
+
+        with f:
+            f.seek(self._journal_size)
+            valid_size = self._journal_size
+            with data.muted():
+                while True:
+                    try:
+                        key, record = self._load(f)
+                    except Exception:
+                        # end of file or interrupted write
+                        break
+                    if key not in self._dirty:
+                        data.restore(key, record)
+                    valid_size = f.tell()
+            broken = f.seek(0, os.SEEK_END) > valid_size
+
+        if broken and truncate:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_size)
+        self._journal_size = valid_size
+
+    def changed(self) -> bool:
+        if super().changed():
+            return True
+        try:
+            return self.journal_path.stat().st_size != self._journal_size
+        except FileNotFoundError:
+            return self._journal_size != 0
+
+    def _catch_up(self, truncate: bool = False) -> None:
+        if PickleStorage.changed(self):
+            # snapshot was rewritten (journal compacted)
+            self._merge(self._read(type(self.data)))
+        else:
+            self._replay(self.data, truncate)
+
+    def commit(self) -> None:
+        """
+        Append changed records to the journal.
+        Entries are pickled under the lock, writing and fsync are done without it
+        (the file lock keeps other writers out), so readers of data don't wait for the disk.
+        """
+        if not self._dirty and not self.changed():
+            return
+        with file_lock(self.path):
+            with self.lock:
+                self._catch_up(truncate=True)
+                if not self._dirty:
+                    return
+                buffer = io.BytesIO()
+                for key, record in self._dirty.items():
+                    self._dump((key, record), buffer)
+                dirty, self._dirty = self._dirty, {}
+            try:
+                self._sync()
+                with open(self.journal_path, "ab") as f:
+                    f.write(buffer.getbuffer())
+                    f.flush()
+                    # own entries are applied, refresh() mustn't replay them (and wait for the file lock)
+                    self._journal_size = f.tell()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+            except BaseException:
+                with self.lock:
+                    self._dirty = {**dirty, **self._dirty}
+                raise
+
+        if self._journal_size > self.compact_size:
+            self.compact()
+
+    def flush(self) -> None:
+        self.commit()
+
+    def _sync(self) -> None:
+        """Persist files referenced by written entries or snapshot (before they are written)"""
+
+    def compact(self) -> None:
+        """Rewrite the snapshot and truncate the journal"""
+        with file_lock(self.path), self.lock:
+            self._catch_up(truncate=True)
+            with atomic_open(self.path) as f:
+                with compressed_writer(f, self.compression) as out:
+                    self._dump(self.data, out)
+                self._sync()
+            with open(self.journal_path, "wb"):
+                pass
+            self._signature = file_signature(self.path)
+            self._journal_size = 0
+            self._dirty.clear()
+
+    def close(self) -> None:
+        if self.data is None:
+            return
+        self.commit()
+        self.data.unsubscribe(self._on_change)
+
+
+def open_storage(path: Path | str, autosave: bool = True) -> PickleStorage:
+    """
+    Returns storage for the path in mode from PERSONAL_ASSISTANT_STORAGE environment variable.
+    autosave - save pickle storage in background (see AutoSaver).
+    """
+    mode = os.environ.get(STORAGE_ENV, "journal").strip().casefold()
+    match mode:
+        case "pickle":
+            return PickleStorage(path, autosave=autosave)
+        case "journal":
+            return JournalStorage(path)
+        case "blocks":
+            from personal_assistant.block_storage import BlockStorage
+            return BlockStorage(path)
+        case "sqlite":
+            from personal_assistant.sqlite_storage import SqliteStorage
+            return SqliteStorage(path)
+        case _:
+            raise ValueError(f"Unknown storage mode '{mode}'")
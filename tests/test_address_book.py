@@ -1,10 +1,13 @@
+import threading
 import pytest
+from datetime import date, datetime, timedelta
 from typing import cast, Any, Generator
+from personal_assistant.addr_book import classes
 from personal_assistant.addr_book.classes import \
     AddressBook, Record, PhoneFactory, EmailFactory
+from personal_assistant.addr_book import commands
 from personal_assistant.common import load_data, save_data
-
-TEST_ADDR_BOO_FILENAME = "./data/test_addr_book.pkl"
+from tests.test_common import is_locked
 
 @pytest.fixture
 def fresh_addr_book() -> Generator[AddressBook, Any, None]:
@@ -13,11 +16,13 @@ def fresh_addr_book() -> Generator[AddressBook, Any, None]:
 
 
 @pytest.fixture
-def dirty_addr_book() -> Generator[AddressBook, Any, None]:
-    data = load_data(TEST_ADDR_BOO_FILENAME)
+def dirty_addr_book(tmp_path) -> Generator[AddressBook, Any, None]:
+    path = tmp_path / "test_addr_book.pkl"
+    save_data(AddressBook(), path)
+    data = load_data(path)
     book = cast(AddressBook, data) if data else AddressBook()
     yield book
-    save_data(book, TEST_ADDR_BOO_FILENAME)
+    save_data(book, path)
 
 
 def test_add_record(fresh_addr_book):
@@ -69,3 +74,212 @@ def test_find_contacts(fresh_addr_book):
 
     res = book.find("test.com")
     assert len(res) == 1
+
+
+def brute_force_find(book: AddressBook, criteria: str) -> list[Record]:
+    criteria = criteria.casefold()
+    return [
+        rec for rec in book.values()
+        if any(criteria in str(field).casefold() for field in (rec.name, rec.phones, rec.emails, rec.address))
+    ]
+
+
+def test_find_index_updates(fresh_addr_book):
+    book = fresh_addr_book
+
+    rec = Record("Ivan Petrenko")
+    book.add_record(rec)
+    assert book.find("petr") == [rec]
+    assert book.find("380501112233") == []
+
+    phones, errors = PhoneFactory.create("+380501112233")
+    rec.phones.extend(phones)
+    assert book.find("0501112") == [rec]
+
+    rec.phones.clear()
+    assert book.find("0501112") == []
+
+    rec.address = "Kyiv, Khreshchatyk 1"
+    assert book.find("khresh") == [rec]
+    assert book.find("unknown") == []
+
+    book.delete("ivan petrenko")
+    assert book.find("petr") == []
+    rec.address = "Lviv"
+    assert book.find("lviv") == []
+
+
+def test_find_same_as_scan(fresh_addr_book):
+    book = fresh_addr_book
+    for i in range(50):
+        rec = Record(f"Contact {i:03}")
+        phones, errors = PhoneFactory.create(f"380{i:09}")
+        rec.phones.extend(phones)
+        if i % 3:
+            rec.address = f"City {i % 7}, street {i}"
+        book.add_record(rec)
+    book.delete("contact 010")
+    book.add_record(Record("Contact 010"))
+
+    for criteria in ["", "c", "01", "contact 01", "380000000", "city 3", "unknown", "STREET 4", "nothing"]:
+        assert book.find(criteria) == brute_force_find(book, criteria)
+
+
+def test_find_after_pickle(fresh_addr_book, tmp_path):
+    book = fresh_addr_book
+    rec = Record("John")
+    emails, errors = EmailFactory.create("john@test.com")
+    rec.emails.extend(emails)
+    book.add_record(rec)
+
+    path = tmp_path / "book.pkl"
+    save_data(book, path)
+    loaded = load_data(path)
+
+    assert [str(r.name) for r in loaded.find("test.com")] == ["John"]
+    loaded["john"].emails.clear()
+    assert loaded.find("test.com") == []
+
+
+def freeze_today(monkeypatch, day: date):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def today(cls):
+            return cls(day.year, day.month, day.day)
+
+    monkeypatch.setattr(classes, "datetime", FrozenDatetime)
+
+
+def scan_upcoming_birthdays(book: AddressBook, today: date, days: int) -> list[str]:
+    result = []
+    end_date = today + timedelta(days=days - 1)
+    for rec in book.values():
+        bd = rec.birthday.value
+        if not bd:
+            continue
+        try:
+            bd_this_year = bd.replace(year=today.year)
+        except ValueError:
+            bd_this_year = bd.replace(year=today.year, day=28)
+        if today <= bd_this_year <= end_date:
+            if bd_this_year.weekday() > 4:
+                bd_this_year += timedelta(days=7 - bd_this_year.weekday())
+            result.append((str(rec.name), (bd_this_year - today).days))
+    return [name for name, _ in sorted(result, key=lambda pair: (pair[1], pair[0]))]
+
+
+def make_birthday_book() -> AddressBook:
+    book = AddressBook()
+    for i, bd in enumerate(["01.01.1990", "29.02.2000", "28.02.1985", "01.03.1970",
+                            "15.06.2001", "16.06.1999", "30.12.1980", "31.12.1995", "04.01.2003"]):
+        rec = Record(f"Person {i}")
+        rec.birthday = bd
+        book.add_record(rec)
+    book.add_record(Record("No Birthday"))
+    return book
+
+
+@pytest.mark.parametrize("today", [date(2025, 2, 24), date(2024, 2, 26), date(2025, 6, 13), date(2025, 12, 1)])
+@pytest.mark.parametrize("days", [1, 7, 30])
+def test_upcoming_birthdays_same_as_scan(monkeypatch, today, days):
+    book = make_birthday_book()
+    freeze_today(monkeypatch, today)
+    result = [str(rec.name) for rec in book.get_upcoming_birthdays(days)]
+    assert result == scan_upcoming_birthdays(book, today, days)
+
+
+def test_upcoming_birthdays_year_end(monkeypatch):
+    book = make_birthday_book()
+    freeze_today(monkeypatch, date(2025, 12, 29))
+    # 30.12 Tue, 31.12 Wed, 01.01 Thu, 04.01 Sun -> Mon 05.01
+    result = [str(rec.name) for rec in book.get_upcoming_birthdays(10)]
+    assert result == ["Person 6", "Person 7", "Person 0", "Person 8"]
+
+
+def test_upcoming_birthdays_index_updates(monkeypatch):
+    book = make_birthday_book()
+    freeze_today(monkeypatch, date(2025, 6, 10))
+    rec = book["no birthday"]
+    rec.birthday = "11.06.1990"
+    assert [str(r.name) for r in book.get_upcoming_birthdays(2)] == ["No Birthday"]
+    rec.birthday = None
+    assert book.get_upcoming_birthdays(2) == []
+    book.delete("person 4")
+    assert [str(r.name) for r in book.get_upcoming_birthdays(7)] == ["Person 5"]
+
+
+def make_lookup_book() -> AddressBook:
+    book = AddressBook()
+    for name, phones, emails in [
+        ("John", "+38 (050) 111-22-33, 0441234567", "John@Test.com"),
+        ("Jane", "380501112233", "jane@test.com"),
+        ("Bob", "0671234567", "john@test.com, bob@test.com"),
+    ]:
+        rec = Record(name)
+        rec.phones.extend(PhoneFactory.create(phones)[0])
+        rec.emails.extend(EmailFactory.create(emails)[0])
+        book.add_record(rec)
+    return book
+
+
+def lookup_names(book: AddressBook, value: str) -> list[str]:
+    return [str(rec.name) for rec in book.lookup(value)]
+
+
+def test_lookup():
+    book = make_lookup_book()
+
+    assert lookup_names(book, "380501112233") == ["John", "Jane"]
+    assert lookup_names(book, "+380-50-111-22-33") == ["John", "Jane"]
+    assert lookup_names(book, "044 123 45 67") == ["John"]
+    assert lookup_names(book, "50111223") == []
+    assert lookup_names(book, " JOHN@test.com") == ["John", "Bob"]
+    assert lookup_names(book, "") == []
+
+    shared = dict((value, [str(rec.name) for rec in recs]) for value, recs in book.shared_contacts())
+    assert shared == {"380501112233": ["John", "Jane"], "john@test.com": ["John", "Bob"]}
+
+
+def test_lookup_index_updates():
+    book = make_lookup_book()
+    assert lookup_names(book, "0671234567") == ["Bob"]
+
+    bob = book["bob"]
+    bob.phones.clear()
+    bob.phones.extend(PhoneFactory.create("0501112233")[0])
+    assert lookup_names(book, "0671234567") == []
+    assert lookup_names(book, "0501112233") == ["Bob"]
+
+    book.delete("john")
+    assert lookup_names(book, "380501112233") == ["Jane"]
+    assert lookup_names(book, "john@test.com") == ["Bob"]
+
+
+def test_edit_contact_asks_without_lock(monkeypatch):
+    lock = threading.RLock()
+    book = AddressBook()
+    book.add_record(Record("John"))
+    locked = []
+
+    def answer(message, default_text="", multiline=False):
+        locked.append(is_locked(lock))
+        return "0501234567" if message == "Phones" else default_text
+
+    monkeypatch.setattr(commands, "promt_pretty", answer)
+    monkeypatch.setattr(commands, "read_command", lambda *args, **kwargs: "yes")
+    assert "updated" in commands.cmd_edit_contact(book, ["John"], lock)
+    assert locked == [False] * 4
+    assert book["john"].phones == ["0501234567"]
+
+    def changing_answer(message, default_text="", *args, **kwargs):
+        # another instance changes the contact while the user answers
+        other = Record("John")
+        other.address = "Kyiv" if book["john"].address.value is None else None
+        book.restore("john", other)
+        return default_text or "yes"
+
+    monkeypatch.setattr(commands, "promt_pretty", changing_answer)
+    monkeypatch.setattr(commands, "read_command", changing_answer)
+    assert "changed by another instance" in commands.cmd_edit_contact(book, ["John"], lock)
+    assert "changed by another instance" in commands.cmd_delete_contact(book, ["John"], lock)
+    assert "john" in book
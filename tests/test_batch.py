@@ -0,0 +1,134 @@
+import io
+import pytest
+from personal_assistant import main
+from personal_assistant.addr_book import controller as book_controller
+from personal_assistant.notes import controller as notes_controller
+from personal_assistant.addr_book.classes import AddressBook
+from personal_assistant.notes.classes import Notes
+from personal_assistant.common import ScriptInput, is_batch, promt_pretty, read_command, script_input
+from personal_assistant.storage import JournalStorage
+
+SCRIPT = """\
+# contacts
+book
+add John Smith
+0501234567, 0671234567
+john@example.com
+<<<
+Kyiv,
+Main st. 1
+>>>
+15.03.1990
+add Jane
+0931234567
+
+<<<
+>>>
+
+edit John Smith
+0501234567
+
+
+01.01.1991
+yes
+delete Jane
+yes
+commit
+search john
+all
+back
+notes
+add
+Shopping
+<<<
+milk
+#home
+>>>
+exit
+"""
+
+
+@pytest.fixture
+def data_paths(tmp_path, monkeypatch):
+    monkeypatch.delenv("PERSONAL_ASSISTANT_STORAGE", raising=False)
+    book_path, notes_path = tmp_path / "addressbook.pkl", tmp_path / "notes.pkl"
+    monkeypatch.setattr(book_controller, "ADDR_BOOK_FILENAME", book_path)
+    monkeypatch.setattr(notes_controller, "NOTES_FILE_PATH", notes_path)
+    return book_path, notes_path
+
+
+def test_script_input():
+    script = ScriptInput(["# comment\n", "cmd\n", "\n", "<<<\n", "a\n", "b\n", ">>>\n", "<<<\n", ">>>\n"])
+    assert script.read_command() == "cmd"
+    assert script.read_value("default") == "default"
+    assert script.read_value("default") == "a\nb"
+    assert script.read_value("default") == ""
+    assert script.read_value() is None
+    assert script.read_command() is None
+    assert script.line_no == 9
+
+
+def test_prompts_read_script():
+    assert not is_batch()
+    with script_input(["yes", "value"]):
+        assert is_batch()
+        assert read_command() == "yes"
+        assert promt_pretty("Field", "old") == "value"
+        assert promt_pretty("Field") is None
+        assert read_command(default="exit") == "exit"
+    assert not is_batch()
+
+
+def test_batch_script(tmp_path, data_paths, monkeypatch, capsys):
+    book_path, notes_path = data_paths
+    script = tmp_path / "script.txt"
+    script.write_text(SCRIPT, encoding="utf-8")
+
+    main.main(["--batch", str(script)])
+
+    output = capsys.readouterr().out
+    assert "Contact updated successfully!" in output
+    assert "Have a nice day!" in output
+
+    book = JournalStorage(book_path).load(AddressBook)
+    assert list(book) == ["john smith"]
+    john = book["john smith"]
+    assert john.phones == ["0501234567"]
+    assert john.emails == ["john@example.com"]
+    assert john.address.value == "Kyiv,\nMain st. 1"
+    assert str(john.birthday) == "01.01.1991"
+
+    notes = JournalStorage(notes_path).load(Notes)
+    [note] = notes.values()
+    assert note.title == "Shopping" and note.text == "milk\n#home"
+
+
+def test_batch_stdin_quiet(data_paths, monkeypatch, capsys):
+    book_path, _ = data_paths
+    monkeypatch.setattr("sys.stdin", io.StringIO("book\nadd Ann\n\n\n\n\nall\nexit\n"))
+
+    main.main(["--batch", "-", "--quiet"])
+
+    assert "Contact list" not in capsys.readouterr().out
+    assert list(JournalStorage(book_path).load(AddressBook)) == ["ann"]
+
+
+def test_batch_stops_at_failed_command(tmp_path, data_paths, capsys):
+    book_path, _ = data_paths
+    script = tmp_path / "script.txt"
+    # the value lines of the failed 'add' must not run as commands
+    script.write_text("book\nadd Ann\n\n\n\n\nadd Ann\ndelete Ann\nyes\nadd Bob\n\n\n\n\nexit\n", encoding="utf-8")
+
+    assert main.main(["--batch", str(script), "--quiet"]) == 1
+
+    assert "Script stopped at line 7: Contact already exist!!" in capsys.readouterr().err
+    # changes before the failed command are saved
+    assert list(JournalStorage(book_path).load(AddressBook)) == ["ann"]
+
+
+def test_batch_exit_code(tmp_path, data_paths):
+    script = tmp_path / "script.txt"
+    script.write_text("book\nall\nback\nunknown\nexit\n", encoding="utf-8")
+    assert main.main(["--batch", str(script), "--quiet"]) == 1
+    script.write_text("book\nall\nexit\n", encoding="utf-8")
+    assert main.main(["--batch", str(script), "--quiet"]) == 0
@@ -0,0 +1,38 @@
+from benchmarks.generators import generate_notes, generate_records, make_book
+from benchmarks.compression import run_compression_benchmarks
+from benchmarks.run import compare, run_benchmarks
+
+
+def test_generators_are_deterministic():
+    first = [rec.__getstate__() for rec in generate_records(100, seed=1)]
+    second = [rec.__getstate__() for rec in generate_records(100, seed=1)]
+    assert first == second
+    assert first != [rec.__getstate__() for rec in generate_records(100, seed=2)]
+
+    notes = [note.__getstate__() for note in generate_notes(100)]
+    assert notes == [note.__getstate__() for note in generate_notes(100)]
+    assert len({note[0] for note in notes}) == 100
+
+    assert len(make_book(100)) == 100
+
+
+def test_run_benchmarks_and_compare():
+    results = run_benchmarks([50], repeat=1, only=["book.find", "notes"])
+
+    assert set(results) == {"book.find[50]", "book.find_cached[50]", "notes.find[50]", "notes.search[50]", "notes.complete[50]",
+                            "notes.save[50]", "notes.load[50]"}
+    assert all(result["best"] <= result["median"] for result in results.values())
+
+    baseline = {key: {"best": result["best"] / 10, "median": 0} for key, result in results.items()}
+    assert compare(results, results) == []
+    assert len(compare(results, baseline, tolerance=0.5, min_delta=0)) == 7
+    missing = compare(results, {key: result for key, result in results.items() if key != "notes.complete[50]"})
+    assert missing == [f"notes.complete[50]: {results['notes.complete[50]']['best']:.6f}s, no baseline"]
+
+
+def test_compression_benchmarks():
+    results = run_compression_benchmarks([50], ["none", "zlib:1"], repeat=1)
+
+    assert set(results) == {"book.none[50]", "book.zlib:1[50]", "notes.none[50]", "notes.zlib:1[50]"}
+    assert results["notes.none[50]"]["ratio"] == 1.0
+    assert results["notes.zlib:1[50]"]["bytes"] < results["notes.none[50]"]["bytes"]
@@ -0,0 +1,106 @@
+import pickle
+import sys
+import pytest
+from personal_assistant.block_storage import BlockStorage, BodyRef, BodyStore
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.storage import open_storage
+
+
+LONG_TEXT = "Long note body. " * 100 + "#long"
+
+
+def body(note: NoteRecord):
+    return note._NoteRecord__text
+
+
+def make_storage(path, **kwargs) -> tuple[BlockStorage, Notes]:
+    storage = BlockStorage(path, fsync=False, **kwargs)
+    return storage, storage.load(Notes)
+
+
+def test_bodies_out_of_line(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage, notes = make_storage(path)
+    notes.add(NoteRecord("Long", LONG_TEXT, "01A"))
+    notes.add(NoteRecord("Short", "short #tag", "01B"))
+    storage.close()
+    assert (tmp_path / "notes.0.bodies").stat().st_size == len(LONG_TEXT)
+    assert LONG_TEXT.encode() not in storage.journal_path.read_bytes()
+
+    storage, notes = make_storage(path)
+    long, short = notes["01A"], notes["01B"]
+    assert isinstance(body(long), BodyRef) and body(short) == "short #tag"
+    # tags and titles without reading bodies
+    assert notes.find("long") == [long] and long.title == "Long"
+    assert len(storage.bodies._cache) == 0
+    assert long.text == LONG_TEXT
+    assert notes.search("body") == [long]
+
+    # plain pickle keeps texts
+    copy = pickle.loads(pickle.dumps(notes))
+    assert copy["01A"].text == LONG_TEXT and copy.find("long")[0].id == "01A"
+    storage.close()
+
+
+def test_edit_and_compact(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage, notes = make_storage(path, compact_size=10**9)
+    for n in range(5):
+        notes.add(NoteRecord(f"Note {n}", f"{n} {LONG_TEXT}", f"01{n}"))
+    storage.commit()
+    notes["010"].text = "edited " + LONG_TEXT
+    notes.delete("011")
+    storage.commit()
+    assert isinstance(body(notes["010"]), BodyRef)
+
+    storage.compact()
+    assert [p.name for p in tmp_path.glob("*.bodies")] == ["notes.1.bodies"]
+    assert (tmp_path / "notes.1.bodies").stat().st_size == 4 * len(LONG_TEXT) + len("edited 2 3 4 ")
+    assert notes["010"].text == "edited " + LONG_TEXT
+    storage.close()
+
+    storage, notes = make_storage(path)
+    assert sorted(notes) == ["010", "012", "013", "014"]
+    assert notes["014"].text == f"4 {LONG_TEXT}"
+    storage.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="open files can't be deleted")
+def test_instances_with_compaction(tmp_path):
+    path = tmp_path / "notes.pkl"
+    first, first_notes = make_storage(path)
+    first_notes.add(NoteRecord("A", "a " + LONG_TEXT, "01A"))
+    first.commit()
+
+    second, second_notes = make_storage(path)
+    assert second_notes["01A"].text == "a " + LONG_TEXT
+    second_notes.add(NoteRecord("B", "b " + LONG_TEXT, "01B"))
+    second.compact()
+
+    # bodies of the deleted generation are still readable, the change is moved to the new one
+    first_notes["01A"].title = "A changed"
+    first.commit()
+    assert first_notes["01B"].text == "b " + LONG_TEXT
+
+    third, third_notes = make_storage(path)
+    assert third_notes["01A"].title == "A changed"
+    assert third_notes["01A"].text == "a " + LONG_TEXT
+    assert third_notes["01B"].text == "b " + LONG_TEXT
+    for storage in (first, second, third):
+        storage.close()
+
+
+def test_body_cache_is_bounded(tmp_path):
+    store = BodyStore(tmp_path / "notes.pkl", cache_size=1000, min_size=10)
+    refs = [store.append(f"{n} " + "x" * 300) for n in range(10)]
+    assert store._cached_size <= 1000
+    assert [ref.read() for ref in refs] == [f"{n} " + "x" * 300 for n in range(10)]
+    assert len(store._cache) == 3
+    assert store.store("short") == "short"
+    assert store.store(refs[0]) is refs[0]
+    store.close()
+
+
+def test_open_blocks_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("PERSONAL_ASSISTANT_STORAGE", "blocks")
+    assert isinstance(open_storage(tmp_path / "notes.pkl"), BlockStorage)
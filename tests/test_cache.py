@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from personal_assistant.cache import QueryCache
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory
+from personal_assistant.notes.classes import NoteRecord, Notes
+
+
+def test_query_cache_lru():
+    cache = QueryCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get_or_compute("a", 0, lambda: compute(1)) == 1
+    assert cache.get_or_compute("b", 0, lambda: compute(2)) == 2
+    assert cache.get_or_compute("a", 0, lambda: compute(3)) == 1
+    assert cache.get_or_compute("c", 0, lambda: compute(4)) == 4
+    # "b" was the least recently used
+    assert cache.get_or_compute("b", 0, lambda: compute(5)) == 5
+    assert calls == [1, 2, 4, 5]
+    assert cache.get_or_compute("a", 1, lambda: compute(6)) == 6
+    assert len(cache) == 1
+    assert cache.stats() == {"hits": 1, "misses": 5, "hit_rate": 1 / 6, "size": 1, "maxsize": 2}
+
+
+def test_address_book_cache_invalidation():
+    book = AddressBook()
+    john = Record("John")
+    book.add_record(john)
+    book.add_record(Record("Jane"))
+
+    result = book.find("j")
+    assert result == [john, book["jane"]]
+    result.clear()
+    assert book.find("j") == [john, book["jane"]]
+    assert book.query_cache.hits == 1
+
+    generation = book.generation
+    john.phones.extend(PhoneFactory.create("0501234567")[0])
+    assert book.generation > generation
+    assert book.find("050") == [john]
+    john.phones.clear()
+    assert book.find("050") == []
+
+    book.delete("jane")
+    assert book.find("j") == [john]
+    book.add_record(Record("Joe"))
+    assert [r.name.value for r in book.find("j")] == ["John", "Joe"]
+
+    # a record removed from the book doesn't change it
+    jane = Record("Jane")
+    book.add_record(jane)
+    book.delete("jane")
+    generation = book.generation
+    jane.address = "Kyiv"
+    assert book.generation == generation
+
+
+def test_birthdays_cache():
+    book = AddressBook()
+    rec = Record("John")
+    book.add_record(rec)
+    assert book.get_upcoming_birthdays(7) == []
+
+    rec.birthday = (datetime.today().date() + timedelta(days=1)).strftime("%d.%m.%Y")
+    assert book.get_upcoming_birthdays(7) == [rec]
+    assert book.get_upcoming_birthdays(days=7) == [rec]
+    assert book.get_upcoming_birthdays(7) == [rec]
+    assert book.query_cache.hits == 2
+
+
+def test_notes_cache_invalidation():
+    notes = Notes()
+    note = NoteRecord("Shopping", "milk #home")
+    notes.add(note)
+
+    assert notes.find("home") == [note]
+    assert notes.find("home") == [note]
+    note.text = "milk #shop"
+    assert notes.find("home") == []
+    assert notes.find("shop") == [note]
+    notes.delete(note.id)
+    assert notes.find("shop") == []
+    assert notes.query_cache.stats()["hits"] == 1
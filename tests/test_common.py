@@ -0,0 +1,111 @@
+import threading
+import types
+from personal_assistant import common
+from personal_assistant.addr_book import commands as book_commands
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.common import draw_table_pages
+
+
+COLUMNS = [{"header": "Value", "data_key": "value"}]
+
+
+def counting_rows(count: int, pulled: list[int]):
+    for i in range(count):
+        pulled.append(i)
+        yield types.SimpleNamespace(value=f"row-{i}")
+
+
+def answer_with(monkeypatch, answers: list[str]) -> list[str]:
+    prompts = []
+
+    def fake_read_command(message: str = "", commands: list[str] = [], default: str = "exit", color: str = "") -> str:
+        prompts.append(message)
+        return answers.pop(0)
+
+    monkeypatch.setattr(common, "read_command", fake_read_command)
+    return prompts
+
+
+def test_draw_table_pages_is_lazy(monkeypatch, capsys):
+    pulled = []
+    prompts = answer_with(monkeypatch, ["q"])
+
+    draw_table_pages("Rows", COLUMNS, counting_rows(10_000, pulled), page_size=5)
+
+    output = capsys.readouterr().out
+    assert "row-4" in output and "row-5" not in output
+    assert len(pulled) == 10
+    assert len(prompts) == 1
+
+
+def test_draw_table_pages_navigation(monkeypatch, capsys):
+    pulled = []
+    prompts = answer_with(monkeypatch, ["", "p", "n", "n", "q"])
+
+    draw_table_pages("Rows", COLUMNS, counting_rows(12, pulled), page_size=5)
+
+    output = capsys.readouterr().out
+    assert output.count("row-0 ") == 2
+    assert output.count("row-10") == 1
+    assert "(page 3)" in output
+    assert len(prompts) == 5
+
+
+def test_draw_table_pages_single_page(monkeypatch, capsys):
+    prompts = answer_with(monkeypatch, [])
+    draw_table_pages("Rows", COLUMNS, counting_rows(3, []), page_size=5)
+    output = capsys.readouterr().out
+    assert "row-2" in output and "page" not in output
+    assert prompts == []
+
+
+def is_locked(lock) -> bool:
+    """lock is held (checked from another thread)"""
+    result = []
+
+    def try_lock():
+        result.append(not lock.acquire(blocking=False))
+        if not result[0]:
+            lock.release()
+
+    thread = threading.Thread(target=try_lock)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_pages_are_shown_without_lock(monkeypatch, capsys):
+    lock = threading.RLock()
+    book = AddressBook()
+    for i in range(1000):
+        book.add_record(Record(f"Contact {i}"))
+    locked, shown = [], []
+
+    def fake_read_command(message: str = "", commands: list[str] = [], default: str = "exit", color: str = "") -> str:
+        locked.append(is_locked(lock))
+        return "q"
+
+    get = book.get
+    monkeypatch.setattr(book, "get", lambda key, default=None: shown.append(key) or get(key, default))
+    monkeypatch.setattr(common, "read_command", fake_read_command)
+    book_commands.cmd_show_all(book, [], lock)
+    # rows are fetched only for the first page and one page ahead
+    assert len(shown) == 2 * common.PAGE_SIZE
+    book_commands.cmd_search_contacts(book, ["contact"], lock)
+    assert locked == [False, False]
+
+
+def test_iter_locked():
+    lock = threading.RLock()
+    pulled = []
+
+    def rows():
+        for i in range(45):
+            pulled.append(is_locked(lock))
+            yield i
+
+    items = common.iter_locked(rows(), lock, chunk_size=20)
+    assert next(items) == 0
+    assert len(pulled) == 20 and all(pulled)
+    assert not is_locked(lock)
+    assert list(items) == list(range(1, 45))
@@ -0,0 +1,116 @@
+import sqlite3
+import time
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+from personal_assistant.addr_book import commands as book_commands
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.addr_book.snapshot import open_snapshot, write_snapshot
+from personal_assistant.common import make_completer, script_input
+from personal_assistant.completion import CommandCompleter
+from personal_assistant.indexes import PrefixIndex
+from personal_assistant.notes import commands as notes_commands
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.sqlite_storage import SqliteAddressBook
+from benchmarks.generators import generate_records
+from tests.test_sqlite_storage import names
+
+
+def make_book(*contacts: str) -> AddressBook:
+    book = AddressBook()
+    for name in contacts:
+        book.add_record(Record(name))
+    return book
+
+
+def completions(completer, text: str) -> list[str]:
+    return [c.text for c in completer.get_completions(Document(text), CompleteEvent(completion_requested=True))]
+
+
+def test_prefix_index():
+    index: PrefixIndex[str] = PrefixIndex()
+    index.build([("a", ["apple", "pie"]), ("b", ["apricot"])])
+    index.add("c", ["apple tart", "tart"])
+    assert index.keys("ap") == ["a", "c", "b"]
+    assert index.keys("ap", limit=1) == ["a"]
+    assert index.keys("t") == ["c"]
+    assert index.keys("x") == []
+    index.add("a", ["pear"])
+    index.remove("c")
+    assert index.keys("ap") == ["b"]
+    assert index.keys("") == ["b", "a"]
+    assert len(index) == 2 and "a" in index and "c" not in index
+
+
+def test_complete_names_incremental():
+    book = make_book("John Smith", "Jane Doe", "Johnny Walker")
+    assert names(book.complete_names("jo")) == ["John Smith", "Johnny Walker"]
+    assert names(book.complete_names("SMI")) == ["John Smith"]
+    assert names(book.complete_names("john ")) == ["John Smith"]
+    assert names(book.complete_names("john  s")) == ["John Smith"]
+
+    book.add_record(Record("Bob Johnson"))
+    book.delete("John Smith")
+    assert names(book.complete_names("john")) == ["Johnny Walker", "Bob Johnson"]
+    assert names(book.complete_names("", limit=2)) == ["Bob Johnson", "Jane Doe"]
+
+
+def test_complete_names_storages(tmp_path):
+    book = make_book("John Smith", "Jane Doe", "Johnny Walker")
+    db_book = SqliteAddressBook(sqlite3.connect(":memory:"))
+    for record in book.values():
+        db_book.add_record(Record(record.name.value))
+    write_snapshot(book, tmp_path / "book.snap")
+    with open_snapshot(tmp_path / "book.snap") as snapshot:
+        for other in (db_book, snapshot):
+            assert names(other.complete_names("jo")) == ["John Smith", "Johnny Walker"]
+            assert names(other.complete_names("john ")) == ["John Smith"]
+            assert names(other.complete_names("x")) == []
+
+
+def test_complete_notes_incremental():
+    notes = Notes()
+    shopping = NoteRecord("Shopping list", "milk", "01AAA")
+    notes.add(shopping)
+    notes.add(NoteRecord("Meeting", "work #work", "01BBB"))
+    assert notes.complete("01") == [shopping, notes["01BBB"]]
+    assert notes.complete("01b") == [notes["01BBB"]]
+    assert notes.complete("list") == [shopping]
+
+    shopping.title = "Groceries"
+    notes.delete("01BBB")
+    assert notes.complete("shop") == []
+    assert notes.complete("gro") == [shopping]
+    assert notes.complete("01") == [shopping]
+
+
+def test_command_completer():
+    book = make_book("John Smith", "Jane Doe")
+    notes = Notes()
+    notes.add(NoteRecord("Shopping list", "milk", "01AAA"))
+    completer = CommandCompleter(book_commands.COMMAND_LIST, lambda *args: book_commands.complete_argument(book, *args))
+    assert completions(completer, "edi") == ["edit"]
+    assert completions(completer, "edit ja") == ["Jane Doe"]
+    assert completions(completer, "Delete  smi") == ["John Smith"]
+    assert completions(completer, "add jo") == []
+
+    completer = CommandCompleter(notes_commands.COMMAND_LIST, lambda *args: notes_commands.complete_argument(notes, *args))
+    assert completions(completer, "edit 01") == ["01AAA"]
+    assert completions(completer, "search sho") == ["Shopping list"]
+
+    completer = make_completer(book_commands.COMMAND_LIST)
+    assert completions(completer, "edi") == ["edit"]
+    assert completions(completer, "edit ja") == []
+    with script_input([]):
+        assert make_completer(book_commands.COMMAND_LIST) is None
+
+
+def test_completion_speed():
+    book = AddressBook()
+    for record in generate_records(100_000):
+        book.add_record(record)
+    book.complete_names("a")
+    prefixes = ["a", "jo", "mar", "smi", "x", "ol"]
+    start = time.perf_counter()
+    for prefix in prefixes * 100:
+        book.complete_names(prefix)
+    assert (time.perf_counter() - start) / (len(prefixes) * 100) < 0.001
@@ -0,0 +1,71 @@
+import io
+import pickle
+import pytest
+from personal_assistant.common import load_data, save_data
+from personal_assistant.compression import (
+    MAGIC, ChunkWriter, compressed_writer, open_reader, parse_compression,
+)
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.storage import JournalStorage
+from benchmarks.generators import make_notes
+
+
+def test_parse_compression():
+    assert parse_compression(None) is None
+    assert parse_compression("none") is None
+    assert parse_compression("zlib") == ("zlib", 6)
+    assert parse_compression(" LZMA:1 ") == ("lzma", 1)
+    for spec in ["gzip", "zlib:10", "zlib:x"]:
+        with pytest.raises(ValueError):
+            parse_compression(spec)
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_chunked_roundtrip(codec):
+    data = pickle.dumps([f"line {n} " * (n % 50) for n in range(5000)])
+    f = io.BytesIO()
+    writer = ChunkWriter(f, codec, 1, chunk_size=4096)
+    for start in range(0, len(data), 1000):
+        writer.write(data[start:start + 1000])
+    writer.finish()
+    assert f.getvalue().startswith(MAGIC) and len(f.getvalue()) < len(data) / 2
+
+    reader = open_reader(io.BufferedReader(io.BytesIO(f.getvalue())))
+    assert reader.read() == data
+
+    truncated = open_reader(io.BufferedReader(io.BytesIO(f.getvalue()[:-100])))
+    with pytest.raises(EOFError):
+        truncated.read()
+
+
+def test_plain_files_are_read(tmp_path):
+    f = io.BytesIO()
+    with compressed_writer(f, None) as out:
+        out.write(b"plain")
+    assert f.getvalue() == b"plain"
+
+    path = tmp_path / "notes.pkl"
+    notes = make_notes(100)
+    save_data(notes, path, "none")
+    plain_size = path.stat().st_size
+    assert len(load_data(path)) == 100
+
+    save_data(notes, path, "lzma:1")
+    assert path.stat().st_size < plain_size
+    assert [n.__getstate__() for n in load_data(path).values()] == [n.__getstate__() for n in notes.values()]
+
+
+def test_storage_compression(tmp_path, monkeypatch):
+    monkeypatch.setenv("PERSONAL_ASSISTANT_COMPRESSION", "zlib:1")
+    path = tmp_path / "notes.pkl"
+    storage = JournalStorage(path, fsync=False)
+    notes = storage.load(Notes)
+    notes.add(NoteRecord("Title", "text #tag " * 100, "01A"))
+    storage.compact()
+    notes.add(NoteRecord("Second", "journal entry", "01B"))
+    storage.close()
+    assert path.read_bytes().startswith(MAGIC)
+
+    monkeypatch.delenv("PERSONAL_ASSISTANT_COMPRESSION")
+    loaded = JournalStorage(path).load(Notes)
+    assert sorted(loaded) == ["01A", "01B"] and loaded.find("tag")[0].id == "01A"
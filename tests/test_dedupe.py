@@ -0,0 +1,141 @@
+import threading
+from string import ascii_lowercase
+import pytest
+from personal_assistant.addr_book import commands
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory, EmailFactory
+from personal_assistant.addr_book.exceptions import ContactExist
+from personal_assistant.addr_book.dedupe import find_duplicates, merge_records, name_similarity
+from benchmarks.generators import generate_records
+from tests.test_common import is_locked
+
+
+def add(book: AddressBook, name: str, phones: str = "", emails: str = "",
+        birthday: str | None = None, address: str | None = None) -> Record:
+    rec = Record(name)
+    rec.phones.extend(PhoneFactory.create(phones)[0])
+    rec.emails.extend(EmailFactory.create(emails)[0])
+    rec.birthday = birthday
+    rec.address = address
+    book.add_record(rec)
+    return rec
+
+
+def make_book() -> AddressBook:
+    book = AddressBook()
+    add(book, "Ivan Petrenko", "0501112233", birthday="01.02.1990")
+    add(book, "Olena Shevchenko", "0671234567", "olena@test.com")
+    add(book, "Petrenko Ivan", "0441234567", address="Kyiv")
+    add(book, "Boss", "0991234567")
+    add(book, "O. Shevchenko", emails="OLENA@test.com")
+    add(book, "Ivan Petrenco", "0931234567", birthday="02.02.1990")
+    add(book, "Taras", "0991234567")
+    add(book, "Maria", "0631234567")
+    return book
+
+
+def group_names(groups: list[list[Record]]) -> list[list[str]]:
+    return [[str(rec.name) for rec in group] for group in groups]
+
+
+def test_name_similarity():
+    assert name_similarity("Ivan Petrenko", "petrenko  IVAN") == 1
+    assert name_similarity("Ivan Petrenko", "Ivan Petrenco") > 0.9
+    assert name_similarity("Ivan Petrenko", "Maria Koval") < 0.5
+
+
+def test_find_duplicates():
+    groups = find_duplicates(make_book().values())
+    assert group_names(groups) == [
+        ["Ivan Petrenko", "Petrenko Ivan", "Ivan Petrenco"],
+        ["Olena Shevchenko", "O. Shevchenko"],
+        ["Boss", "Taras"],
+    ]
+
+
+def test_find_duplicates_synthetic():
+    records = list(generate_records(2000))
+    assert find_duplicates(records) == []
+
+    copy = Record(" ".join(reversed(records[10].name.value.split())))
+    copy.phones.extend(PhoneFactory.create("0000000001")[0])
+    assert group_names(find_duplicates(records + [copy])) == [[str(records[10].name), str(copy.name)]]
+
+
+def test_find_duplicates_large_name_blocks():
+    # more than MAX_BLOCK records with the same name
+    same = [Record("John Smith") for _ in range(60)]
+    assert find_duplicates(same + [Record("Jane Doe")]) == [same]
+
+    # one prefix block "alex kova" of 52 records is split by longer prefixes
+    records = [Record(f"Alex Kovalenko{letter * count}")
+               for letter in ascii_lowercase for count in (8, 9)]
+    assert group_names(find_duplicates(records)) == [
+        [str(a.name), str(b.name)] for a, b in zip(records[::2], records[1::2])
+    ]
+
+
+def test_merge_records():
+    book = make_book()
+    group = find_duplicates(book.values())[0]
+
+    merged = merge_records(book, group, birthday="02.02.1990")
+    assert merged is group[0]
+    assert sorted(book) == ["boss", "ivan petrenko", "maria", "o. shevchenko", "olena shevchenko", "taras"]
+    assert merged.phones == ["0501112233", "0441234567", "0931234567"]
+    assert str(merged.birthday) == "02.02.1990"
+    assert merged.address.value == "Kyiv"
+    assert book.lookup("0931234567") == [merged]
+
+    merged = merge_records(book, find_duplicates(book.values())[0], name="Olena Shevchenko-Koval")
+    assert "olena shevchenko" not in book and "o. shevchenko" not in book
+    assert book["olena shevchenko-koval"] is merged
+    assert merged.emails == ["olena@test.com"]
+    assert merged.phones == ["0671234567"]
+
+
+def test_merge_records_name_of_other_contact():
+    book = make_book()
+    group = find_duplicates(book.values())[0]
+    with pytest.raises(ContactExist):
+        merge_records(book, group, name="Maria")
+    assert len(book) == 8 and book["maria"].phones == ["0631234567"]
+
+
+def test_dedupe_cancelled_choice(monkeypatch):
+    book = make_book()
+    # Ctrl+C at the birthday choice returns the default of the prompt
+    answers = iter(["yes", "2"])
+    monkeypatch.setattr(commands, "read_command", lambda message, default="exit", **kwargs: next(answers, default))
+    assert "Merged 0 of" in commands.cmd_dedupe_contacts(book, [])
+    assert len(book) == 8
+
+
+def test_dedupe_asks_without_lock(monkeypatch):
+    book = make_book()
+    lock = threading.RLock()
+    locked = []
+
+    def fake_read_command(message, default="exit", **kwargs):
+        locked.append(is_locked(lock))
+        return "yes" if message.startswith("Merge") else ""
+
+    monkeypatch.setattr(commands, "read_command", fake_read_command)
+    assert "Merged 3 of 3" in commands.cmd_dedupe_contacts(book, [], lock)
+    assert locked and not any(locked)
+    assert len(book) == 4
+
+
+def test_dedupe_skips_changed_group(monkeypatch):
+    book = make_book()
+
+    def fake_read_command(message, default="exit", **kwargs):
+        if message.startswith("Merge"):
+            # another instance deleted contacts of the groups meanwhile
+            book.delete("Petrenko Ivan")
+            book.delete("O. Shevchenko")
+            return "yes"
+        return ""
+
+    monkeypatch.setattr(commands, "read_command", fake_read_command)
+    assert "Merged 1 of 3" in commands.cmd_dedupe_contacts(book, [])
+    assert "ivan petrenko" in book and "ivan petrenco" in book and "olena shevchenko" in book
@@ -0,0 +1,77 @@
+import json
+import pytest
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory, EmailFactory
+from personal_assistant.addr_book.importer import import_file
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.exporter import ExportFormatError, export_contacts, export_notes
+
+
+def make_book() -> AddressBook:
+    book = AddressBook()
+    for name, phones, emails, birthday, address in [
+        ("John Smith", "1234567890,0987654321", "john@example.com", "15.03.1990", "Kyiv,\nMain st. 1"),
+        ("Jane", "", "jane@example.com", None, None),
+    ]:
+        record = Record(name)
+        record.phones.extend(PhoneFactory.create(phones)[0])
+        record.emails.extend(EmailFactory.create(emails)[0])
+        record.birthday = birthday
+        record.address = address
+        book.add_record(record)
+    return book
+
+
+def test_export_contacts_jsonl(tmp_path):
+    path = tmp_path / "contacts.jsonl"
+
+    assert export_contacts(make_book(), path) == 2
+
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert rows[0] == {
+        "name": "John Smith",
+        "phones": ["1234567890", "0987654321"],
+        "emails": ["john@example.com"],
+        "birthday": "1990-03-15",
+        "address": "Kyiv,\nMain st. 1",
+    }
+    assert rows[1]["birthday"] is None and rows[1]["address"] is None
+
+
+def test_export_contacts_csv_round_trip(tmp_path):
+    book = make_book()
+    path = tmp_path / "contacts.csv"
+
+    assert export_contacts(book, path, criteria="main st") == 1
+
+    imported = AddressBook()
+    report = import_file(imported, path)
+    assert report.imported == 1 and report.error_count == 0
+    john, source = imported["john smith"], book["john smith"]
+    assert john.phones == source.phones
+    assert john.emails == source.emails
+    assert str(john.birthday) == str(source.birthday)
+    assert john.address.value == source.address.value
+
+
+def test_export_notes_with_tags(tmp_path):
+    notes = Notes()
+    notes.add(NoteRecord("Shopping", "milk #Home #shop", id="01A"))
+    notes.add(NoteRecord("Work", "report #work", id="01B"))
+    notes.add(NoteRecord("Plain", "no tags", id="01C"))
+
+    path = tmp_path / "notes.jsonl"
+    assert export_notes(notes, path, ["#home", "work"]) == 2
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [row["id"] for row in rows] == ["01A", "01B"]
+    assert rows[0]["tags"] == ["Home", "shop"]
+
+    path = tmp_path / "notes.csv"
+    assert export_notes(notes, path) == 3
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "id,title,text,tags"
+    assert lines[1] == "01A,Shopping,milk #Home #shop,Home shop"
+
+
+def test_export_unknown_format(tmp_path):
+    with pytest.raises(ExportFormatError):
+        export_notes(Notes(), tmp_path / "notes.txt")
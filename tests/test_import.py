@@ -0,0 +1,110 @@
+import pytest
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.addr_book.exceptions import ImportFormatError
+from personal_assistant.addr_book.importer import ContactRow, import_contacts, import_file, read_csv, read_vcard
+
+
+CSV_DATA = """Name,Phone,Email,Birthday,Address,Notes
+John Smith,"1234567890; 0987654321",john@example.com,15.03.1990,"Kyiv, Main st. 1",friend
+Bad Phone,12ab,bad-email,1990-02-30,,
+,1234567890,,,,
+John Smith,1111111111,,,,
+Jane,,jane@example.com,1985-07-04,,
+"""
+
+VCARD_DATA = """BEGIN:VCARD
+VERSION:3.0
+FN:Anna Lee
+N:Lee;Anna;;;
+TEL;TYPE=CELL:+380501234567
+TEL;TYPE=HOME:0441234567
+EMAIL:anna@example.com
+BDAY:1992-11-05
+ADR;TYPE=HOME:;;Main st. 5;Lviv;;79000;Ukraine
+END:VCARD
+BEGIN:VCARD
+VERSION:4.0
+N:Brown;Bob;;;
+item1.EMAIL:bob@exa
+ mple.com
+BDAY:19800101
+END:VCARD
+"""
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text(CSV_DATA, encoding="utf-8")
+
+    rows = list(read_csv(path))
+    assert len(rows) == 5
+    assert rows[0] == ContactRow(2, "John Smith", "1234567890; 0987654321", "john@example.com",
+                                 "15.03.1990", "Kyiv, Main st. 1")
+    assert rows[2].line == 4 and rows[2].name == ""
+
+
+def test_read_vcard(tmp_path):
+    path = tmp_path / "contacts.vcf"
+    path.write_text(VCARD_DATA, encoding="utf-8")
+
+    anna, bob = read_vcard(path)
+    assert anna == ContactRow(1, "Anna Lee", "+380501234567,0441234567", "anna@example.com",
+                              "05.11.1992", "Main st. 5, Lviv, 79000, Ukraine")
+    assert bob.line == 11
+    assert bob.name == "Bob Brown"
+    assert bob.emails == "bob@example.com"
+    assert bob.birthday == "01.01.1980"
+
+
+def test_import_file_report(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text(CSV_DATA, encoding="utf-8")
+    book = AddressBook()
+
+    report = import_file(book, path, batch_size=2)
+
+    assert (report.rows, report.imported, report.error_count) == (5, 3, 5)
+    assert sorted(book.keys()) == ["bad phone", "jane", "john smith"]
+    assert str(book["john smith"].phones) == "1234567890\n0987654321"
+    assert str(book["jane"].birthday) == "04.07.1985"
+    assert book.get("bad phone").phones == []
+    assert book.find("main st") == [book["john smith"]]
+
+    lines = [(e.line, e.name) for e in report.errors]
+    assert lines == [(3, "Bad Phone")] * 3 + [(4, ""), (5, "John Smith")]
+    assert report.errors[-1].message == "Contact already exist"
+
+
+def test_import_on_error_callback():
+    book = AddressBook()
+    book.add_record(Record("John"))
+    errors = []
+    rows = (ContactRow(i, f"Contact {i}", phones="12") for i in range(10))
+
+    report = import_contacts(book, rows, batch_size=3, on_error=errors.append)
+
+    assert report.imported == 10
+    assert report.error_count == 10 and report.errors == []
+    assert [e.line for e in errors] == list(range(10))
+
+
+def test_import_process_pool():
+    book = AddressBook()
+    rows = [ContactRow(i, f"Contact {i}", phones=f"{1000000000 + i}", birthday="01.01.2000")
+            for i in range(50)]
+
+    report = import_contacts(book, rows, batch_size=20, workers=2)
+
+    assert report.imported == 50 and report.error_count == 0
+    assert str(book["contact 7"].phones) == "1000000007"
+    assert book.find("1000000049") == [book["contact 49"]]
+
+
+def test_import_unknown_format(tmp_path):
+    with pytest.raises(ImportFormatError):
+        import_file(AddressBook(), tmp_path / "contacts.txt")
+
+    path = tmp_path / "no_name.csv"
+    path.write_text("phone,email\n123,a@b.c\n", encoding="utf-8")
+    with pytest.raises(ImportFormatError):
+        import_file(AddressBook(), path)
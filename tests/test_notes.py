@@ -1,5 +1,13 @@
+import pickle
+import threading
 import pytest
-from personal_assistant.notes.classes import NoteRecord, Notes
+from datetime import date, datetime, timedelta
+from personal_assistant.common import script_input
+from personal_assistant.indexes import SortedIndex, TextIndex
+from personal_assistant.notes import commands
+from personal_assistant.notes.classes import NoteRecord, Notes, ulid_time_prefix
+from personal_assistant.notes.exceptions import AmbiguousNoteId
+from tests.test_common import is_locked
 
 def test_create_note():
     title = "Title"
@@ -88,3 +96,187 @@ def test_find_tags():
         and res[3].title == "Title 5"
 
 
+def test_find_tags_index_updates():
+    notes = Notes()
+    note1 = NoteRecord("Shopping", "milk #food #home")
+    note2 = NoteRecord("Work", "report #work")
+    notes.add(note1)
+    notes.add(note2)
+
+    assert notes.find("FOOD") == [note1]
+
+    note1.text = "milk #Groceries"
+    assert notes.find("food") == []
+    assert notes.find("groceries") == [note1]
+
+    notes.delete(note2.id)
+    assert notes.find("work") == []
+    note2.text = "#groceries"
+    assert notes.find("groceries") == [note1]
+
+
+def test_find_tags_after_pickle():
+    notes = Notes()
+    note = NoteRecord("Title", "#tag1 #tag2")
+    notes.add(note)
+
+    loaded = pickle.loads(pickle.dumps(notes))
+    assert [n.id for n in loaded.find("tag2")] == [note.id]
+
+    loaded[note.id].text = "#tag3"
+    assert loaded.find("tag2") == []
+    assert len(loaded.find("tag3")) == 1
+
+
+def make_search_notes() -> tuple[Notes, list[NoteRecord]]:
+    notes = Notes()
+    records = [
+        NoteRecord("Budget report", "Quarterly budget report for the board", id="01"),
+        NoteRecord("Shopping", "milk, bread and a report folder", id="02"),
+        NoteRecord("Planning", "Plan the budget for next year. Planner meeting", id="03"),
+        NoteRecord("Travel", "Tickets and hotel #travel", id="04"),
+    ]
+    for note in records:
+        notes.add(note)
+    return notes, records
+
+
+def test_search_ranked():
+    notes, (budget, shopping, planning, travel) = make_search_notes()
+
+    assert notes.search("report") == [budget, shopping]
+    assert notes.search("BUDGET") == [budget, planning]
+    assert notes.search("hotel") == [travel]
+    assert notes.search("missing") == []
+    assert notes.search("") == []
+
+
+def test_search_phrase_and_prefix():
+    notes, (budget, shopping, planning, travel) = make_search_notes()
+
+    assert notes.search('"budget report"') == [budget]
+    assert notes.search('"report budget"') == []
+    # phrases don't span title and text
+    assert notes.search('"report quarterly"') == []
+    assert notes.search("plan*") == [planning]
+    assert set(notes.search("bud* tick*")) == {budget, planning, travel}
+
+
+def test_search_prefix_matches_all_words():
+    index = TextIndex()
+    for i in range(500):
+        index.add(i, [f"word{i:03}"])
+    index.add("other", ["wool"])
+
+    assert set(index.scores("word*")) == set(range(500))
+    assert len(index.scores("wo*")) == 501
+    assert index.scores("word499*") == {499: pytest.approx(index.scores("word499")[499])}
+
+
+def test_search_index_updates():
+    notes, (budget, shopping, planning, travel) = make_search_notes()
+    assert notes.search("hotel") == [travel]
+
+    travel.text = "Train tickets"
+    shopping.title = "Hotel shopping"
+    assert notes.search("hotel") == [shopping]
+
+    notes.delete(shopping.id)
+    assert notes.search("hotel") == []
+
+    loaded = pickle.loads(pickle.dumps(notes))
+    assert [n.id for n in loaded.search("train")] == [travel.id]
+
+
+def make_ulid(moment: datetime, suffix: str) -> str:
+    return ulid_time_prefix(moment) + suffix.rjust(16, "0")
+
+
+def test_sorted_index():
+    index = SortedIndex(["b", "d"])
+    index.add("c")
+    index.add("a")
+    index.add("c")
+    index.remove("d")
+    index.remove("x")
+    assert index.range("b", "z") == ["b", "c"]
+    assert index.range("a", "z", limit=2) == ["a", "b"]
+    assert len(index) == 3 and "c" in index and "d" not in index
+
+
+def test_note_created_time():
+    moment = datetime(2024, 5, 17, 12, 30, 15, 123000)
+    assert NoteRecord("Title", "text", make_ulid(moment, "1")).created == moment
+    assert NoteRecord("Title", "text", "123").created is None
+    assert NoteRecord("Title", "text").created - datetime.now() < timedelta(seconds=1)
+
+
+def test_resolve_id_prefix():
+    notes = Notes()
+    first = NoteRecord("First", "text", "01HXA" + "0" * 21)
+    second = NoteRecord("Second", "text", "01HXB" + "0" * 21)
+    notes.add(first)
+    assert notes.resolve("01hx") is first
+    notes.add(second)
+    assert notes.resolve(second.id) is second
+    assert notes.resolve("01HXB") is second
+    assert notes.resolve("01HXC") is None
+    assert notes.resolve("") is None
+    with pytest.raises(AmbiguousNoteId):
+        notes.resolve("01HX")
+    notes.delete(second.id)
+    assert notes.resolve("01HX") is first
+
+
+def test_created_between():
+    day = datetime(2024, 5, 17)
+    notes = Notes()
+    for n, hours in enumerate([-1, 0, 5, 23, 24, 48]):
+        notes.add(NoteRecord(f"Note {hours}", "text", make_ulid(day + timedelta(hours=hours), str(n))))
+    notes.add(NoteRecord("Not ULID", "text", "01"))
+
+    assert [n.title for n in notes.created_between(day, day + timedelta(days=1))] == ["Note 0", "Note 5", "Note 23"]
+    late = NoteRecord("Late", "text", make_ulid(day + timedelta(hours=12), "9"))
+    notes.add(late)
+    notes.delete(notes.created_between(day, day + timedelta(hours=1))[0].id)
+    assert [n.title for n in notes.created_between(day, day + timedelta(days=1))] == ["Note 5", "Late", "Note 23"]
+    assert notes.created_between(day + timedelta(days=5), day + timedelta(days=6)) == []
+
+
+def test_commands_short_id():
+    notes = Notes()
+    note = NoteRecord("Title", "text")
+    notes.add(note)
+    with script_input(["no"]):
+        assert "cancelled" in commands.cmd_delete_note(notes, [note.id[:12].lower()])
+    assert "No notes created" in commands.cmd_created_notes(notes, ["01.01.2000", "31.12.2000"])
+    with script_input(["yes"], quiet=True):
+        assert commands.cmd_created_notes(notes, [f"{date.today():%d.%m.%Y}"]) == ""
+        assert "deleted successfully" in commands.cmd_delete_note(notes, [note.id[:12]])
+    assert len(notes) == 0
+
+
+def test_edit_asks_without_lock(monkeypatch):
+    lock = threading.RLock()
+    notes = Notes()
+    note = NoteRecord("Title", "text")
+    notes.add(note)
+    locked = []
+
+    def answer(message, default_text="", multiline=False):
+        locked.append(is_locked(lock))
+        return default_text + " new"
+
+    monkeypatch.setattr(commands, "promt_pretty", answer)
+    assert commands.cmd_change_note(notes, [note.id], lock) == "Note updated."
+    assert locked == [False, False]
+    assert (note.title, note.text) == ("Title new", "text new")
+
+    def changing_answer(message, default_text="", multiline=False):
+        # another instance changes the note while the user edits it
+        notes.restore(note.id, NoteRecord("Other", "other", note.id))
+        return "mine"
+
+    monkeypatch.setattr(commands, "promt_pretty", changing_answer)
+    assert "changed by another instance" in commands.cmd_change_note(notes, [note.id], lock)
+    assert notes[note.id].title == "Other"
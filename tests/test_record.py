@@ -1,6 +1,12 @@
+import pickle
+import pytest
+from pathlib import Path
 from typing import cast, Any, Generator
 from personal_assistant.addr_book.classes import \
-    Record, PhoneFactory, EmailFactory, Birthday, PostAddress
+    Record, Phone, Email, PhoneFactory, EmailFactory, Birthday, PostAddress
+from personal_assistant.common import load_data
+
+DATA_DIR = Path(__file__).parent / "data"
 
 
 def test_record_simple():
@@ -21,3 +27,84 @@ def test_record_simple():
     assert str(rec.address) == address.strip()
     assert str(rec.birthday) == birthday
 
+
+
+def test_record_compact():
+    rec = Record("John")
+    phones, errors = PhoneFactory.create("111111111, 222222222")
+    rec.phones.extend(phones)
+    assert not hasattr(rec, "__dict__")
+    assert not hasattr(rec.phones, "__dict__")
+    assert not hasattr(rec.phones[0], "__dict__")
+
+
+def test_record_pickle():
+    rec = Record("John")
+    rec.birthday = "29.02.2000"
+    phones, errors = PhoneFactory.create("111111111, 222222222")
+    rec.phones.extend(phones)
+    emails, errors = EmailFactory.create("john@test.com")
+    rec.emails.extend(emails)
+
+    loaded = pickle.loads(pickle.dumps(rec))
+    assert str(loaded) == str(rec)
+
+    changed = []
+    loaded.subscribe(changed.append)
+    loaded.phones.append(Phone("333333333"))
+    assert changed == [loaded]
+
+
+def test_load_legacy_pickles():
+    book = load_data(DATA_DIR / "legacy_addressbook.pkl")
+    rec = book["ivan petrenko"]
+    assert str(rec.phones) == "380501112233\n0441234567"
+    assert str(rec.emails) == "ivan@test.ua"
+    assert str(rec.birthday) == "29.02.2000"
+    assert str(rec.address) == "Kyiv, Khreshchatyk 1"
+    assert book.find("khresh") == [rec]
+    assert str(book["john"].address) == "Unknown"
+
+    changed = []
+    rec.subscribe(changed.append)
+    rec.emails.clear()
+    assert changed == [rec]
+    assert book.find("test.ua") == []
+
+    notes = load_data(DATA_DIR / "legacy_notes.pkl")
+    note = notes["01J0000000000000000000000A"]
+    assert note.title == "Shopping" and note.tags == {"food", "Home"}
+    assert notes.find("home") == [note]
+    assert pickle.loads(pickle.dumps(notes)).find("work")[0].title == "Work"
+
+
+def test_phone_email_hash_normalized():
+    assert hash(Phone("+38 (050) 111-22-33")) == hash(Phone("380501112233"))
+    assert {Phone("0501112233"), Phone("050-111-22-33")} == {Phone("0501112233")}
+    assert len({Email("John@Test.com "), Email("john@test.com")}) == 1
+
+
+@pytest.mark.parametrize("count", [3, 50])
+def test_unique_list_set_semantics(count):
+    rec = Record("John")
+    phones = [Phone(f"38050{i:07}") for i in range(count)]
+    rec.phones.extend(phones + phones[::-1])
+    rec.phones.append(Phone(f"+38 050 {0:07}"))
+    assert rec.phones == phones
+
+    assert f"+38050{count - 1:07}" in rec.phones
+    assert "050 999 99 99" not in rec.phones
+    assert "wrong" not in rec.phones and None not in rec.phones
+    assert rec.phones.index(f"38050{1:07}") == 1
+    assert rec.phones.count(phones[2]) == 1
+
+    rec.phones.change(phones[0], Phone("0441234567"))
+    assert rec.phones[-1] == "0441234567" and phones[0] not in rec.phones
+    rec.phones.change(Phone("0000000000"), Phone("0551234567"))
+    assert "0551234567" not in rec.phones
+    rec.phones.change(phones[1], phones[2])
+    assert len(rec.phones) == count - 1
+
+    rec.emails.extend(EmailFactory.create("a@test.com, A@TEST.com, b@test.com")[0])
+    assert str(rec.emails) == "a@test.com\nb@test.com"
+    assert " B@test.COM" in rec.emails
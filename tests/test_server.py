@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import pytest
+from personal_assistant.exceptions import ApplicationBaseError
+from personal_assistant.addr_book.classes import AddressBook
+from personal_assistant.notes.classes import Notes
+from personal_assistant.server import READ_OPS, Client, Service, start_server
+from personal_assistant.common import load_data
+from personal_assistant.storage import JournalStorage, PickleStorage
+from benchmarks.load_test import run_load_test
+
+
+def make_service(tmp_path) -> Service:
+    book_storage = JournalStorage(tmp_path / "addressbook.pkl", fsync=False)
+    notes_storage = JournalStorage(tmp_path / "notes.pkl", fsync=False)
+    book_storage.load(AddressBook)
+    notes_storage.load(Notes)
+    return Service(book_storage, notes_storage)
+
+
+def serve(tmp_path, test) -> Service:
+    """Run async test(client, other_client) against the service on a Unix socket"""
+    service = make_service(tmp_path)
+    socket_path = tmp_path / "assistant.sock"
+
+    async def main():
+        server = await start_server(service, socket_path)
+        async with server:
+            clients = [await Client.connect(socket_path) for _ in range(2)]
+            try:
+                await test(*clients)
+            finally:
+                for client in clients:
+                    await client.close()
+
+    asyncio.run(main())
+    return service
+
+
+def test_contacts(tmp_path):
+    async def test(client, other):
+        john = await client.call("contacts.add", name="John Smith", phones=["0501234567"],
+                                 emails=["john@example.com"], birthday="1990-03-15")
+        assert john == {"name": "John Smith", "phones": ["0501234567"], "emails": ["john@example.com"],
+                        "birthday": "1990-03-15", "address": None}
+
+        # the other client sees the change
+        assert await other.call("contacts.get", name="john smith") == john
+        assert [c["name"] for c in await other.call("contacts.find", criteria="example")] == ["John Smith"]
+
+        edited = await other.call("contacts.edit", name="John Smith", phones=["0671234567"], address="Kyiv")
+        assert edited["phones"] == ["0671234567"] and edited["address"] == "Kyiv"
+        assert edited["birthday"] == "1990-03-15"
+
+        with pytest.raises(ApplicationBaseError) as e:
+            await client.call("contacts.add", name="John Smith")
+        assert "already exist" in e.value.strerror
+        with pytest.raises(ApplicationBaseError):
+            await client.call("contacts.edit", name="John Smith", phones=["123"])
+
+        assert await client.call("contacts.delete", name="John Smith") is True
+        with pytest.raises(ApplicationBaseError):
+            await other.call("contacts.get", name="John Smith")
+
+    service = serve(tmp_path, test)
+    service.book_storage.close()
+    assert len(JournalStorage(tmp_path / "addressbook.pkl").load(AddressBook)) == 0
+
+
+def test_notes_and_pipelining(tmp_path):
+    async def test(client, other):
+        responses = await client.call_many([
+            ("notes.add", {"title": "Shopping", "text": "milk #home"}),
+            ("notes.add", {"title": "Report", "text": "budget #work"}),
+            ("notes.find", {"tags": "home"}),
+            ("notes.unknown", {}),
+            ("notes.get", {"id": "missing"}),
+            ("notes.search", {"query": "budget"}),
+            ("contacts.birthdays", {"days": "x"}),
+        ])
+        assert [r["id"] for r in responses] == list(range(1, 8))
+        assert [r["ok"] for r in responses] == [True, True, True, False, False, True, False]
+        assert [n["title"] for n in responses[2]["result"]] == ["Shopping"]
+        assert responses[3]["error"] == "Unknown operation 'notes.unknown'"
+        assert [n["title"] for n in responses[5]["result"]] == ["Report"]
+
+        note_id = responses[0]["result"]["id"]
+        assert (await other.call("notes.edit", id=note_id, text="bread #shop"))["tags"] == ["shop"]
+        assert await other.call("notes.delete", id=note_id) is True
+
+        client.writer.write(b"not json\n{\"op\": 1}\n")
+        assert (await client.receive())["error"] == "Invalid JSON"
+        assert (await client.receive())["error"] == "Invalid request"
+
+    service = serve(tmp_path, test)
+    service.notes_storage.close()
+    assert [n.title for n in JournalStorage(tmp_path / "notes.pkl").load(Notes).values()] == ["Report"]
+
+
+def test_invalid_arguments_and_internal_error(tmp_path, monkeypatch, caplog):
+    async def test(client, other):
+        note = await client.call("notes.add", title="Shopping", text="milk")
+        responses = await client.call_many([
+            ("notes.add", {"title": ["x"]}),
+            ("notes.edit", {"id": note["id"], "title": "Groceries", "text": 1}),
+            ("notes.get", {"id": note["id"]}),
+            ("notes.find", {"tags": "home"}),
+            ("notes.get", {"id": note["id"]}),
+        ])
+        assert [r["ok"] for r in responses] == [False, False, True, False, True]
+        assert responses[0]["error"] == "'title' must be a string"
+        assert responses[1]["error"] == "'text' must be a string"
+        # the rejected edit didn't change the title
+        assert responses[2]["result"]["title"] == "Shopping"
+        assert responses[3]["error"] == "Internal error"
+
+    def broken_find(self, tags, limit=None):
+        raise KeyError(tags)
+
+    monkeypatch.setitem(READ_OPS, "notes.find", broken_find)
+    serve(tmp_path, test)
+    assert "Request" in caplog.text and "KeyError" in caplog.text
+
+
+def test_read_waits_for_lock_outside_loop(tmp_path):
+    service = make_service(tmp_path)
+    locked, release = threading.Event(), threading.Event()
+
+    def commit():
+        # like a commit in the executor thread
+        with service.book_storage.lock:
+            locked.set()
+            release.wait(5)
+
+    async def main():
+        thread = threading.Thread(target=commit)
+        thread.start()
+        locked.wait()
+        find = asyncio.ensure_future(service.call("contacts.find", {"criteria": "john"}))
+        # the loop serves the notes while the contacts read waits
+        assert await asyncio.wait_for(service.call("notes.find", {"tags": "home"}), 5) == []
+        assert not find.done()
+        release.set()
+        assert await find == []
+        thread.join()
+
+    asyncio.run(main())
+
+
+def test_pickle_write_saved_before_answer(tmp_path):
+    book_storage = PickleStorage(tmp_path / "addressbook.pkl", autosave=True, delay=60, max_delay=60)
+    notes_storage = PickleStorage(tmp_path / "notes.pkl", autosave=True, delay=60, max_delay=60)
+    book_storage.load(AddressBook)
+    notes_storage.load(Notes)
+    service = Service(book_storage, notes_storage)
+    try:
+        note = asyncio.run(service.call("notes.add", {"title": "Report"}))
+        assert [n.id for n in load_data(tmp_path / "notes.pkl").values()] == [note["id"]]
+    finally:
+        book_storage.close()
+        notes_storage.close()
+
+
+def test_load_test():
+    report = run_load_test(size=100, clients=2, requests=50, pipeline=8, writes=0.3)
+    assert report["requests"] == 100
+    assert report["errors"] == 0
+    assert report["rps"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
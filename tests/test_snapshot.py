@@ -0,0 +1,73 @@
+import pytest
+from datetime import date
+from personal_assistant.addr_book.classes import AddressBook, Record
+from personal_assistant.addr_book.exceptions import ReadOnlyError, SnapshotFormatError
+from personal_assistant.addr_book.snapshot import open_snapshot, write_snapshot
+from tests.test_address_book import freeze_today, make_birthday_book, make_lookup_book
+from tests.test_sqlite_storage import fill_book, names
+
+
+def make_book() -> AddressBook:
+    book = AddressBook()
+    fill_book(book)
+    rec = Record("Олена Коваль")
+    rec.address = "Київ"
+    book.add_record(rec)
+    return book
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "book.snap"
+    assert write_snapshot(make_book(), path) == 31
+    return path
+
+
+def test_snapshot_same_as_memory(snapshot_path):
+    book = make_book()
+    with open_snapshot(snapshot_path) as snapshot:
+        assert len(snapshot) == 31
+        assert list(snapshot) == list(book)
+        for key in book:
+            assert snapshot[key].__getstate__() == book[key].__getstate__()
+        for criteria in ["contact 1", "38050", "test1.com", "city 3", "unknown", "co", "", "нема"]:
+            assert names(snapshot.find(criteria)) == names(book.find(criteria))
+        assert names(snapshot.find("київ")) == ["Олена Коваль"]
+        assert snapshot.get("ОЛЕНА коваль").address.value == "Київ"
+        assert "contact 05" in snapshot and "contact 99" not in snapshot
+        assert snapshot.get("contact 99") is None
+        assert snapshot.get("contact 01") is snapshot.find("contact 01")[0]
+
+
+def test_snapshot_birthdays(monkeypatch, tmp_path):
+    freeze_today(monkeypatch, date(2023, 12, 28))
+    book = make_birthday_book()
+    write_snapshot(book, tmp_path / "book.snap")
+    with open_snapshot(tmp_path / "book.snap") as snapshot:
+        for days in (1, 7, 30, 366):
+            assert names(snapshot.get_upcoming_birthdays(days)) == names(book.get_upcoming_birthdays(days))
+
+
+def test_snapshot_read_only(snapshot_path, tmp_path):
+    snapshot = open_snapshot(snapshot_path)
+    with pytest.raises(ReadOnlyError):
+        snapshot.add_record(Record("New"))
+    with pytest.raises(ReadOnlyError):
+        snapshot.delete("contact 01")
+    record = snapshot["contact 01"]
+    snapshot.close()
+    assert str(record.name) == "Contact 01"
+
+    (tmp_path / "bad.snap").write_bytes(b"not a snapshot")
+    with pytest.raises(SnapshotFormatError):
+        open_snapshot(tmp_path / "bad.snap")
+
+
+def test_snapshot_lookup(tmp_path):
+    book = make_lookup_book()
+    write_snapshot(book, tmp_path / "book.snap")
+    with open_snapshot(tmp_path / "book.snap") as snapshot:
+        for value in ["+38 050 111 22 33", "0441234567", "50111223", "john@TEST.com", "test.com", ""]:
+            assert names(snapshot.lookup(value)) == names(book.lookup(value))
+        assert [(value, names(recs)) for value, recs in snapshot.shared_contacts()] == \
+            [(value, names(recs)) for value, recs in book.shared_contacts()]
@@ -0,0 +1,211 @@
+import sqlite3
+import pytest
+from datetime import date, datetime, timedelta
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory, EmailFactory
+from personal_assistant.notes.classes import NoteRecord, Notes, ulid_time_prefix
+from personal_assistant.notes.exceptions import AmbiguousNoteId
+from personal_assistant import sqlite_storage
+from personal_assistant.sqlite_storage import SqliteAddressBook, SqliteNotes, SqliteStorage
+from personal_assistant.storage import JournalStorage
+from tests.test_address_book import freeze_today, make_birthday_book, make_lookup_book
+
+
+def fill_book(book: AddressBook) -> None:
+    for i in range(30):
+        rec = Record(f"Contact {i:02}")
+        phones, errors = PhoneFactory.create(f"38050{i:07}")
+        rec.phones.extend(phones)
+        emails, errors = EmailFactory.create(f"contact{i}@test{i % 3}.com")
+        rec.emails.extend(emails)
+        if i % 2:
+            rec.address = f"City {i % 5}"
+        book.add_record(rec)
+
+
+def names(records) -> list[str]:
+    return [str(rec.name) for rec in records]
+
+
+def test_sqlite_book_same_as_memory():
+    book = AddressBook()
+    db_book = SqliteAddressBook(sqlite3.connect(":memory:"))
+    fill_book(book)
+    fill_book(db_book)
+    for b in (book, db_book):
+        b.delete("contact 05")
+        b["contact 07"].phones.clear()
+
+    assert len(db_book) == len(book)
+    assert list(db_book) == list(book)
+    assert "Contact 01" in db_book and "Contact 05" not in db_book
+    for criteria in ["", "co", "contact 1", "0500000007", "test1.com", "city 3", "unknown", "x\"y"]:
+        assert names(db_book.find(criteria)) == names(book.find(criteria))
+
+
+@pytest.mark.parametrize("today", [date(2025, 2, 24), date(2025, 12, 29)])
+def test_sqlite_birthdays(monkeypatch, today):
+    book = make_birthday_book()
+    db_book = SqliteAddressBook(sqlite3.connect(":memory:"))
+    for key, rec in book.items():
+        db_book.restore(key, rec)
+    freeze_today(monkeypatch, today)
+    assert names(db_book.get_upcoming_birthdays(10)) == names(book.get_upcoming_birthdays(10))
+
+
+def test_sqlite_record_changes_saved(tmp_path):
+    path = tmp_path / "book.pkl"
+    storage = SqliteStorage(path)
+    book = storage.load(AddressBook)
+    rec = Record("John")
+    book.add_record(rec)
+    phones, errors = PhoneFactory.create("123456789")
+    rec.phones.extend(phones)
+    rec.birthday = "01.02.2000"
+    storage.close()
+
+    storage = SqliteStorage(path)
+    book = storage.load(AddressBook)
+    loaded = book.get("john")
+    assert loaded is book["John"]
+    assert str(loaded.phones) == "123456789"
+    assert str(loaded.birthday) == "01.02.2000"
+    assert book.find("2345") == [loaded]
+    storage.close()
+
+
+def test_sqlite_imports_pickle(tmp_path, monkeypatch):
+    closed = []
+
+    class ClosedJournalStorage(JournalStorage):
+        def close(self):
+            super().close()
+            closed.append(self.data)
+
+    monkeypatch.setattr(sqlite_storage, "JournalStorage", ClosedJournalStorage)
+    path = tmp_path / "notes.pkl"
+    storage = JournalStorage(path)
+    notes = storage.load(Notes)
+    note = NoteRecord("Title", "text #tag")
+    notes.add(note)
+    storage.close()
+
+    storage = SqliteStorage(path)
+    notes = storage.load(Notes)
+    assert list(notes) == [note.id]
+    assert notes.find("tag")[0].title == "Title"
+    storage.close()
+    # the imported storage is closed and unsubscribed from its data
+    [old_notes] = closed
+    assert not old_notes._observers
+
+
+def test_sqlite_import_interrupted(tmp_path, monkeypatch):
+    path = tmp_path / "addressbook.pkl"
+    storage = JournalStorage(path)
+    storage.load(AddressBook).add_record(Record("John"))
+    storage.close()
+
+    class BrokenJournalStorage(JournalStorage):
+        def load(self, factory):
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(sqlite_storage, "JournalStorage", BrokenJournalStorage)
+    with pytest.raises(KeyboardInterrupt):
+        SqliteStorage(path).load(AddressBook)
+    assert not path.with_suffix(".db").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # the import runs again on the next start
+    monkeypatch.setattr(sqlite_storage, "JournalStorage", JournalStorage)
+    storage = SqliteStorage(path)
+    assert list(storage.load(AddressBook)) == ["john"]
+    storage.close()
+
+
+def test_sqlite_notes():
+    notes = SqliteNotes(sqlite3.connect(":memory:"))
+    memory_notes = Notes()
+    for title, text in [
+        ["Title 2", "Message 2 \n #tag10 #tag2 tag12"],
+        ["Title 3", "Message 3 \n #tag1 #tag21 tag2"],
+        ["Title 4", "Message 5 \n #tag12 #tag21 tag3"],
+        ["Title 1", "Message 1 \n #Tag1 #tag2 tag1"],
+    ]:
+        note = NoteRecord(title, text)
+        notes.add(note)
+        memory_notes.add(NoteRecord(title, text, note.id))
+
+    for criteria in ["tag1", "tag1 tag2", "TAG21 tag12", "none"]:
+        assert [n.id for n in notes.find(criteria)] == [n.id for n in memory_notes.find(criteria)]
+
+    note = notes.find("tag10")[0]
+    note.text = "#changed"
+    assert notes.find("tag10") == []
+    assert notes.find("changed") == [note]
+    with pytest.raises(KeyError):
+        notes.add(NoteRecord("Dup", "", note.id))
+    assert notes.delete(note.id) is note
+    assert note.id not in notes and len(notes) == 3
+
+
+def test_sqlite_notes_id_queries():
+    day = datetime(2024, 5, 17)
+    notes = SqliteNotes(sqlite3.connect(":memory:"))
+    for hours in [-1, 0, 5, 24]:
+        notes.add(NoteRecord(f"Note {hours}", "", ulid_time_prefix(day + timedelta(hours=hours)) + "0" * 16))
+    assert [n.title for n in notes.created_between(day, day + timedelta(days=1))] == ["Note 0", "Note 5"]
+    note = notes.created_between(day + timedelta(hours=5), day + timedelta(hours=6))[0]
+    assert notes.resolve(note.id[:9].lower()) is note
+    with pytest.raises(AmbiguousNoteId):
+        notes.resolve(note.id[:2])
+
+
+def test_sqlite_queries_use_indexes():
+    connection = sqlite3.connect(":memory:")
+    SqliteAddressBook(connection)
+    SqliteNotes(connection)
+    queries = [
+        "SELECT id FROM contacts WHERE key = 'x'",
+        "SELECT id FROM contacts WHERE birthday_md IN (101, 102)",
+        "SELECT contact_id FROM phones WHERE phone = '1'",
+        "SELECT contact_id FROM emails WHERE email = 'a@b.c'",
+        "SELECT note_id FROM note_tags WHERE tag IN ('a', 'b')",
+        "SELECT id FROM notes WHERE id >= '01' AND id < '02' ORDER BY id LIMIT 2",
+    ]
+    for query in queries:
+        plan = " ".join(str(row[-1]) for row in connection.execute("EXPLAIN QUERY PLAN " + query))
+        assert "USING" in plan and "SCAN" not in plan, plan
+
+
+def test_sqlite_notes_search():
+    notes = SqliteNotes(sqlite3.connect(":memory:"))
+    for title, text in [
+        ("Budget report", "Quarterly budget report for the board"),
+        ("Shopping", "milk, bread and a report folder"),
+        ("Planning", "Plan the budget for next year"),
+    ]:
+        notes.add(NoteRecord(title, text))
+
+    assert [n.title for n in notes.search("report")] == ["Budget report", "Shopping"]
+    assert [n.title for n in notes.search('"budget report"')] == ["Budget report"]
+    assert [n.title for n in notes.search("plan*")] == ["Planning"]
+    assert notes.search('"') == []
+
+    note = notes.search("milk")[0]
+    note.text = "eggs"
+    assert notes.search("milk") == []
+    assert notes.search("eggs") == [note]
+    notes.delete(note.id)
+    assert notes.search("eggs") == []
+
+
+def test_sqlite_lookup():
+    book = make_lookup_book()
+    db_book = SqliteAddressBook(sqlite3.connect(":memory:"))
+    for rec in book.values():
+        db_book.add_record(rec)
+
+    for value in ["+38 050 111 22 33", "0441234567", "john@TEST.com", "000", ""]:
+        assert names(db_book.lookup(value)) == names(book.lookup(value))
+    assert [(value, names(recs)) for value, recs in db_book.shared_contacts()] == \
+        [(value, names(recs)) for value, recs in book.shared_contacts()]
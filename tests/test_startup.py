@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+
+# Import time budgets in seconds (cumulative time reported by python -X importtime).
+# Set STARTUP_BUDGET_SCALE to relax them on slow machines.
+STARTUP_BUDGETS = {
+    "personal_assistant.addr_book.classes": 0.1,
+    "personal_assistant.notes.classes": 0.1,
+    "personal_assistant.main": 0.15,
+}
+BUDGET_SCALE = float(os.environ.get("STARTUP_BUDGET_SCALE", "1"))
+
+# Modules loaded only when a table or a prompt is shown
+LAZY_MODULES = ["rich", "prompt_toolkit", "ulid"]
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": str(SRC_PATH)}
+    return subprocess.run([sys.executable, *options, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+
+def import_time(module: str, runs: int = 3) -> float:
+    """Returns best cumulative import time of the module in seconds"""
+    times = []
+    for _ in range(runs):
+        result = run_python(f"import {module}", "-X", "importtime")
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                times.append(int(parts[1]) / 1_000_000)
+    return min(times)
+
+
+@pytest.mark.parametrize("module", STARTUP_BUDGETS)
+def test_import_time_budget(module):
+    budget = STARTUP_BUDGETS[module] * BUDGET_SCALE
+    assert import_time(module) <= budget
+
+
+@pytest.mark.parametrize("module", ["personal_assistant.addr_book.classes", "personal_assistant.notes.classes", "personal_assistant.main"])
+def test_heavy_modules_not_imported(module):
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    assert run_python(code).stdout.strip() == ""
@@ -0,0 +1,311 @@
+import threading
+import time
+import pytest
+from personal_assistant import common
+from personal_assistant.common import file_lock, load_data, save_data
+from personal_assistant.addr_book.classes import AddressBook, Record, PhoneFactory
+from personal_assistant.notes.classes import NoteRecord, Notes
+from personal_assistant.storage import JournalStorage, PickleStorage, open_storage
+
+
+def test_journal_replay(tmp_path):
+    path = tmp_path / "book.pkl"
+    storage = JournalStorage(path, fsync=False)
+    book = storage.load(AddressBook)
+
+    rec = Record("John")
+    book.add_record(rec)
+    book.add_record(Record("Jane"))
+    storage.commit()
+
+    phones, errors = PhoneFactory.create("123456789")
+    rec.phones.extend(phones)
+    rec.birthday = "01.01.2000"
+    book.delete("jane")
+    storage.close()
+
+    assert not path.exists()
+    assert storage.journal_path.exists()
+
+    loaded = JournalStorage(path).load(AddressBook)
+    assert list(loaded.keys()) == ["john"]
+    assert str(loaded["john"].phones) == "123456789"
+    assert str(loaded["john"].birthday) == "01.01.2000"
+    assert loaded.find("12345") == [loaded["john"]]
+
+
+def test_journal_replay_keeps_order(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage = JournalStorage(path, fsync=False)
+    notes = storage.load(Notes)
+    first, *others = [NoteRecord(title, "text #tag") for title in ("A", "B", "C")]
+    for note in (first, *others):
+        notes.add(note)
+    storage.compact()
+    first.text = "edited #tag"
+    storage.close()
+
+    loaded = JournalStorage(path).load(Notes)
+    assert [note.title for note in loaded.values()] == ["A", "B", "C"]
+    assert [note.title for note in loaded.find("tag")] == ["A", "B", "C"]
+    assert loaded.search("edited") == [loaded[first.id]]
+
+
+def test_journal_broken_tail(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage = JournalStorage(path, fsync=False)
+    notes = storage.load(Notes)
+    note = NoteRecord("Title", "#tag")
+    notes.add(note)
+    storage.close()
+
+    size = storage.journal_path.stat().st_size
+    with open(storage.journal_path, "ab") as f:
+        f.write(b"\x80\x04\x95garbage")
+
+    storage = JournalStorage(path, fsync=False)
+    loaded = storage.load(Notes)
+    assert list(loaded.keys()) == [note.id]
+    assert storage.journal_path.stat().st_size == size
+
+    loaded[note.id].text = "#other"
+    storage.close()
+    assert JournalStorage(path).load(Notes).find("other")[0].id == note.id
+
+
+def test_journal_compact(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage = JournalStorage(path, compact_size=200, fsync=False)
+    notes = storage.load(Notes)
+    for i in range(10):
+        notes.add(NoteRecord(f"Title {i}", "text " * 20))
+        storage.commit()
+    storage.close()
+
+    assert path.exists()
+    assert storage.journal_path.stat().st_size < 200
+
+    loaded = JournalStorage(path).load(Notes)
+    assert sorted(n.title for n in loaded.values()) == [f"Title {i}" for i in range(10)]
+
+
+def test_open_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("PERSONAL_ASSISTANT_STORAGE", "pickle")
+    assert type(open_storage(tmp_path / "a.pkl")) is PickleStorage
+    monkeypatch.delenv("PERSONAL_ASSISTANT_STORAGE")
+    assert type(open_storage(tmp_path / "a.pkl")) is JournalStorage
+    monkeypatch.setenv("PERSONAL_ASSISTANT_STORAGE", "unknown")
+    with pytest.raises(ValueError):
+        open_storage(tmp_path / "a.pkl")
+
+
+def test_save_data_is_atomic(tmp_path):
+    path = tmp_path / "book.pkl"
+    save_data({"a": 1}, path)
+
+    with pytest.raises(Exception):
+        save_data({"a": lambda: None}, path)
+
+    assert load_data(path) == {"a": 1}
+    assert [p for p in tmp_path.iterdir() if p.suffix != ".lock"] == [path]
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_autosave_debounced(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage = PickleStorage(path, autosave=True, delay=0.05, max_delay=5)
+    notes = storage.load(Notes)
+    saver = storage.autosaver
+
+    with storage.lock:
+        for i in range(20):
+            notes.add(NoteRecord(f"Title {i}", "text"))
+    assert wait_for(lambda: saver.saves == 1)
+    assert len(load_data(path)) == 20
+
+    time.sleep(0.1)
+    assert saver.saves == 1
+    storage.close()
+    assert saver.saves == 1
+
+
+def test_save_pickles_without_lock(tmp_path):
+    path = tmp_path / "notes.pkl"
+    storage = PickleStorage(path)
+    notes = storage.load(Notes)
+    notes.add(NoteRecord("First", "text"))
+    dump, locked = storage._dump, []
+
+    def changing_dump(obj, f):
+        # another thread can take the lock while data is pickled, and change the data
+        def try_lock():
+            if storage.lock.acquire(blocking=False):
+                storage.lock.release()
+                locked.append(False)
+            else:
+                locked.append(True)
+
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        if len(locked) == 1:
+            notes.add(NoteRecord("Second", "text"))
+        dump(obj, f)
+
+    storage._dump = changing_dump
+    storage.save()
+    # the change made while pickling is pickled again under the lock
+    assert locked == [False, True]
+    assert sorted(note.title for note in load_data(path).values()) == ["First", "Second"]
+    assert not storage._dirty
+
+
+def test_journal_fsync_without_lock(tmp_path, monkeypatch):
+    from personal_assistant import storage as storage_module
+    from tests.test_common import is_locked
+    storage = JournalStorage(tmp_path / "notes.pkl")
+    notes = storage.load(Notes)
+    notes.add(NoteRecord("First", "text"))
+    fsync, locked = storage_module.os.fsync, []
+
+    def checking_fsync(fd):
+        locked.append(is_locked(storage.lock))
+        fsync(fd)
+
+    monkeypatch.setattr(storage_module.os, "fsync", checking_fsync)
+    storage.commit()
+    assert locked == [False]
+    # own entries are not replayed
+    assert not storage.changed()
+    assert [n.title for n in JournalStorage(tmp_path / "notes.pkl").load(Notes).values()] == ["First"]
+
+
+def test_autosave_max_delay(tmp_path):
+    path = tmp_path / "book.pkl"
+    storage = PickleStorage(path, autosave=True, delay=0.1, max_delay=0.2)
+    book = storage.load(AddressBook)
+
+    start = time.monotonic()
+    # changes every 20 ms never leave 100 ms of quiet time
+    while not path.exists() and time.monotonic() - start < 2:
+        with storage.lock:
+            book.add_record(Record(f"Name {time.monotonic()}"))
+        time.sleep(0.02)
+    assert path.exists()
+    assert time.monotonic() - start < 1
+    storage.close()
+
+
+def test_autosave_flush_on_close(tmp_path):
+    path = tmp_path / "book.pkl"
+    storage = PickleStorage(path, autosave=True, delay=60, max_delay=60)
+    book = storage.load(AddressBook)
+    book.add_record(Record("John"))
+    book["john"].birthday = "01.01.2000"
+    assert not path.exists()
+
+    storage.close()
+    assert str(load_data(path)["john"].birthday) == "01.01.2000"
+    assert not storage.autosaver
+
+
+def test_file_lock_between_threads(tmp_path):
+    path = tmp_path / "book.pkl"
+    save_data({"a": 1}, path)
+    locked, events = threading.Event(), []
+
+    def writer():
+        with file_lock(path):
+            locked.set()
+            time.sleep(0.2)
+            events.append("written")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    locked.wait()
+    assert load_data(path) == {"a": 1}
+    events.append("read")
+    thread.join()
+    assert events == ["written", "read"]
+
+    with file_lock(path, shared=True):
+        with pytest.raises(RuntimeError):
+            with file_lock(path):
+                pass
+
+
+def test_file_lock_read_only_directory(tmp_path, monkeypatch):
+    path = tmp_path / "book.pkl"
+    book = AddressBook()
+    book.add_record(Record("John"))
+    save_data(book, path)
+
+    def read_only_open(file, mode="r", *args, **kwargs):
+        if str(file).endswith(".lock"):
+            raise PermissionError(13, "Permission denied", str(file))
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(common, "open", read_only_open, raising=False)
+    assert list(load_data(path).keys()) == ["john"]
+    assert list(JournalStorage(path).load(AddressBook).keys()) == ["john"]
+    with pytest.raises(PermissionError):
+        with file_lock(path):
+            pass
+
+
+def test_journal_instances(tmp_path):
+    path = tmp_path / "book.pkl"
+    first, second = JournalStorage(path, fsync=False), JournalStorage(path, fsync=False)
+    book, other = first.load(AddressBook), second.load(AddressBook)
+
+    book.add_record(Record("John"))
+    first.commit()
+    assert second.changed()
+    assert second.refresh()
+    assert list(other) == ["john"]
+    assert not second.changed() and not second.refresh()
+
+    other["john"].birthday = "01.01.2000"
+    other["john"].phones.extend(PhoneFactory.create("0501234567")[0])
+    second.commit()
+    # local uncommitted changes are kept, changes of the other instance are merged on commit
+    book.add_record(Record("Jane"))
+    first.commit()
+    assert str(book["john"].birthday) == "01.01.2000"
+    assert book.find("050123") == [book["john"]]
+    assert second.refresh() and sorted(other) == ["jane", "john"]
+
+    # compacted by the other instance: the whole data is reloaded
+    other.delete("jane")
+    second.compact()
+    assert first.refresh()
+    assert list(book) == ["john"]
+    first.close()
+    second.close()
+    assert list(JournalStorage(path).load(AddressBook)) == ["john"]
+
+
+def test_pickle_instances_merge(tmp_path):
+    path = tmp_path / "notes.pkl"
+    first, second = PickleStorage(path), PickleStorage(path)
+    notes, other = first.load(Notes), second.load(Notes)
+
+    note = NoteRecord("First", "#one")
+    notes.add(note)
+    first.save()
+    other.add(NoteRecord("Second", "#two"))
+    assert second.changed()
+    second.close()
+
+    assert first.refresh()
+    assert sorted(n.title for n in notes.values()) == ["First", "Second"]
+    assert [n.title for n in notes.find("two")] == ["Second"]
+    assert sorted(n.title for n in load_data(path).values()) == ["First", "Second"]